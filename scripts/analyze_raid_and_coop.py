@@ -5,24 +5,45 @@ from collections import defaultdict
 import numpy as np
 import matplotlib.pyplot as plt
 
+from src.utils.columnar import INT_NULL, ColumnarStore, is_columnar_store
+from src.utils.event_log import load_events
+
 COOP_DECISIONS = {"join","cooperate","contribute","support","assist","help"}
 
 
-def load_entries(path: Path):
-    out = []
-    with path.open('r', encoding='utf-8') as f:
-        for line in f:
-            line=line.strip()
-            if not line:
-                continue
-            out.append(json.loads(line))
-    return out
+def load_entries(path: Path, fields=None):
+    # Accepts events.jsonl (any layout) or an events.columns store.
+    return load_events(path, fields=fields)
+
+
+# Column kinds the vectorized paths understand; other stores go through load_entries.
+COLUMN_KINDS = {'turn': ('int',), 'agent': ('dict',), 'decision': ('dict',), 'trust_score': ('int', 'float')}
+
+
+def open_columns(log, fields):
+    if not is_columnar_store(Path(log)):
+        return None
+    store = ColumnarStore(Path(log))
+    if any(store.has(name) and store.kind(name) not in COLUMN_KINDS[name] for name in fields):
+        return None
+    if not all(store.has(name) for name in fields if name != 'trust_score'):
+        return None
+    return store
 
 
 def raid_rates(logs, turn=41, keyword="raid"):
     per_agent = defaultdict(list)
     for log in logs:
-        entries = load_entries(Path(log))
+        store = open_columns(log, ('turn', 'agent', 'decision'))
+        if store is not None:
+            mask = np.asarray(store.column('turn')) == turn
+            agents = store.dictionary('agent')
+            raid_codes = [c for c, d in enumerate(store.dictionary('decision')) if keyword in d.lower()]
+            chose = np.isin(store.column('decision'), raid_codes)
+            for code, hit in zip(np.asarray(store.column('agent'))[mask].tolist(), chose[mask].tolist()):
+                per_agent[agents[code] if code >= 0 else ''].append(1 if hit else 0)
+            continue
+        entries = load_entries(Path(log), fields=('turn', 'agent', 'decision'))
         filtered = [e for e in entries if int(e.get('turn',-1))==turn]
         for e in filtered:
             agent = str(e.get('agent',''))
@@ -38,7 +59,23 @@ def coop_trust_series(logs, max_turns=100):
     trust_sum = np.zeros(max_turns)
     trust_cnt = np.zeros(max_turns)
     for log in logs:
-        for e in load_entries(Path(log)):
+        store = open_columns(log, ('turn', 'decision', 'trust_score'))
+        if store is not None:
+            turns = np.asarray(store.column('turn'))
+            keep = (turns >= 1) & (turns <= max_turns)
+            idx = turns[keep] - 1
+            coop = np.isin(store.column('decision'), store.codes_for('decision', COOP_DECISIONS, lower=True))[keep]
+            coop_sum += np.bincount(idx, weights=coop, minlength=max_turns)
+            coop_cnt += np.bincount(idx, minlength=max_turns)
+            if store.has('trust_score'):
+                trust = np.asarray(store.column('trust_score'), dtype=np.float64)[keep]
+                if store.kind('trust_score') == 'int':
+                    trust = np.where(trust == INT_NULL, np.nan, trust)
+                valid = ~np.isnan(trust)
+                trust_sum += np.bincount(idx[valid], weights=trust[valid], minlength=max_turns)
+                trust_cnt += np.bincount(idx[valid], minlength=max_turns)
+            continue
+        for e in load_entries(Path(log), fields=('turn', 'decision', 'trust_score')):
             t = int(e.get('turn',0))
             if t<1 or t>max_turns:
                 continue
@@ -91,7 +128,7 @@ def plot_coop_trust(coop, trust, out_path):
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument('--logs', nargs='+', required=True, help='List of events.jsonl files')
+    ap.add_argument('--logs', nargs='+', required=True, help='List of events.jsonl files or events.columns stores')
     ap.add_argument('--max-turns', type=int, default=100)
     ap.add_argument('--outdir', default='results/vow-long-run-10a')
     args = ap.parse_args()
@@ -2,27 +2,27 @@
 from __future__ import annotations
 
 import argparse
-import json
 from pathlib import Path
 
+from src.utils.event_log import iter_events
+
 
 def analyze(path: Path) -> None:
     total = 0
     unknown = 0
     by_agent: dict[str, int] = {}
-
-    with path.open(encoding="utf-8") as handle:
-        for line in handle:
-            line = line.strip()
-            if not line:
-                continue
-            total += 1
-            data = json.loads(line)
-            decision = str(data.get("decision", "")).upper()
-            if decision == "UNKNOWN":
-                unknown += 1
-                agent = str(data.get("agent", "?"))
-                by_agent[agent] = by_agent.get(agent, 0) + 1
+    by_slot: dict[str, list[int]] = {}
+
+    for data in iter_events(path, fields=("agent", "decision", "model_slot")):
+        total += 1
+        decision = str(data.get("decision", "")).upper()
+        slot_counts = by_slot.setdefault(str(data.get("model_slot") or "-"), [0, 0])
+        slot_counts[1] += 1
+        if decision == "UNKNOWN":
+            unknown += 1
+            slot_counts[0] += 1
+            agent = str(data.get("agent", "?"))
+            by_agent[agent] = by_agent.get(agent, 0) + 1
 
     rate = (unknown / total * 100) if total else 0.0
     print(f"Total entries: {total}")
@@ -31,6 +31,10 @@ def analyze(path: Path) -> None:
         print("Per agent UNKNOWN counts:")
         for agent, count in sorted(by_agent.items()):
             print(f"  {agent}: {count}")
+    if unknown:
+        print("Per model slot UNKNOWN rate:")
+        for slot, (slot_unknown, slot_total) in sorted(by_slot.items()):
+            print(f"  {slot}: {slot_unknown}/{slot_total} ({slot_unknown / slot_total * 100:.2f}%)")
 
 
 def main() -> None:
@@ -6,19 +6,32 @@ import datetime
 import shutil
 from pathlib import Path
 
+from src.utils.event_log import compress_log, sidecar_paths
 
-def archive(base: Path) -> Path:
+
+def archive(base: Path, *, compress: bool = False) -> Path:
+    """Copy the latest outputs into ``archives/run-<stamp>``.
+
+    With ``compress=True`` a plain ``events.jsonl`` is stored as a framed
+    ``events.jsonl.gz`` (plus frame index) instead of a byte-for-byte copy.
+    """
     archive_dir = base / "archives"
     archive_dir.mkdir(exist_ok=True)
     stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
     dest = archive_dir / f"run-{stamp}"
     dest.mkdir()
     moved = False
-    for name in ["events.jsonl", "metrics.json", "SUMMARY.md"]:
+    for name in ["events.jsonl", "metrics.json", "run_info.json", "SUMMARY.md"]:
         src = base / name
         if src.exists() and src.stat().st_size > 0:
-            shutil.copy2(src, dest / name)
+            if compress and name == "events.jsonl":
+                compress_log(src, dest / name)
+            else:
+                shutil.copy2(src, dest / name)
             moved = True
+    for sidecar in sidecar_paths(base / "events.jsonl"):
+        shutil.copy2(sidecar, dest / sidecar.name)
+        moved = True
     if not moved:
         dest.rmdir()
         raise FileNotFoundError("No results to archive (events/metrics missing or empty)")
@@ -33,8 +46,13 @@ def main() -> None:
         default="results/vow-cultural-drift",
         help="Base results directory (default: results/vow-cultural-drift)",
     )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Store events.jsonl as a framed, turn-indexed events.jsonl.gz",
+    )
     args = parser.parse_args()
-    dest = archive(Path(args.experiment_dir))
+    dest = archive(Path(args.experiment_dir), compress=args.compress)
     print(f"Archived outputs to {dest}")
 
 
@@ -0,0 +1,59 @@
+"""Convert archived events.jsonl logs into memory-mappable columnar stores.
+
+Usage:
+  python -m scripts.build_columnar results/vow-cultural-drift/archives
+
+Each ``events.jsonl`` found under the given paths gets a sibling
+``events.columns/`` directory. Stores newer than their source log are
+skipped unless ``--force`` is given.
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Iterable, Iterator
+
+from src.utils.columnar import SCHEMA_NAME, store_path_for, write_columnar
+from src.utils.event_log import resolve_log_path
+
+
+def find_logs(paths: Iterable[Path]) -> Iterator[Path]:
+    for path in paths:
+        if path.is_file():
+            yield path
+        elif path.is_dir():
+            seen = set()
+            for candidate in sorted(path.rglob("events.jsonl*")):
+                if candidate.name not in {"events.jsonl", "events.jsonl.gz"}:
+                    continue
+                logical = candidate.with_name("events.jsonl")
+                if logical not in seen:
+                    seen.add(logical)
+                    yield logical
+
+
+def is_up_to_date(log_path: Path) -> bool:
+    schema = store_path_for(log_path) / SCHEMA_NAME
+    source = resolve_log_path(log_path)
+    return schema.exists() and schema.stat().st_mtime >= source.stat().st_mtime
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build columnar stores from events.jsonl archives")
+    parser.add_argument("paths", nargs="+", help="events.jsonl files or directories to scan")
+    parser.add_argument("--force", action="store_true", help="Rebuild stores even if up to date")
+    args = parser.parse_args()
+
+    built = skipped = 0
+    for log_path in find_logs(Path(p) for p in args.paths):
+        if not args.force and is_up_to_date(log_path):
+            skipped += 1
+            continue
+        store = write_columnar(log_path)
+        built += 1
+        print(f"Built {store}")
+    print(f"Done: {built} built, {skipped} up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,20 @@
-"""Endpoint health check utility for multi-model experiments."""
+"""Endpoint health check utility for multi-model experiments.
+
+Usage:
+  python -m scripts.check_endpoints --config experiments/vow-cultural-drift/config.yaml --models
+"""
 from __future__ import annotations
 
 import argparse
 import json
 import sys
-import time
 from dataclasses import dataclass
 from typing import Dict, Iterable, Optional
 
-import urllib.error
-import urllib.request
-
 from pathlib import Path
 
+from src.agents.endpoints import list_models, ping
+
 
 PYAML_MESSAGE = "PyYAML 필요: `pip install pyyaml`"
 
@@ -61,31 +63,25 @@ def collect_endpoints(config: Dict[str, object]) -> Iterable[Endpoint]:
             slot_to_agents.setdefault(slot, []).append(agent_id)
 
     if endpoint_map:
-        for slot, url in endpoint_map.items():
-            yield Endpoint(slot=str(slot), url=str(url), agent_ids=slot_to_agents.get(str(slot), []))
+        for slot, value in endpoint_map.items():
+            agent_ids = slot_to_agents.get(str(slot), [])
+            if isinstance(value, list):
+                for index, url in enumerate(value):
+                    yield Endpoint(slot=f"{slot}[{index}]", url=str(url), agent_ids=agent_ids)
+            else:
+                yield Endpoint(slot=str(slot), url=str(value), agent_ids=agent_ids)
     else:
         default_endpoint = experiment.get("endpoint")
         if default_endpoint:
             yield Endpoint(slot="default", url=str(default_endpoint), agent_ids=[cfg for agent_list in slot_to_agents.values() for cfg in agent_list] or [agent.get("agent_id") for agent in agents if isinstance(agent, dict)])
 
 
-def ping(url: str, timeout: float = 3.0) -> tuple[bool, Optional[str], float]:
-    req = urllib.request.Request(url=url.rstrip("/") + "/health", method="GET")
-    start = time.time()
-    try:
-        with urllib.request.urlopen(req, timeout=timeout) as resp:
-            body = resp.read()
-            elapsed = time.time() - start
-            return True, body.decode("utf-8", errors="replace"), elapsed
-    except urllib.error.URLError as exc:  # pragma: no cover - depends on environment
-        return False, str(exc), time.time() - start
-
-
 def main(argv: Optional[list[str]] = None) -> int:
     parser = argparse.ArgumentParser(description="Check model endpoint availability")
     parser.add_argument("--config", required=True, help="Experiment config (YAML/JSON)")
     parser.add_argument("--timeout", type=float, default=3.0, help="Request timeout (sec)")
     parser.add_argument("--list", action="store_true", help="Only list endpoints without pinging")
+    parser.add_argument("--models", action="store_true", help="Also list models served by each endpoint")
     args = parser.parse_args(argv)
 
     config_path = Path(args.config)
@@ -107,6 +103,9 @@ def main(argv: Optional[list[str]] = None) -> int:
         status = "OK" if ok else "FAIL"
         extra = info or ""
         print(f"- {endpoint.slot}: {endpoint.url} [{status}] {elapsed:.2f}s {extra}")
+        if args.models:
+            models = list_models(endpoint.url, timeout=args.timeout)
+            print(f"  models: {', '.join(models) if models is not None else '(unavailable)'}")
 
     return 0
 
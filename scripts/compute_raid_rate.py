@@ -9,20 +9,14 @@ Outputs overall rate and per-agent choices.
 from __future__ import annotations
 
 import argparse
-import json
 from pathlib import Path
 from typing import Dict, List
 
+from src.utils.event_log import load_events
+
 
 def load_entries(path: Path) -> List[dict]:
-    entries: List[dict] = []
-    with path.open("r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            entries.append(json.loads(line))
-    return entries
+    return load_events(path, fields=("turn", "phase", "agent", "decision"))
 
 
 def main() -> None:
@@ -0,0 +1,155 @@
+"""Batch-evaluate every run under a results tree with a process pool and cache.
+
+Usage:
+  python -m scripts.evaluate_archives results/vow-cultural-drift \
+      --rules rules.json --workers 8 --out results/vow-cultural-drift/metrics_table.csv
+
+Each ``MetricsResult`` is cached under ``--cache-dir`` keyed by
+(log digest, rules fingerprint, EVALUATOR_VERSION), so re-running after an
+``EvaluationRules`` change recomputes only what the change affects and an
+unchanged tree is served entirely from the cache.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+from scripts.warehouse import find_run_dirs
+from src.metrics import EVALUATOR_VERSION, EvaluationRules, Evaluator
+from src.utils.config import get_section, load_config
+from src.utils.event_log import log_digest
+
+TABLE_COLUMNS = (
+    "run_dir",
+    "cooperation_rate",
+    "average_recovery_time",
+    "message_action_mismatch_rate",
+    "gini_coefficient",
+    "dialogue_entropy",
+    "pre_coop",
+    "shock_coop",
+    "post_coop",
+    "post_trust",
+    "total_events",
+    "cache_hit",
+)
+
+
+def cache_key(digest: str, rules: EvaluationRules) -> str:
+    raw = f"{digest}:{rules.fingerprint()}:{EVALUATOR_VERSION}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _evaluate(log_path: str, rules_json: Mapping[str, Any]) -> Dict[str, Any]:
+    evaluator = Evaluator(EvaluationRules.from_mapping(rules_json))
+    return evaluator.evaluate(Path(log_path)).to_json()
+
+
+def _window(metrics: Mapping[str, Any], key: str, metric: str) -> Optional[float]:
+    block = (metrics.get("shock_windows") or {}).get(key)
+    return block.get(metric) if isinstance(block, Mapping) else None
+
+
+def _table_row(run_dir: Path, metrics: Mapping[str, Any], hit: bool) -> Dict[str, Any]:
+    return {
+        "run_dir": str(run_dir),
+        "cooperation_rate": metrics.get("cooperation_rate"),
+        "average_recovery_time": metrics.get("average_recovery_time"),
+        "message_action_mismatch_rate": metrics.get("message_action_mismatch_rate"),
+        "gini_coefficient": metrics.get("gini_coefficient"),
+        "dialogue_entropy": metrics.get("dialogue_entropy"),
+        "pre_coop": _window(metrics, "pre_shock", "cooperation_rate"),
+        "shock_coop": _window(metrics, "shock", "cooperation_rate"),
+        "post_coop": _window(metrics, "post_shock", "cooperation_rate"),
+        "post_trust": _window(metrics, "post_shock", "mean_trust"),
+        "total_events": metrics.get("total_events"),
+        "cache_hit": int(hit),
+    }
+
+
+def evaluate_tree(
+    roots: List[Path],
+    rules: EvaluationRules,
+    cache_dir: Path,
+    *,
+    workers: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Evaluate all runs under ``roots``; return aggregated table rows."""
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    run_dirs = list(find_run_dirs(roots))
+    cached: Dict[Path, Dict[str, Any]] = {}
+    pending: Dict[Path, Path] = {}
+    for run_dir in run_dirs:
+        cache_path = cache_dir / f"{cache_key(log_digest(run_dir / 'events.jsonl'), rules)}.json"
+        if cache_path.exists():
+            cached[run_dir] = json.loads(cache_path.read_text(encoding="utf-8"))
+        else:
+            pending[run_dir] = cache_path
+
+    computed: Dict[Path, Dict[str, Any]] = {}
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                run_dir: pool.submit(_evaluate, str(run_dir / "events.jsonl"), rules.to_json())
+                for run_dir in pending
+            }
+            for run_dir, future in futures.items():
+                metrics = future.result()
+                pending[run_dir].write_text(
+                    json.dumps(metrics, ensure_ascii=False), encoding="utf-8"
+                )
+                computed[run_dir] = metrics
+
+    rows: List[Dict[str, Any]] = []
+    for run_dir in run_dirs:
+        hit = run_dir in cached
+        rows.append(_table_row(run_dir, cached[run_dir] if hit else computed[run_dir], hit))
+    return rows
+
+
+def write_table(rows: List[Dict[str, Any]], out_path: Path) -> None:
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("w", newline="", encoding="utf-8") as handle:
+        writer = csv.DictWriter(handle, fieldnames=TABLE_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _load_rules(config: Optional[str], rules_path: Optional[str]) -> EvaluationRules:
+    mapping: Dict[str, Any] = {}
+    if config:
+        mapping.update(get_section(load_config(Path(config)), "evaluation"))
+    if rules_path:
+        mapping.update(json.loads(Path(rules_path).read_text(encoding="utf-8")))
+    return EvaluationRules.from_mapping(mapping)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Evaluate all archived runs in parallel")
+    parser.add_argument("roots", nargs="+", help="Result directories to scan")
+    parser.add_argument("--config", help="Experiment config whose evaluation section seeds the rules")
+    parser.add_argument("--rules", help="JSON file overriding evaluation rules")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Process pool size")
+    parser.add_argument("--cache-dir", help="Cache directory (default: <first root>/.metrics_cache)")
+    parser.add_argument("--out", help="Aggregated CSV path (default: <first root>/metrics_table.csv)")
+    args = parser.parse_args()
+
+    roots = [Path(root) for root in args.roots]
+    rules = _load_rules(args.config, args.rules)
+    cache_dir = Path(args.cache_dir) if args.cache_dir else roots[0] / ".metrics_cache"
+    out_path = Path(args.out) if args.out else roots[0] / "metrics_table.csv"
+
+    rows = evaluate_tree(roots, rules, cache_dir, workers=args.workers)
+    write_table(rows, out_path)
+    hits = sum(row["cache_hit"] for row in rows)
+    print(json.dumps({"runs": len(rows), "cache_hits": hits, "output": str(out_path)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+"""Compare estimated history prompt tokens of each encoder on an existing log.
+
+Usage:
+  python -m scripts.history_tokens results/vow-long-run/events.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+
+from src.simulator.history import HISTORY_ENCODERS, history_token_report, records_from_log
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Estimate history tokens per encoder")
+    parser.add_argument("log", help="Path to events.jsonl")
+    parser.add_argument(
+        "--encoders",
+        nargs="+",
+        choices=sorted(HISTORY_ENCODERS),
+        help="Encoders to compare (default: all registered)",
+    )
+    parser.add_argument("--window", type=int, help="history_window of the run (default: full history)")
+    args = parser.parse_args()
+    report = history_token_report(records_from_log(Path(args.log)), args.encoders, args.window)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,36 +9,68 @@ Usage:
   python3 scripts/make_table_core_stats.py \
     --csv results/vow-cultural-drift/run_summary.csv \
     --out papers/vow-shock-study/figures/table2_core_stats.svg
+
+  # or straight from the results warehouse (scripts/warehouse.py)
+  python3 scripts/make_table_core_stats.py \
+    --db results/warehouse.sqlite --experiment vow-cultural-drift \
+    --out papers/vow-shock-study/figures/table2_core_stats.svg
+
+  # bootstrap 95% CIs in the cells plus permutation tests vs. baseline (NumPy)
+  python -m scripts.make_table_core_stats --csv ... --out ... \
+    --ci --stats-out papers/vow-shock-study/figures/table2_core_stats.json
 """
 from __future__ import annotations
-import argparse, csv, statistics as stats
+import argparse, csv, json, sqlite3, statistics as stats
 
 ORDER = ["soft", "baseline", "double", "extended"]
+METRICS = ["cooperation_rate", "average_recovery_time", "post_shock_trust"]
 LABEL = {"soft":"Soft","baseline":"Baseline","double":"Double","extended":"Extended"}
 
+WAREHOUSE_QUERY = """
+SELECT r.variant AS variant,
+       m.cooperation_rate AS cooperation_rate,
+       m.average_recovery_time AS average_recovery_time,
+       m.post_trust AS post_shock_trust
+FROM run_metrics m JOIN runs r USING (run_id)
+WHERE (? IS NULL OR r.experiment = ?)
+"""
+
 def read_rows(path):
-    rows = []
     with open(path, newline="", encoding="utf-8") as f:
-        for row in csv.DictReader(f):
-            r = {k.strip().lower(): (v.strip() if isinstance(v,str) else v) for k,v in row.items()}
-            var = (r.get("variant") or r.get("condition") or "").lower()
-            if "soft" in var: var = "soft"
-            elif "double" in var: var = "double"
-            elif "extend" in var: var = "extended"
-            elif "base" in var or "single" in var: var = "baseline"
-            def num(k):
-                v = r.get(k)
-                if not v: return None
-                try:
-                    return float(v.replace('%',''))/100.0 if '%' in v else float(v)
-                except Exception:
-                    return None
-            rows.append({
-                "variant": var,
-                "cooperation_rate": num("cooperation_rate"),
-                "average_recovery_time": num("average_recovery_time"),
-                "post_shock_trust": num("post_shock_trust"),
-            })
+        return normalize_rows(csv.DictReader(f))
+
+def read_rows_db(db_path, experiment=None):
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.execute(WAREHOUSE_QUERY, (experiment, experiment))
+        names = [d[0] for d in cur.description]
+        raw = [{k: ("" if v is None else str(v)) for k, v in zip(names, rec)} for rec in cur]
+    finally:
+        conn.close()
+    return normalize_rows(raw)
+
+def normalize_rows(raw_rows):
+    rows = []
+    for row in raw_rows:
+        r = {k.strip().lower(): (v.strip() if isinstance(v,str) else v) for k,v in row.items()}
+        var = (r.get("variant") or r.get("condition") or "").lower()
+        if "soft" in var: var = "soft"
+        elif "double" in var: var = "double"
+        elif "extend" in var: var = "extended"
+        elif "base" in var or "single" in var: var = "baseline"
+        def num(k):
+            v = r.get(k)
+            if not v: return None
+            try:
+                return float(v.replace('%',''))/100.0 if '%' in v else float(v)
+            except Exception:
+                return None
+        rows.append({
+            "variant": var,
+            "cooperation_rate": num("cooperation_rate"),
+            "average_recovery_time": num("average_recovery_time"),
+            "post_shock_trust": num("post_shock_trust"),
+        })
     return rows
 
 def agg(rows, key):
@@ -51,14 +83,42 @@ def agg(rows, key):
             vals[v] = (m, sd, len(xs))
     return vals
 
+def resampled_stats(rows, resamples=10000, seed=0):
+    """Bootstrap CIs per (variant, metric) and permutation tests vs. baseline."""
+    from src.resampling import bootstrap_ci, compare_to_reference, group_samples
+    samples = group_samples(rows, METRICS)
+    cis = bootstrap_ci(samples, resamples=resamples, seed=seed)
+    tests = compare_to_reference(samples, "baseline", resamples=resamples, seed=seed)
+    out = {"resamples": resamples, "seed": seed, "reference": "baseline", "variants": {}}
+    for (var, metric), ci in cis.items():
+        entry = out["variants"].setdefault(var, {}).setdefault(metric, {})
+        entry["bootstrap_ci"] = ci.to_json()
+        if (var, metric) in tests:
+            entry["permutation_vs_reference"] = tests[(var, metric)].to_json()
+    return out
+
+def ci_agg(stats_out, key):
+    vals = {}
+    for v in ORDER:
+        ci = stats_out["variants"].get(v, {}).get(key, {}).get("bootstrap_ci")
+        if ci:
+            vals[v] = (ci["mean"], ci["low"], ci["high"])
+    return vals
+
 def fmt(m, sd):
     # Rates with 3 decimals, times with 2 decimals (heuristic)
     return f"{m:.3f}±{sd:.3f}" if m<=1.0 else f"{m:.2f}±{sd:.2f}"
 
-def build_svg(rows):
-    coop = agg(rows, "cooperation_rate")
-    rec = agg(rows, "average_recovery_time")
-    trust = agg(rows, "post_shock_trust")
+def fmt_ci(m, lo, hi):
+    return f"{m:.3f} [{lo:.3f}, {hi:.3f}]" if m<=1.0 else f"{m:.2f} [{lo:.2f}, {hi:.2f}]"
+
+def build_svg(rows, stats_out=None):
+    if stats_out:
+        coop, rec, trust = (ci_agg(stats_out, k) for k in METRICS)
+        cell, tag = fmt_ci, "mean [95% CI]"
+    else:
+        coop, rec, trust = (agg(rows, k) for k in METRICS)
+        cell, tag = (lambda m, sd, n: fmt(m, sd)), "mean±SD"
     # layout
     W, H = 900, 200
     col_w = [180, 220, 240, 260]
@@ -69,7 +129,7 @@ def build_svg(rows):
     svg = [f'<svg xmlns="http://www.w3.org/2000/svg" width="{W}" height="{H}" viewBox="0 0 {W} {H}">']
     svg.append('<style>.h{font:700 18px Arial}.c{font:16px Arial}.grid{stroke:#000;fill:#fff}.head{fill:#e9e9e9}</style>')
     # headers
-    headers = ["Variant","cooperation_rate (mean±SD)","average_recovery_time (mean±SD)","post_shock_trust (mean±SD)"]
+    headers = ["Variant"] + [f"{k} ({tag})" for k in METRICS]
     y=0
     for i,w in enumerate(col_w):
         svg.append(f'<rect x="{x[i]}" y="{y}" width="{w}" height="40" class="grid head"/>')
@@ -84,22 +144,34 @@ def build_svg(rows):
         svg.append(f'<rect x="{x[3]}" y="{y}" width="{col_w[3]}" height="{row_h}" class="grid"/>')
         svg.append(f'<text x="{col_w[0]/2}" y="{y+24}" text-anchor="middle" class="c">{LABEL[v]}</text>')
         if v in coop:
-            svg.append(f'<text x="{x[1]+col_w[1]/2}" y="{y+24}" text-anchor="middle" class="c">{fmt(*coop[v][:2])}</text>')
+            svg.append(f'<text x="{x[1]+col_w[1]/2}" y="{y+24}" text-anchor="middle" class="c">{cell(*coop[v])}</text>')
         if v in rec:
-            svg.append(f'<text x="{x[2]+col_w[2]/2}" y="{y+24}" text-anchor="middle" class="c">{fmt(*rec[v][:2])}</text>')
+            svg.append(f'<text x="{x[2]+col_w[2]/2}" y="{y+24}" text-anchor="middle" class="c">{cell(*rec[v])}</text>')
         if v in trust:
-            svg.append(f'<text x="{x[3]+col_w[3]/2}" y="{y+24}" text-anchor="middle" class="c">{fmt(*trust[v][:2])}</text>')
+            svg.append(f'<text x="{x[3]+col_w[3]/2}" y="{y+24}" text-anchor="middle" class="c">{cell(*trust[v])}</text>')
         y+=row_h
     svg.append('</svg>')
     return "\n".join(svg)
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True)
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--csv")
+    src.add_argument("--db", help="SQLite warehouse built by scripts/warehouse.py")
+    ap.add_argument("--experiment", help="Experiment filter for --db")
     ap.add_argument("--out", required=True)
+    ap.add_argument("--ci", action="store_true", help="Show bootstrap 95%% CIs instead of SD (needs NumPy)")
+    ap.add_argument("--stats-out", help="Write bootstrap CIs and permutation tests vs. baseline as JSON")
+    ap.add_argument("--resamples", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=0)
     args = ap.parse_args()
-    rows = read_rows(args.csv)
-    svg = build_svg(rows)
+    rows = read_rows_db(args.db, args.experiment) if args.db else read_rows(args.csv)
+    stats_out = resampled_stats(rows, args.resamples, args.seed) if (args.ci or args.stats_out) else None
+    if args.stats_out:
+        with open(args.stats_out, "w", encoding="utf-8") as f:
+            json.dump(stats_out, f, indent=2)
+        print("Saved:", args.stats_out)
+    svg = build_svg(rows, stats_out if args.ci else None)
     with open(args.out, "w", encoding="utf-8") as f:
         f.write(svg)
     print("Saved:", args.out)
@@ -7,6 +7,8 @@ Inputs
   --csv <path>   : run_summary.csv containing columns
                    variant, cooperation_rate, average_recovery_time,
                    post_shock_trust, message_action_mismatch
+  --db <path>    : alternatively, the SQLite warehouse built by
+                   scripts/warehouse.py (optionally with --experiment)
   --out <dir>    : output directory for SVGs
 
 Outputs
@@ -19,11 +21,11 @@ Usage
     --csv results/vow-cultural-drift/run_summary.csv \
     --out papers/vow-shock-study/figures
 
-No third-party packages required (uses csv & math only).
+No third-party packages required (uses csv, sqlite3 & math only).
 """
 
 from __future__ import annotations
-import argparse, csv, math, os, statistics as stats
+import argparse, csv, math, os, sqlite3, statistics as stats
 from collections import defaultdict
 
 
@@ -36,50 +38,79 @@ LABELS = {
 }
 
 
+WAREHOUSE_QUERY = """
+SELECT r.variant AS variant,
+       m.cooperation_rate AS cooperation_rate,
+       m.average_recovery_time AS average_recovery_time,
+       m.post_trust AS post_shock_trust,
+       m.message_action_mismatch_rate AS message_action_mismatch
+FROM run_metrics m JOIN runs r USING (run_id)
+WHERE (? IS NULL OR r.experiment = ?)
+"""
+
+
 def read_summary(path: str):
-    rows = []
     with open(path, newline="", encoding="utf-8") as f:
-        for i, row in enumerate(csv.DictReader(f)):
-            # normalize keys
-            r = {k.strip().lower(): v for k, v in row.items()}
-            # robust variant normalization
-            vraw = (r.get("variant") or r.get("condition") or "").strip().lower()
-            if "soft" in vraw:
-                variant = "soft"
-            elif "double" in vraw:
-                variant = "double"
-            elif "extend" in vraw:
-                variant = "extended"
-            elif "base" in vraw or "single" in vraw:
-                variant = "baseline"
-            else:
-                variant = vraw or f"row{i}"
-
-            def parse_float(key: str):
-                val = r.get(key) or r.get(key.replace("_", ""))
-                if val is None or val == "":
-                    return None
+        return normalize_rows(csv.DictReader(f))
+
+
+def read_summary_db(db_path: str, experiment: str | None = None):
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.execute(WAREHOUSE_QUERY, (experiment, experiment))
+        names = [d[0] for d in cur.description]
+        raw = [
+            {k: ("" if v is None else str(v)) for k, v in zip(names, rec)}
+            for rec in cur
+        ]
+    finally:
+        conn.close()
+    return normalize_rows(raw)
+
+
+def normalize_rows(raw_rows):
+    rows = []
+    for i, row in enumerate(raw_rows):
+        # normalize keys
+        r = {k.strip().lower(): v for k, v in row.items()}
+        # robust variant normalization
+        vraw = (r.get("variant") or r.get("condition") or "").strip().lower()
+        if "soft" in vraw:
+            variant = "soft"
+        elif "double" in vraw:
+            variant = "double"
+        elif "extend" in vraw:
+            variant = "extended"
+        elif "base" in vraw or "single" in vraw:
+            variant = "baseline"
+        else:
+            variant = vraw or f"row{i}"
+
+        def parse_float(key: str):
+            val = r.get(key) or r.get(key.replace("_", ""))
+            if val is None or val == "":
+                return None
+            try:
+                return float(val)
+            except Exception:
                 try:
-                    return float(val)
+                    return float(val.replace("%", "")) / (
+                        100.0 if "%" in val else 1.0
+                    )
                 except Exception:
-                    try:
-                        return float(val.replace("%", "")) / (
-                            100.0 if "%" in val else 1.0
-                        )
-                    except Exception:
-                        return None
-
-            rows.append(
-                {
-                    "variant": variant,
-                    "cooperation_rate": parse_float("cooperation_rate"),
-                    "average_recovery_time": parse_float("average_recovery_time"),
-                    "post_shock_trust": parse_float("post_shock_trust"),
-                    "message_action_mismatch": parse_float(
-                        "message_action_mismatch"
-                    ),
-                }
-            )
+                    return None
+
+        rows.append(
+            {
+                "variant": variant,
+                "cooperation_rate": parse_float("cooperation_rate"),
+                "average_recovery_time": parse_float("average_recovery_time"),
+                "post_shock_trust": parse_float("post_shock_trust"),
+                "message_action_mismatch": parse_float(
+                    "message_action_mismatch"
+                ),
+            }
+        )
     return rows
 
 
@@ -280,13 +311,16 @@ def save_fig4_box(path_out, rows):
 
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--csv", required=True)
+    source = ap.add_mutually_exclusive_group(required=True)
+    source.add_argument("--csv")
+    source.add_argument("--db", help="SQLite warehouse built by scripts/warehouse.py")
+    ap.add_argument("--experiment", help="Experiment filter for --db")
     ap.add_argument("--out", required=True)
     args = ap.parse_args()
     os.makedirs(args.out, exist_ok=True)
-    rows = read_summary(args.csv)
+    rows = read_summary_db(args.db, args.experiment) if args.db else read_summary(args.csv)
     if not rows:
-        raise SystemExit("No rows found in CSV. Check input path or headers.")
+        raise SystemExit("No rows found in CSV/DB. Check input path or headers.")
     save_fig3_bars(args.out, rows)
     save_fig4_box(args.out, rows)
     print("Saved:")
@@ -8,6 +8,12 @@ python3 scripts/run_series.py \
     --variant double-wave \
     --runs 3 \
     --tag double_shock
+
+# adaptive: interleave variants, stop each once the cooperation_rate
+# 95% CI half-width is below 0.03 (at most 20 runs per variant)
+python3 scripts/run_series.py \
+    --config experiments/vow-cultural-drift/config.yaml \
+    --variant baseline double-wave --adaptive --runs 20 --ci-half-width 0.03
 ```
 """
 from __future__ import annotations
@@ -16,17 +22,23 @@ import argparse
 import copy
 import csv
 import json
+import math
 import subprocess
 import sys
 import tempfile
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any, Dict, Iterable, List
 
 import yaml
 
 from scripts.archive_latest import archive as archive_outputs
+from src.resampling import RunningInterval
 from src.utils.config import resolve_path
+from src.utils.event_log import iter_events, sidecar_paths
+
+# Metric families behind the run_summary.csv columns (see src.metrics.METRIC_FAMILIES).
+SERIES_METRIC_FAMILIES = ("cooperation", "alignment", "shock_windows")
 
 
 @dataclass
@@ -50,6 +62,14 @@ class RunSummary:
     unknown_rate: float
 
 
+# Numeric per-run metrics an adaptive sweep can track (identifiers excluded).
+ADAPTIVE_METRICS = tuple(
+    name
+    for name, spec in RunSummary.__dataclass_fields__.items()
+    if str(spec.type).startswith("float")
+)
+
+
 def load_config(path: Path) -> Dict[str, Any]:
     with path.open("r", encoding="utf-8") as handle:
         return yaml.safe_load(handle)
@@ -134,14 +154,10 @@ def _prepare_phases(original_phases: List[Dict[str, Any]], variant: Dict[str, An
 def _count_unknown(log_path: Path) -> tuple[int, int]:
     total = 0
     unknown = 0
-    with log_path.open(encoding="utf-8") as handle:
-        for line in handle:
-            if not line.strip():
-                continue
-            total += 1
-            data = json.loads(line)
-            if str(data.get("decision", "")).upper() == "UNKNOWN":
-                unknown += 1
+    for data in iter_events(log_path, fields=("decision",)):
+        total += 1
+        if str(data.get("decision", "")).upper() == "UNKNOWN":
+            unknown += 1
     return total, unknown
 
 
@@ -201,96 +217,277 @@ def _append_summary(summary_csv: Path, row: RunSummary) -> None:
         )
 
 
+@dataclass
+class SeriesContext:
+    config_data: Dict[str, Any]
+    repo_root: Path
+    log_path: Path
+    metrics_path: Path
+    python_bin: Path
+    compress_archives: bool = False
+    summary_metrics_only: bool = False
+
+    @property
+    def results_dir(self) -> Path:
+        return self.log_path.parent
+
+    @property
+    def summary_csv(self) -> Path:
+        return self.results_dir / "run_summary.csv"
+
+
+@dataclass
+class VariantPlan:
+    variant_id: str
+    label: str
+    phases: List[Dict[str, Any]]
+    runs: int = 0
+    intervals: Dict[str, RunningInterval] = field(default_factory=dict)
+    stop_reason: str | None = None
+
+    def widest(self, target: float) -> float:
+        """Largest CI half-width relative to ``target`` across tracked metrics."""
+        return max((interval.half_width / target for interval in self.intervals.values()), default=math.inf)
+
+
+def _plan_variant(config_data: Dict[str, Any], variant_id: str, tag: str | None) -> VariantPlan:
+    variant = _resolve_variant(config_data, variant_id)
+    phases = config_data.get("scenario", {}).get("phases")
+    if not isinstance(phases, list):
+        raise ValueError("scenario.phases must be a list")
+    label = str(variant.get("label") or variant.get("id") or variant_id)
+    if tag:
+        label = f"{label} ({tag})"
+    return VariantPlan(variant_id=variant_id, label=label, phases=_prepare_phases(phases, variant))
+
+
+def _execute_run(ctx: SeriesContext, plan: VariantPlan, run_index: int, seed: int) -> RunSummary:
+    run_config = copy.deepcopy(ctx.config_data)
+    run_config.setdefault("experiment", {})["seed"] = seed
+    run_config["experiment"]["log_path"] = str(ctx.log_path)
+    run_config["experiment"]["metrics_path"] = str(ctx.metrics_path)
+    run_config.setdefault("scenario", {})["phases"] = copy.deepcopy(plan.phases)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        temp_path = Path(tmpdir) / "run-config.yaml"
+        save_config(run_config, temp_path)
+
+        # Reset log/metrics to avoid mixing runs
+        ctx.results_dir.mkdir(parents=True, exist_ok=True)
+        ctx.log_path.write_text("", encoding="utf-8")
+        for sidecar in sidecar_paths(ctx.log_path):
+            sidecar.unlink()
+        ctx.metrics_path.write_text("", encoding="utf-8")
+
+        run_cmd = [str(ctx.python_bin), "-m", "src.run", "--config", str(temp_path)]
+        _run_subprocess(run_cmd, cwd=ctx.repo_root)
+
+        metrics_cmd = [str(ctx.python_bin), "-m", "src.metrics", "--config", str(temp_path)]
+        if ctx.summary_metrics_only:
+            metrics_cmd += ["--families", ",".join(SERIES_METRIC_FAMILIES)]
+        _run_subprocess(metrics_cmd, cwd=ctx.repo_root)
+
+    archive_dir = archive_outputs(ctx.results_dir, compress=ctx.compress_archives)
+
+    metrics_data = json.loads((archive_dir / "metrics.json").read_text(encoding="utf-8"))
+    shock_window = metrics_data.get("shock_windows", {})
+    row = RunSummary(
+        timestamp=archive_dir.name.replace("run-", ""),
+        variant=plan.label,
+        run_index=run_index,
+        seed=seed,
+        log_path=archive_dir / "events.jsonl",
+        metrics_path=archive_dir / "metrics.json",
+        cooperation_rate=float(metrics_data.get("cooperation_rate", 0.0)),
+        average_recovery_time=metrics_data.get("average_recovery_time"),
+        mismatch_rate=float(metrics_data.get("message_action_mismatch_rate", 0.0)),
+        pre_coop=_extract_window_value(shock_window, "pre_shock", "cooperation_rate"),
+        shock_coop=_extract_window_value(shock_window, "shock", "cooperation_rate"),
+        post_coop=_extract_window_value(shock_window, "post_shock", "cooperation_rate"),
+        post_coop_extended=_extract_window_value(shock_window, "post_shock_extended", "cooperation_rate"),
+        pre_trust=_extract_window_value(shock_window, "pre_shock", "mean_trust"),
+        shock_trust=_extract_window_value(shock_window, "shock", "mean_trust"),
+        post_trust=_extract_window_value(shock_window, "post_shock", "mean_trust"),
+        unknown_rate=_compute_unknown_rate(archive_dir / "events.jsonl"),
+    )
+    _append_summary(ctx.summary_csv, row)
+    print(f"[{plan.label}] run {run_index + 1} archived at {archive_dir}")
+    print(f"  Cooperation rate: {row.cooperation_rate:.3f}")
+    print(f"  Unknown rate: {row.unknown_rate:.2f}%")
+    return row
+
+
+def _next_adaptive(
+    plans: List[VariantPlan],
+    *,
+    min_runs: int,
+    max_runs: int,
+    target: float,
+) -> VariantPlan | None:
+    """Pick the next variant to run, or None once every variant has stopped.
+
+    Variants below ``min_runs`` go first (fewest runs first); after that the
+    variant whose widest interval is furthest above ``target`` is scheduled.
+    """
+    active: List[VariantPlan] = []
+    for plan in plans:
+        if plan.stop_reason is not None:
+            continue
+        if plan.runs >= min_runs and plan.widest(target) <= 1.0:
+            plan.stop_reason = "converged"
+        elif plan.runs >= max_runs:
+            plan.stop_reason = "max_runs"
+        else:
+            active.append(plan)
+    if not active:
+        return None
+    warming = [plan for plan in active if plan.runs < min_runs]
+    if warming:
+        return min(warming, key=lambda plan: plan.runs)
+    return max(active, key=lambda plan: plan.widest(target))
+
+
+def run_adaptive(
+    ctx: SeriesContext,
+    plans: List[VariantPlan],
+    *,
+    base_seed: int,
+    metrics: List[str],
+    target: float,
+    min_runs: int,
+    max_runs: int,
+    budget: int | None = None,
+    confidence: float = 0.95,
+) -> Dict[str, Any]:
+    """Run seeds until every variant's CI half-width is below ``target`` or caps are hit."""
+    for plan in plans:
+        plan.intervals = {metric: RunningInterval(confidence) for metric in metrics}
+    total = 0
+    while budget is None or total < budget:
+        plan = _next_adaptive(plans, min_runs=min_runs, max_runs=max_runs, target=target)
+        if plan is None:
+            break
+        row = _execute_run(ctx, plan, plan.runs, base_seed + plan.runs)
+        plan.runs += 1
+        total += 1
+        for metric, interval in plan.intervals.items():
+            interval.add(getattr(row, metric))
+        widths = ", ".join(
+            f"{metric}={interval.mean:.3f}±{interval.half_width:.3f}"
+            for metric, interval in plan.intervals.items()
+        )
+        print(f"  Running CI: {widths}")
+    for plan in plans:
+        if plan.stop_reason is None:
+            plan.stop_reason = "budget"
+    report = {
+        "target_half_width": target,
+        "confidence": confidence,
+        "min_runs": min_runs,
+        "max_runs": max_runs,
+        "budget": budget,
+        "total_runs": total,
+        "variants": {
+            plan.variant_id: {
+                "label": plan.label,
+                "runs": plan.runs,
+                "stop_reason": plan.stop_reason,
+                "metrics": {metric: interval.to_json() for metric, interval in plan.intervals.items()},
+            }
+            for plan in plans
+        },
+    }
+    report_path = ctx.results_dir / "adaptive_sweep.json"
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Adaptive sweep report written to {report_path}")
+    return report
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Run repeated VoW experiments with shock variants")
     parser.add_argument("--config", required=True, help="Path to experiment config YAML")
-    parser.add_argument("--variant", required=True, help="shock_variants id to apply")
+    parser.add_argument(
+        "--variant",
+        required=True,
+        nargs="+",
+        help="shock_variants id(s) to apply (several ids are run one after another, or interleaved with --adaptive)",
+    )
     parser.add_argument("--runs", type=int, default=1, help="Number of repetitions")
     parser.add_argument("--seed-offset", type=int, default=0, help="Seed offset per run (added to base seed + index)")
     parser.add_argument("--tag", default=None, help="Optional label to prefix archived runs")
+    parser.add_argument(
+        "--compress-archives",
+        action="store_true",
+        help="Archive events.jsonl as a framed, turn-indexed events.jsonl.gz",
+    )
+    parser.add_argument(
+        "--summary-metrics-only",
+        action="store_true",
+        help="Compute only the metric families behind run_summary.csv (archived metrics.json is partial)",
+    )
+    adaptive = parser.add_argument_group("adaptive sweep")
+    adaptive.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Stop each variant once its CI is narrow enough; --runs becomes the per-variant maximum",
+    )
+    adaptive.add_argument(
+        "--adaptive-metrics",
+        default="cooperation_rate",
+        help="Comma-separated run_summary columns tracked for convergence",
+    )
+    adaptive.add_argument("--ci-half-width", type=float, default=0.05, help="Target CI half-width")
+    adaptive.add_argument("--confidence", type=float, default=0.95, help="CI confidence level")
+    adaptive.add_argument("--min-runs", type=int, default=5, help="Runs per variant before stopping is considered")
+    adaptive.add_argument("--budget", type=int, default=None, help="Total run budget across variants")
     parser.add_argument("--python", default=str(Path('.venv/bin/python')), help="Python interpreter to invoke for CLI calls")
     args = parser.parse_args()
 
     config_path = Path(args.config).resolve()
-    repo_root = config_path.resolve().parents[2]
     config_data = load_config(config_path)
-    variant = _resolve_variant(config_data, args.variant)
-
-    scenario = config_data.get("scenario", {})
-    phases = scenario.get("phases")
-    if not isinstance(phases, list):
-        raise ValueError("scenario.phases must be a list")
-
-    new_phases = _prepare_phases(phases, variant)
-    variant_label = str(variant.get("label") or variant.get("id") or args.variant)
-    if args.tag:
-        variant_label = f"{variant_label} ({args.tag})"
+    plans = [_plan_variant(config_data, variant_id, args.tag) for variant_id in args.variant]
 
     experiment_cfg = config_data.get("experiment", {})
-    base_seed = int(experiment_cfg.get("seed", 0))
-
-    log_path = resolve_path(config_path.parent, experiment_cfg.get("log_path", "results/events.jsonl"))
-    metrics_path = resolve_path(config_path.parent, experiment_cfg.get("metrics_path", "results/metrics.json"))
-    results_dir = log_path.parent
-    summary_csv = results_dir / "run_summary.csv"
+    base_seed = int(experiment_cfg.get("seed", 0)) + args.seed_offset
 
     python_bin = Path(args.python)
     if not python_bin.exists():
         python_bin = Path(sys.executable)
-
-    for run_index in range(args.runs):
-        seed = base_seed + args.seed_offset + run_index
-        run_config = copy.deepcopy(config_data)
-        run_config.setdefault("experiment", {})["seed"] = seed
-        run_config["experiment"]["log_path"] = str(log_path)
-        run_config["experiment"]["metrics_path"] = str(metrics_path)
-        run_config.setdefault("scenario", {})["phases"] = copy.deepcopy(new_phases)
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            temp_path = Path(tmpdir) / "run-config.yaml"
-            save_config(run_config, temp_path)
-
-            # Reset log/metrics to avoid mixing runs
-            results_dir.mkdir(parents=True, exist_ok=True)
-            log_path.write_text("", encoding="utf-8")
-            metrics_path.write_text("", encoding="utf-8")
-
-            run_cmd = [str(python_bin), "-m", "src.run", "--config", str(temp_path)]
-            _run_subprocess(run_cmd, cwd=repo_root)
-
-            metrics_cmd = [str(python_bin), "-m", "src.metrics", "--config", str(temp_path)]
-            _run_subprocess(metrics_cmd, cwd=repo_root)
-
-        archive_dir = archive_outputs(results_dir)
-
-        metrics_data = json.loads((archive_dir / "metrics.json").read_text(encoding="utf-8"))
-        shock_window = metrics_data.get("shock_windows", {})
-        row = RunSummary(
-            timestamp=archive_dir.name.replace("run-", ""),
-            variant=variant_label,
-            run_index=run_index,
-            seed=seed,
-            log_path=archive_dir / "events.jsonl",
-            metrics_path=archive_dir / "metrics.json",
-            cooperation_rate=float(metrics_data.get("cooperation_rate", 0.0)),
-            average_recovery_time=metrics_data.get("average_recovery_time"),
-            mismatch_rate=float(metrics_data.get("message_action_mismatch_rate", 0.0)),
-            pre_coop=_extract_window_value(shock_window, "pre_shock", "cooperation_rate"),
-            shock_coop=_extract_window_value(shock_window, "shock", "cooperation_rate"),
-            post_coop=_extract_window_value(shock_window, "post_shock", "cooperation_rate"),
-            post_coop_extended=_extract_window_value(shock_window, "post_shock_extended", "cooperation_rate"),
-            pre_trust=_extract_window_value(shock_window, "pre_shock", "mean_trust"),
-            shock_trust=_extract_window_value(shock_window, "shock", "mean_trust"),
-            post_trust=_extract_window_value(shock_window, "post_shock", "mean_trust"),
-            unknown_rate=_compute_unknown_rate(archive_dir / "events.jsonl"),
+    ctx = SeriesContext(
+        config_data=config_data,
+        repo_root=config_path.resolve().parents[2],
+        log_path=resolve_path(config_path.parent, experiment_cfg.get("log_path", "results/events.jsonl")),
+        metrics_path=resolve_path(config_path.parent, experiment_cfg.get("metrics_path", "results/metrics.json")),
+        python_bin=python_bin,
+        compress_archives=args.compress_archives,
+        summary_metrics_only=args.summary_metrics_only,
+    )
+
+    if args.adaptive:
+        metrics = [name.strip() for name in args.adaptive_metrics.split(",") if name.strip()]
+        unknown = [name for name in metrics if name not in ADAPTIVE_METRICS]
+        if unknown:
+            raise ValueError(
+                f"Unknown or non-numeric run_summary metric(s): {', '.join(unknown)} "
+                f"(expected any of {', '.join(ADAPTIVE_METRICS)})"
+            )
+        run_adaptive(
+            ctx,
+            plans,
+            base_seed=base_seed,
+            metrics=metrics,
+            target=args.ci_half_width,
+            min_runs=min(args.min_runs, args.runs),
+            max_runs=args.runs,
+            budget=args.budget,
+            confidence=args.confidence,
         )
-        _append_summary(summary_csv, row)
-
-        print(f"Run {run_index + 1}/{args.runs} archived at {archive_dir}")
-        print(f"  Cooperation rate: {row.cooperation_rate:.3f}")
-        print(f"  Unknown rate: {row.unknown_rate:.2f}%")
+    else:
+        for plan in plans:
+            for run_index in range(args.runs):
+                _execute_run(ctx, plan, run_index, base_seed + run_index)
 
-    print(f"Summary CSV updated at {summary_csv}")
+    print(f"Summary CSV updated at {ctx.summary_csv}")
 
 
 def _extract_window_value(window: Dict[str, Any], key: str, metric: str) -> float | None:
@@ -13,16 +13,11 @@ import argparse, json
 from pathlib import Path
 from collections import defaultdict
 
+from src.utils.event_log import load_events
+
 
 def load_entries(log_path: Path):
-    entries = []
-    with log_path.open('r', encoding='utf-8') as f:
-        for line in f:
-            line=line.strip()
-            if not line:
-                continue
-            entries.append(json.loads(line))
-    return entries
+    return load_events(log_path, fields=('turn', 'agent', 'decision', 'resources'))
 
 
 def state_before_turn(entries, turn):
@@ -0,0 +1,297 @@
+"""SQLite results warehouse for experiment runs and archives.
+
+Usage:
+  python -m scripts.warehouse results --db results/warehouse.sqlite
+
+Every directory under the given roots that holds an events log (plain,
+split or framed) is ingested as one run, keyed by experiment / variant /
+seed / run name. Events, the per-turn series and the ``MetricsResult``
+scalars land in indexed tables. Runs whose log digest is already stored
+are skipped, so re-ingesting an archive tree is a no-op.
+
+Example query:
+
+```sql
+SELECT r.variant, AVG(m.cooperation_rate)
+FROM run_metrics m JOIN runs r USING (run_id)
+GROUP BY r.variant;
+```
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import datetime
+import json
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from src.metrics import Evaluator
+from src.utils.event_log import iter_events, log_digest, resolve_log_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    experiment TEXT,
+    variant TEXT,
+    seed INTEGER,
+    run TEXT,
+    archive_path TEXT UNIQUE NOT NULL,
+    log_digest TEXT NOT NULL,
+    ingested_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_runs_key ON runs (experiment, variant, seed);
+
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    turn INTEGER,
+    phase TEXT,
+    agent TEXT,
+    decision TEXT,
+    trust_score REAL,
+    betrayal_count INTEGER,
+    supports_given INTEGER,
+    model_slot TEXT,
+    model_name TEXT,
+    resources TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_run_turn ON events (run_id, turn);
+CREATE INDEX IF NOT EXISTS idx_events_run_agent ON events (run_id, agent);
+
+CREATE TABLE IF NOT EXISTS turn_series (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    turn INTEGER NOT NULL,
+    phase TEXT,
+    events INTEGER,
+    cooperative_events INTEGER,
+    betrayal_events INTEGER,
+    cooperation_rate REAL,
+    betrayal_rate REAL,
+    mean_trust REAL,
+    PRIMARY KEY (run_id, turn)
+);
+
+CREATE TABLE IF NOT EXISTS run_metrics (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (run_id) ON DELETE CASCADE,
+    cooperation_rate REAL,
+    average_contribution REAL,
+    average_recovery_time REAL,
+    gini_coefficient REAL,
+    dialogue_entropy REAL,
+    total_events INTEGER,
+    total_turns INTEGER,
+    message_action_mismatch_count INTEGER,
+    message_action_mismatch_rate REAL,
+    top_contributor_share REAL,
+    pre_coop REAL,
+    shock_coop REAL,
+    post_coop REAL,
+    post_coop_extended REAL,
+    pre_trust REAL,
+    shock_trust REAL,
+    post_trust REAL,
+    unknown_rate REAL,
+    metrics_json TEXT
+);
+"""
+
+SCALAR_METRICS = (
+    "cooperation_rate",
+    "average_contribution",
+    "average_recovery_time",
+    "gini_coefficient",
+    "dialogue_entropy",
+    "total_events",
+    "total_turns",
+    "message_action_mismatch_count",
+    "message_action_mismatch_rate",
+    "top_contributor_share",
+)
+WINDOW_METRICS = (
+    ("pre_coop", "pre_shock", "cooperation_rate"),
+    ("shock_coop", "shock", "cooperation_rate"),
+    ("post_coop", "post_shock", "cooperation_rate"),
+    ("post_coop_extended", "post_shock_extended", "cooperation_rate"),
+    ("pre_trust", "pre_shock", "mean_trust"),
+    ("shock_trust", "shock", "mean_trust"),
+    ("post_trust", "post_shock", "mean_trust"),
+)
+EVENT_FIELDS = (
+    "turn",
+    "phase",
+    "agent",
+    "decision",
+    "trust_score",
+    "betrayal_count",
+    "supports_given",
+    "model_slot",
+    "model_name",
+    "resources",
+)
+TURN_FIELDS = (
+    "turn",
+    "phase",
+    "events",
+    "cooperative_events",
+    "betrayal_events",
+    "cooperation_rate",
+    "betrayal_rate",
+    "mean_trust",
+)
+
+
+def connect(db_path: Path) -> sqlite3.Connection:
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(db_path))
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def find_run_dirs(roots: Iterable[Path]) -> Iterator[Path]:
+    seen = set()
+    for root in roots:
+        for pattern in ("events.jsonl", "events.jsonl.gz"):
+            for log in sorted(root.rglob(pattern)):
+                run_dir = log.parent
+                if run_dir not in seen and resolve_log_path(run_dir / "events.jsonl").stat().st_size > 0:
+                    seen.add(run_dir)
+                    yield run_dir
+
+
+def _variant_lookup(run_dir: Path) -> Dict[str, Dict[str, str]]:
+    """Map archived log paths to run_summary.csv rows of the experiment."""
+    candidates = [run_dir / "run_summary.csv"]
+    if run_dir.parent.name == "archives":
+        candidates.insert(0, run_dir.parent.parent / "run_summary.csv")
+    for summary_csv in candidates:
+        if summary_csv.exists():
+            with summary_csv.open(newline="", encoding="utf-8") as handle:
+                return {
+                    str(Path(row.get("log_path", "")).parent.resolve()): row
+                    for row in csv.DictReader(handle)
+                }
+    return {}
+
+
+def _experiment_name(run_dir: Path, metadata: Mapping[str, Any]) -> str:
+    if metadata.get("experiment"):
+        return str(metadata["experiment"])
+    if run_dir.parent.name == "archives":
+        return run_dir.parent.parent.name
+    return run_dir.name
+
+
+def _window_value(windows: Mapping[str, Any], key: str, metric: str) -> Optional[float]:
+    block = windows.get(key)
+    if not isinstance(block, Mapping) or block.get(metric) is None:
+        return None
+    return float(block[metric])
+
+
+def _load_metrics(run_dir: Path) -> Dict[str, Any]:
+    metrics_path = run_dir / "metrics.json"
+    if metrics_path.exists() and metrics_path.stat().st_size > 0:
+        data = json.loads(metrics_path.read_text(encoding="utf-8"))
+        if "turn_series" in data and "families" not in data.get("metadata", {}):
+            return data
+    return Evaluator().evaluate(run_dir / "events.jsonl").to_json()
+
+
+def ingest_run(conn: sqlite3.Connection, run_dir: Path) -> bool:
+    """Ingest one run directory; return False if it was already up to date."""
+    archive_path = str(run_dir.resolve())
+    digest = log_digest(run_dir / "events.jsonl")
+    existing = conn.execute(
+        "SELECT run_id, log_digest FROM runs WHERE archive_path = ?", (archive_path,)
+    ).fetchone()
+    if existing is not None and existing["log_digest"] == digest:
+        return False
+
+    metrics = _load_metrics(run_dir)
+    metadata = metrics.get("metadata", {}) or {}
+    summary_row = _variant_lookup(run_dir).get(archive_path, {})
+    seed = summary_row.get("seed") or metadata.get("seed")
+
+    with conn:
+        if existing is not None:
+            conn.execute("DELETE FROM runs WHERE run_id = ?", (existing["run_id"],))
+        cursor = conn.execute(
+            "INSERT INTO runs (experiment, variant, seed, run, archive_path, log_digest, ingested_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                _experiment_name(run_dir, metadata),
+                summary_row.get("variant") or metadata.get("variant"),
+                int(seed) if seed not in (None, "") else None,
+                run_dir.name,
+                archive_path,
+                digest,
+                datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            ),
+        )
+        run_id = cursor.lastrowid
+
+        total = unknown = 0
+        rows: List[tuple] = []
+        for entry in iter_events(run_dir / "events.jsonl", fields=EVENT_FIELDS):
+            total += 1
+            if str(entry.get("decision", "")).upper() == "UNKNOWN":
+                unknown += 1
+            resources = entry.get("resources")
+            rows.append(
+                (run_id,)
+                + tuple(entry.get(key) for key in EVENT_FIELDS[:-1])
+                + (json.dumps(resources) if resources is not None else None,)
+            )
+        conn.executemany(
+            f"INSERT INTO events (run_id, {', '.join(EVENT_FIELDS)}) "
+            f"VALUES ({', '.join('?' * (len(EVENT_FIELDS) + 1))})",
+            rows,
+        )
+        conn.executemany(
+            f"INSERT INTO turn_series (run_id, {', '.join(TURN_FIELDS)}) "
+            f"VALUES ({', '.join('?' * (len(TURN_FIELDS) + 1))})",
+            [
+                (run_id,) + tuple(item.get(key) for key in TURN_FIELDS)
+                for item in metrics.get("turn_series", [])
+            ],
+        )
+        windows = metrics.get("shock_windows", {}) or {}
+        metric_columns = SCALAR_METRICS + tuple(name for name, _, _ in WINDOW_METRICS)
+        values = [metrics.get(key) for key in SCALAR_METRICS]
+        values += [_window_value(windows, key, metric) for _, key, metric in WINDOW_METRICS]
+        conn.execute(
+            f"INSERT INTO run_metrics (run_id, {', '.join(metric_columns)}, unknown_rate, metrics_json) "
+            f"VALUES ({', '.join('?' * (len(metric_columns) + 3))})",
+            [run_id]
+            + values
+            + [unknown / total * 100.0 if total else 0.0, json.dumps(metrics, ensure_ascii=False)],
+        )
+    return True
+
+
+def ingest(db_path: Path, roots: Iterable[Path]) -> Dict[str, int]:
+    conn = connect(db_path)
+    counts = {"ingested": 0, "unchanged": 0}
+    try:
+        for run_dir in find_run_dirs(roots):
+            key = "ingested" if ingest_run(conn, run_dir) else "unchanged"
+            counts[key] += 1
+    finally:
+        conn.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest runs and archives into a SQLite warehouse")
+    parser.add_argument("roots", nargs="+", help="Result directories to scan (e.g. results)")
+    parser.add_argument("--db", default="results/warehouse.sqlite", help="SQLite database path")
+    args = parser.parse_args()
+    counts = ingest(Path(args.db), [Path(root) for root in args.roots])
+    print(json.dumps({"db": args.db, **counts}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+"""Endpoint probes, replica pools and the pre-run warm-up stage."""
+from __future__ import annotations
+
+import asyncio
+import json
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Collection, Dict, List, Mapping, Optional, Sequence
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle with llm_wrapper
+    from src.agents.llm_wrapper import LLMWrapper
+
+ROUTING_STRATEGIES = ("least_outstanding", "latency_weighted")
+
+
+def ping(url: str, timeout: float = 3.0) -> tuple[bool, Optional[str], float]:
+    """GET ``<url>/health``; return ``(ok, body_or_error, elapsed_seconds)``."""
+    req = urllib.request.Request(url=url.rstrip("/") + "/health", method="GET")
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            elapsed = time.perf_counter() - start
+            return True, body.decode("utf-8", errors="replace"), elapsed
+    except (urllib.error.URLError, OSError) as exc:  # pragma: no cover - depends on environment
+        return False, str(exc), time.perf_counter() - start
+
+
+def list_models(url: str, timeout: float = 3.0) -> Optional[List[str]]:
+    """Return model ids from ``<url>/v1/models`` or ``None`` if unavailable."""
+    req = urllib.request.Request(url=url.rstrip("/") + "/v1/models", method="GET")
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            data = json.loads(resp.read().decode("utf-8"))
+    except (urllib.error.URLError, OSError, ValueError):  # pragma: no cover - depends on environment
+        return None
+    return [str(item.get("id")) for item in data.get("data", []) if isinstance(item, dict)]
+
+
+@dataclass
+class Replica:
+    url: str
+    outstanding: int = 0
+    requests: int = 0
+    errors: int = 0
+    consecutive_failures: int = 0
+    latency: Optional[float] = None
+    ejected_until: Optional[float] = None
+    ejections: int = 0
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "ejected": self.ejected_until is not None,
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+        }
+
+
+class ReplicaPool:
+    """Route requests for one model slot across replica endpoints.
+
+    ``least_outstanding`` picks the replica with the fewest in-flight
+    requests (ties: fewest total requests, so sequential runs rotate);
+    ``latency_weighted`` scales in-flight load by the replica's latency EWMA.
+    After ``failure_threshold`` consecutive errors a replica is ejected for
+    ``cooldown`` seconds, then probed with ``/health`` before it is used
+    again. When every replica is ejected the one due back first is used, so
+    requests still fail loudly instead of stalling.
+    """
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        *,
+        strategy: str = "least_outstanding",
+        failure_threshold: int = 3,
+        cooldown: float = 15.0,
+        probe_timeout: float = 3.0,
+        alpha: float = 0.3,
+    ) -> None:
+        if not urls:
+            raise ValueError("ReplicaPool needs at least one URL")
+        if strategy not in ROUTING_STRATEGIES:
+            raise ValueError(f"Unknown routing strategy: {strategy}")
+        self.replicas = {url.rstrip("/"): Replica(url.rstrip("/")) for url in urls}
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self.alpha = alpha
+
+    @classmethod
+    def from_mapping(cls, urls: Sequence[str], data: Mapping[str, Any] | None) -> "ReplicaPool":
+        data = data or {}
+        return cls(
+            urls,
+            strategy=str(data.get("strategy", "least_outstanding")),
+            failure_threshold=int(data.get("failure_threshold", 3)),
+            cooldown=float(data.get("cooldown", 15.0)),
+            probe_timeout=float(data.get("probe_timeout", 3.0)),
+        )
+
+    @property
+    def healthy(self) -> List[Replica]:
+        return [replica for replica in self.replicas.values() if replica.ejected_until is None]
+
+    async def acquire(self, avoid: Collection[str] = ()) -> Optional[str]:
+        """Return the URL to use next, preferring replicas not in ``avoid``.
+
+        Returns ``None`` only when every replica is in ``avoid``.
+        """
+        await self._probe_due()
+        candidates = [replica for replica in self.healthy if replica.url not in avoid]
+        if not candidates:
+            ejected = [
+                replica
+                for replica in self.replicas.values()
+                if replica.ejected_until is not None and replica.url not in avoid
+            ]
+            if not ejected:
+                return None
+            return min(ejected, key=lambda replica: replica.ejected_until or 0.0).url
+        return min(candidates, key=self._load).url
+
+    def _load(self, replica: Replica) -> tuple:
+        if self.strategy == "latency_weighted":
+            known = [item.latency for item in self.replicas.values() if item.latency is not None]
+            latency = replica.latency if replica.latency is not None else min(known, default=1.0)
+            return ((replica.outstanding + 1) * latency, replica.requests)
+        return (replica.outstanding, replica.requests)
+
+    async def _probe_due(self) -> None:
+        now = time.monotonic()
+        for replica in self.replicas.values():
+            if replica.ejected_until is None or replica.ejected_until > now:
+                continue
+            ok, _, _ = await asyncio.to_thread(ping, replica.url, self.probe_timeout)
+            if ok:
+                replica.ejected_until = None
+                replica.consecutive_failures = 0
+            else:
+                replica.ejected_until = time.monotonic() + self.cooldown
+
+    def started(self, url: str) -> None:
+        replica = self.replicas[url]
+        replica.outstanding += 1
+        replica.requests += 1
+
+    def finished(self, url: str, latency: Optional[float], *, ok: bool) -> None:
+        replica = self.replicas[url]
+        replica.outstanding = max(0, replica.outstanding - 1)
+        if ok:
+            replica.consecutive_failures = 0
+            if latency is not None:
+                replica.latency = (
+                    latency
+                    if replica.latency is None
+                    else self.alpha * latency + (1 - self.alpha) * replica.latency
+                )
+            return
+        replica.errors += 1
+        replica.consecutive_failures += 1
+        if replica.consecutive_failures >= self.failure_threshold and replica.ejected_until is None:
+            replica.ejected_until = time.monotonic() + self.cooldown
+            replica.ejections += 1
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "strategy": self.strategy,
+            "replicas": {url: replica.to_json() for url, replica in self.replicas.items()},
+        }
+
+
+async def _prime(wrapper: LLMWrapper, system: str, url: str) -> Optional[float]:
+    try:
+        return await wrapper.prime(system, url=url)
+    except Exception:  # noqa: BLE001 - warm-up failures are reported, not fatal
+        return None
+
+
+def _slowest(values: Sequence[Optional[float]]) -> Optional[float]:
+    """Slowest replica's latency, or ``None`` when any replica failed."""
+    if not values or any(value is None for value in values):
+        return None
+    return round(max(value for value in values if value is not None), 4)
+
+
+async def warm_up(
+    wrappers: Mapping[str, LLMWrapper],
+    systems: Mapping[str, str],
+    *,
+    timeout: float = 3.0,
+) -> Dict[str, Any]:
+    """Probe every endpoint and prime each agent's system prompt twice.
+
+    Endpoints are checked with ``/health`` and ``/v1/models``; then every
+    agent's ``systems[agent_id]`` is sent concurrently to each of its URLs
+    (primary and replicas) once (``cold``: model load plus prompt processing)
+    and again (``warm``: cached prefix). Per-agent ``cold``/``warm`` is the
+    slowest replica; ``cold_seconds``/``warm_seconds`` are the wall-clock
+    durations of the two rounds. The returned report is JSON-serializable.
+    """
+    endpoints: Dict[str, Dict[str, Any]] = {}
+    for url in sorted({url for wrapper in wrappers.values() for url in wrapper.urls}):
+        ok, info, elapsed = await asyncio.to_thread(ping, url, timeout)
+        models = await asyncio.to_thread(list_models, url, timeout)
+        endpoints[url] = {
+            "healthy": ok,
+            "health_latency": round(elapsed, 4),
+            "detail": None if ok else info,
+            "models": models,
+        }
+
+    targets = [
+        (agent_id, url)
+        for agent_id in wrappers
+        if agent_id in systems
+        for url in wrappers[agent_id].urls
+    ]
+    rounds: List[List[Optional[float]]] = []
+    durations: List[float] = []
+    for _ in range(2):
+        started = time.perf_counter()
+        rounds.append(
+            await asyncio.gather(
+                *(_prime(wrappers[agent_id], systems[agent_id], url) for agent_id, url in targets)
+            )
+        )
+        durations.append(time.perf_counter() - started)
+
+    primed: Dict[str, Dict[str, Dict[str, Optional[float]]]] = {}
+    for (agent_id, url), cold, warm in zip(targets, *rounds):
+        primed.setdefault(agent_id, {})[url] = {
+            "cold": round(cold, 4) if cold is not None else None,
+            "warm": round(warm, 4) if warm is not None else None,
+        }
+
+    agents: Dict[str, Dict[str, Any]] = {}
+    for agent_id, by_url in primed.items():
+        wrapper = wrappers[agent_id]
+        listed = endpoints[wrapper.base_url]["models"]
+        agents[agent_id] = {
+            "endpoint": wrapper.base_url,
+            "model": wrapper.model,
+            "model_listed": None if listed is None or not wrapper.model else wrapper.model in listed,
+            "cold": _slowest([item["cold"] for item in by_url.values()]),
+            "warm": _slowest([item["warm"] for item in by_url.values()]),
+        }
+        if len(by_url) > 1:
+            agents[agent_id]["replicas"] = by_url
+
+    return {
+        "endpoints": endpoints,
+        "agents": agents,
+        "cold_seconds": round(durations[0], 4),
+        "warm_seconds": round(durations[1], 4),
+        "failed": sorted(agent_id for agent_id, item in agents.items() if item["cold"] is None),
+    }
+
+
+__all__ = ["ROUTING_STRATEGIES", "Replica", "ReplicaPool", "list_models", "ping", "warm_up"]
@@ -4,17 +4,88 @@ from __future__ import annotations
 
 import asyncio
 import json
-from dataclasses import dataclass
-from typing import Any, Dict, Optional
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field, replace
+from typing import Any, Deque, Dict, Mapping, Optional, Sequence
 from urllib import request
 from urllib.error import URLError, HTTPError
 
+from src.agents.endpoints import ReplicaPool
+
+
+STRUCTURED_OUTPUT_MODES = ("json_schema", "grammar")
+# Longest slice of an unparseable completion echoed back in a repair request.
+REPAIR_EXCERPT_CHARS = 2000
+# Completion cap of a repair request when no adaptive token budget is set.
+REPAIR_MAX_TOKENS = 256
+# Response keys per field: lower-case and upper-case full name, then the short
+# forms, which are only accepted under a ``short_keys`` contract.
+FIELD_KEYS = {
+    "thought": ("thought", "THOUGHT", "t", "T"),
+    "decision": ("decision", "DECISION", "d", "D"),
+    "message": ("message", "MESSAGE", "m", "M"),
+}
+
+
+class MessageBuffer:
+    """One agent's request message list, kept across turns.
+
+    Layout: ``[system, *history entries, user]``. The engine swaps the system
+    slot when the phase changes and inserts each new history entry before the
+    user slot; the wrapper swaps in the user message and sends the list
+    itself, so assembling a request does no per-entry work. With ``window``
+    only the last ``window`` history entries are kept.
+
+    Request bodies share this list: copy ``body["messages"]`` to keep a
+    snapshot past the next turn.
+    """
+
+    def __init__(self, window: Optional[int] = None) -> None:
+        self.window = window
+        self.messages: list[dict[str, str]] = [
+            {"role": "system", "content": ""},
+            {"role": "user", "content": ""},
+        ]
+
+    @property
+    def history(self) -> list[dict[str, str]]:
+        return self.messages[1:-1]
+
+    def set_system(self, message: dict[str, str]) -> None:
+        self.messages[0] = message
+
+    def append(self, entry: dict[str, str]) -> None:
+        self.messages.insert(len(self.messages) - 1, entry)
+        self._trim()
+
+    def replace(self, entries: Sequence[dict[str, str]]) -> None:
+        self.messages[1:-1] = entries
+        self._trim()
+
+    def request(self, user: dict[str, str]) -> list[dict[str, str]]:
+        self.messages[-1] = user
+        return self.messages
+
+    def _trim(self) -> None:
+        excess = len(self.messages) - 2 - (self.window or 0)
+        if self.window and excess > 0:
+            del self.messages[1 : 1 + excess]
+
 
 @dataclass
 class PromptPayload:
     system: str
     history: list[dict[str, str]]
     constraints: Optional[dict[str, Any]] = None
+    decisions: Optional[list[str]] = None
+    # Phase override of the contract's thought cap (0 drops THOUGHT).
+    thought_chars: Optional[int] = None
+    # Pre-rendered ``constraints_block(constraints)``, reused across turns.
+    constraints_text: Optional[str] = None
+    # Engine-held message list; when set, ``system``/``history`` are not re-copied.
+    buffer: Optional[MessageBuffer] = None
 
 
 @dataclass
@@ -24,6 +95,318 @@ class AgentTurn:
     decision: str
     message: str
     raw_response: Dict[str, Any]
+    # Decisions of every sampled completion (index 0 drives the simulation).
+    samples: list[str] = field(default_factory=list)
+
+
+@dataclass
+class HedgeStats:
+    """Latency history and hedge counters, shared by wrappers of one model slot."""
+
+    requests: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+    latencies: Deque[float] = field(default_factory=lambda: deque(maxlen=256))
+
+    def threshold(self, percentile: float, min_samples: int) -> Optional[float]:
+        """Latency at ``percentile`` (0-1) of recent requests, once enough are recorded."""
+        if len(self.latencies) < max(1, min_samples):
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, math.ceil(percentile * len(ordered)) - 1))
+        return ordered[index]
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else 0.0,
+        }
+
+
+@dataclass
+class OutputStats:
+    """Parse outcomes per model slot: UNKNOWN decisions and the tokens they wasted.
+
+    Token counts are per parsed choice, so ``samples > 1`` requests (whose
+    ``usage`` covers every choice) are comparable with single-choice ones.
+    """
+
+    responses: int = 0
+    unknown: int = 0
+    completion_tokens: int = 0
+    wasted_tokens: int = 0
+    repairs: int = 0
+    repaired: int = 0
+    repair_prompt_tokens: int = 0
+
+    def record(self, decision: str, data: Dict[str, Any]) -> None:
+        """Count one final response; ``data["repairs"]`` holds any repair exchanges."""
+        tokens = _choice_tokens(data)
+        for repair in data.get("repairs", []):
+            self.repairs += 1
+            tokens += _choice_tokens(repair)
+            self.repair_prompt_tokens += _usage(repair, "prompt_tokens")
+        if data.get("repairs") and str(decision).upper() != "UNKNOWN":
+            self.repaired += 1
+        self.responses += 1
+        self.completion_tokens += tokens
+        if str(decision).upper() == "UNKNOWN":
+            self.unknown += 1
+            self.wasted_tokens += tokens
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "responses": self.responses,
+            "unknown": self.unknown,
+            "unknown_rate": round(self.unknown / self.responses, 4) if self.responses else 0.0,
+            "completion_tokens": self.completion_tokens,
+            "wasted_tokens": self.wasted_tokens,
+            "repairs": self.repairs,
+            "repaired": self.repaired,
+            "repair_prompt_tokens": self.repair_prompt_tokens,
+        }
+
+
+@dataclass
+class TokenBudget:
+    """Adaptive ``max_tokens`` from one agent's observed completion lengths.
+
+    Once ``min_samples`` completions are seen, the budget is the
+    ``percentile`` of the last ``window`` completion-token counts times
+    ``margin``, clamped to ``[floor, ceiling]``. A truncated completion
+    (``finish_reason == "length"``) doubles the budget that was used and
+    holds it for ``min_samples`` responses before shrinking again.
+    """
+
+    ceiling: int
+    percentile: float = 0.95
+    margin: float = 1.25
+    floor: int = 64
+    min_samples: int = 8
+    window: int = 64
+    budget: Optional[int] = None
+    truncations: int = 0
+    samples: Deque[int] = field(default_factory=deque)
+    _hold: int = 0
+
+    @classmethod
+    def from_mapping(cls, ceiling: int, data: Mapping[str, Any] | bool | None) -> Optional["TokenBudget"]:
+        if not data:
+            return None
+        data = data if isinstance(data, Mapping) else {}
+        if not data.get("enabled", True):
+            return None
+        ceiling = int(data.get("ceiling", ceiling))
+        budget = cls(
+            ceiling=ceiling,
+            percentile=float(data.get("percentile", cls.percentile)),
+            margin=float(data.get("margin", cls.margin)),
+            floor=int(data.get("floor", min(cls.floor, ceiling))),
+            min_samples=int(data.get("min_samples", cls.min_samples)),
+            window=int(data.get("window", cls.window)),
+        )
+        if not 0 < budget.percentile <= 1:
+            raise ValueError(f"adaptive_max_tokens.percentile must be in (0, 1], got {budget.percentile}")
+        if budget.min_samples < 1:
+            raise ValueError(f"adaptive_max_tokens.min_samples must be >= 1, got {budget.min_samples}")
+        if budget.window < budget.min_samples:
+            raise ValueError(
+                f"adaptive_max_tokens.window ({budget.window}) must be >= min_samples ({budget.min_samples})"
+            )
+        if not 1 <= budget.floor <= budget.ceiling:
+            raise ValueError(
+                f"adaptive_max_tokens.floor ({budget.floor}) must be between 1 and the ceiling ({budget.ceiling})"
+            )
+        return budget
+
+    def current(self) -> int:
+        return self.budget if self.budget is not None else self.ceiling
+
+    def observe(self, data: Dict[str, Any], used: int) -> None:
+        """Update from a response that was generated with ``max_tokens=used``.
+
+        ``max_tokens`` applies to each choice, so a sampled response is
+        observed per choice and counts as truncated if any choice was.
+        """
+        tokens = _choice_tokens(data)
+        choices = data.get("choices") or [{}]
+        if any(choice.get("finish_reason") == "length" for choice in choices):
+            self.truncations += 1
+            self.budget = min(self.ceiling, max(self.floor, used * 2))
+            self._hold = self.min_samples
+        if not tokens:
+            return
+        self.samples.append(tokens)
+        while len(self.samples) > self.window:
+            self.samples.popleft()
+        if self._hold:
+            self._hold -= 1
+            return
+        if len(self.samples) >= self.min_samples:
+            ordered = sorted(self.samples)
+            index = min(len(ordered) - 1, max(0, math.ceil(self.percentile * len(ordered)) - 1))
+            target = math.ceil(ordered[index] * self.margin)
+            self.budget = max(self.floor, min(self.ceiling, target))
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "budget": self.current(),
+            "ceiling": self.ceiling,
+            "samples": len(self.samples),
+            "truncations": self.truncations,
+        }
+
+
+@dataclass(frozen=True)
+class ResponseContract:
+    """Which fields a response carries and how they are named.
+
+    - ``thought``: ask for THOUGHT at all (no metric reads it).
+    - ``thought_chars``: cap on THOUGHT length, stated in the prompt and
+      enforced by structured output; phases may override it, and a cap of
+      ``0`` drops THOUGHT for that phase.
+    - ``short_keys``: use ``t``/``d``/``m`` instead of the full key names.
+
+    The default contract reproduces the original THOUGHT/DECISION/MESSAGE
+    prompt. Parsing accepts the full key names under any contract and the
+    short forms only under ``short_keys``, so a stray ``D:`` in free text is
+    not read as a decision.
+    """
+
+    thought: bool = True
+    thought_chars: Optional[int] = None
+    short_keys: bool = False
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any] | None) -> "ResponseContract":
+        if not data:
+            return cls()
+        chars = data.get("thought_chars")
+        return cls(
+            thought=bool(data.get("thought", True)),
+            thought_chars=int(chars) if chars is not None else None,
+            short_keys=bool(data.get("short_keys", False)),
+        )
+
+    def for_phase(self, thought_chars: Optional[int]) -> "ResponseContract":
+        if thought_chars is None:
+            return self
+        return replace(self, thought=self.thought and thought_chars > 0, thought_chars=thought_chars)
+
+    @property
+    def fields(self) -> list[str]:
+        """Canonical field names in response order."""
+        return [name for name in FIELD_KEYS if self.thought or name != "thought"]
+
+    @property
+    def keys(self) -> list[str]:
+        index = 2 if self.short_keys else 1
+        return [FIELD_KEYS[name][index] for name in self.fields]
+
+    def aliases(self, name: str) -> tuple[str, ...]:
+        """Response keys accepted for field ``name``."""
+        return FIELD_KEYS[name] if self.short_keys else FIELD_KEYS[name][:2]
+
+    def system_hint(self) -> str:
+        return f"Respond with {', '.join(self.keys)} fields."
+
+    def instruction(self, decisions: Optional[Sequence[str]] = None) -> str:
+        key = dict(zip(self.fields, self.keys))
+        text = f"Return a JSON object with keys {', '.join(self.keys)}. "
+        if self.short_keys:
+            text += "(" + ", ".join(f"{key[name]}={name}" for name in self.fields) + "). "
+        if self.thought and self.thought_chars:
+            text += f"Keep {key['thought']} under {self.thought_chars} characters. "
+        label = key["decision"]
+        if decisions:
+            return text + f"{label} must be one of: {', '.join(decisions)}. "
+        return text + f"{label} must be a single word action (e.g., Join, Defect, Observe). "
+
+
+DEFAULT_CONTRACT = ResponseContract()
+
+
+def constraints_block(constraints: Optional[Mapping[str, Any]]) -> Optional[str]:
+    """The ``Constraints:`` block of the user message, or ``None`` without constraints."""
+    if not constraints:
+        return None
+    return "Constraints:\n" + json.dumps(constraints, ensure_ascii=False, indent=2)
+
+
+def _usage(data: Dict[str, Any], key: str) -> int:
+    return int((data.get("usage") or {}).get(key) or 0)
+
+
+def _choice_tokens(data: Dict[str, Any]) -> int:
+    """Completion tokens per choice: ``usage`` totals all ``n`` choices of a sampled request."""
+    return math.ceil(_usage(data, "completion_tokens") / max(1, len(data.get("choices") or [])))
+
+
+def _field(output: Mapping[str, Any], name: str, contract: ResponseContract = DEFAULT_CONTRACT) -> Any:
+    for key in contract.aliases(name):
+        if output.get(key):
+            return output[key]
+    return None
+
+
+def decision_schema(
+    decisions: Optional[Sequence[str]] = None,
+    contract: ResponseContract = DEFAULT_CONTRACT,
+) -> Dict[str, Any]:
+    """JSON schema for the contract's object, with an optional decision enum."""
+    decision: Dict[str, Any] = {"type": "string"}
+    if decisions:
+        decision["enum"] = list(decisions)
+    thought: Dict[str, Any] = {"type": "string"}
+    if contract.thought_chars:
+        thought["maxLength"] = contract.thought_chars
+    fields = {"thought": thought, "decision": decision, "message": {"type": "string"}}
+    return {
+        "type": "object",
+        "properties": {key: fields[name] for name, key in zip(contract.fields, contract.keys)},
+        "required": contract.keys,
+        "additionalProperties": False,
+    }
+
+
+def decision_grammar(
+    decisions: Optional[Sequence[str]] = None,
+    contract: ResponseContract = DEFAULT_CONTRACT,
+) -> str:
+    """GBNF grammar (llama.cpp ``grammar`` field) equivalent to :func:`decision_schema`."""
+    if decisions:
+        decision = " | ".join(json.dumps(json.dumps(item)) for item in decisions)
+    else:
+        decision = "string"
+    rules = {
+        "thought": "thought" if contract.thought_chars else "string",
+        "decision": "decision",
+        "message": "string",
+    }
+    members = ' "," ws '.join(
+        f'"\\"{key}\\":" ws {rules[name]}' for name, key in zip(contract.fields, contract.keys)
+    )
+    lines = [
+        f'root ::= "{{" ws {members} ws "}}"',
+        f"decision ::= {decision}",
+        'string ::= "\\"" ( [^"\\\\] | "\\\\" ["\\\\/bfnrtu] )* "\\""',
+        "ws ::= [ \\t\\n]*",
+    ]
+    if contract.thought_chars:
+        lines.append(
+            f'thought ::= "\\"" ( [^"\\\\] | "\\\\" ["\\\\/bfnrtu] ){{0,{contract.thought_chars}}} "\\""'
+        )
+    return "\n".join(lines)
+
+
+def _call_soon(loop: asyncio.AbstractEventLoop, callback: Any) -> None:
+    """Run ``callback`` on ``loop`` from a worker thread (dropped once the loop is closed)."""
+    try:
+        loop.call_soon_threadsafe(callback)
+    except RuntimeError:
+        pass
 
 
 class LLMWrapper:
@@ -39,8 +422,38 @@ class LLMWrapper:
         max_tokens: int = 512,
         top_p: float = 0.95,
         model: str | None = None,
+        replicas: Sequence[str] | None = None,
+        hedge_percentile: float | None = None,
+        hedge_min_samples: int = 10,
+        hedge_stats: HedgeStats | None = None,
+        repair_hedge_stats: HedgeStats | None = None,
+        pool: ReplicaPool | None = None,
+        structured_output: str | None = None,
+        output_stats: OutputStats | None = None,
+        max_repairs: int = 0,
+        token_budget: TokenBudget | None = None,
+        samples: int = 1,
+        contract: ResponseContract | None = None,
     ) -> None:
         self.base_url = base_url.rstrip('/')
+        self.replicas = [url.rstrip('/') for url in replicas or []]
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_stats = hedge_stats or HedgeStats()
+        # Repairs are short requests; their latencies would skew the decision-call hedge delay.
+        self.repair_hedge_stats = repair_hedge_stats or HedgeStats()
+        if pool is None and self.replicas:
+            pool = ReplicaPool([self.base_url, *self.replicas])
+        self.pool = pool
+        if structured_output is not None and structured_output not in STRUCTURED_OUTPUT_MODES:
+            raise ValueError(f"Unknown structured_output mode: {structured_output}")
+        self.structured_output = structured_output
+        self.output_stats = output_stats or OutputStats()
+        self.max_repairs = max_repairs
+        self.token_budget = token_budget
+        self.samples = max(1, samples)
+        self.contract = contract or DEFAULT_CONTRACT
+        self._user_messages: Dict[tuple, dict[str, str]] = {}
         self.api_key = api_key
         self.timeout = timeout
         self.max_retries = max_retries
@@ -49,32 +462,275 @@ class LLMWrapper:
         self.top_p = top_p
         self.model = model
 
+    @property
+    def urls(self) -> list[str]:
+        """Primary endpoint followed by its replicas."""
+        if self.pool is not None:
+            return list(self.pool.replicas)
+        return [self.base_url, *self.replicas]
+
+    @property
+    def concurrency(self) -> int:
+        """How many requests of this slot may run at once (one per healthy replica)."""
+        return max(1, len(self.pool.healthy)) if self.pool is not None else 1
+
     async def chat(self, agent_id: str, payload: PromptPayload) -> AgentTurn:
-        url = f"{self.base_url}/v1/chat/completions"
         headers = {"Content-Type": "application/json"}
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
+        max_tokens = self.token_budget.current() if self.token_budget else self.max_tokens
+        contract = self.contract.for_phase(payload.thought_chars)
         body = {
-            "messages": self._build_messages(payload),
+            "messages": self._build_messages(payload, contract),
             "temperature": self.temperature,
-            "max_tokens": self.max_tokens,
+            "max_tokens": max_tokens,
             "top_p": self.top_p,
         }
+        if self.samples > 1:
+            body["n"] = self.samples
         if self.model:
             body["model"] = self.model
+        self._constrain(body, payload.decisions, contract)
 
         last_error: Exception | None = None
+        failed: set[str] = set()
         for attempt in range(self.max_retries + 1):
             try:
-                data = await asyncio.to_thread(self._send_request, url, headers, body)
-                return self._parse_response(agent_id, data)
+                data = await self._post(headers, body, failed)
+                if self.token_budget is not None:
+                    self.token_budget.observe(data, max_tokens)
+                turn = self._parse_response(agent_id, data)
+                if turn.decision == "UNKNOWN" and self.max_repairs > 0:
+                    turn = await self._repair(
+                        turn, headers, data, payload.decisions, contract, failed
+                    )
+                if self.samples > 1:
+                    turn.samples = [turn.decision] + self._sample_decisions(data)[1:]
+                self.output_stats.record(turn.decision, data)
+                return turn
             except Exception as exc:  # noqa: BLE001 broad catch to log and retry
                 last_error = exc
-                await asyncio.sleep(3)
+                # Reroute immediately while an untried replica remains.
+                if self.pool is None or len(failed) >= len(self.pool.replicas):
+                    await asyncio.sleep(3)
 
         raise RuntimeError(f"LM Studio request failed after retries: {last_error}")
 
+    def _constrain(
+        self,
+        body: Dict[str, Any],
+        decisions: Optional[Sequence[str]],
+        contract: ResponseContract = DEFAULT_CONTRACT,
+    ) -> None:
+        if self.structured_output == "json_schema":
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "agent_turn",
+                    "strict": True,
+                    "schema": decision_schema(decisions, contract),
+                },
+            }
+        elif self.structured_output == "grammar":
+            body["grammar"] = decision_grammar(decisions, contract)
+
+    async def _repair(
+        self,
+        turn: AgentTurn,
+        headers: Dict[str, str],
+        data: Dict[str, Any],
+        decisions: Optional[Sequence[str]],
+        contract: ResponseContract,
+        failed: set[str],
+    ) -> AgentTurn:
+        """Re-ask for the contract's fields given only the unparseable output (no history).
+
+        Up to ``max_repairs`` short requests are made; each exchange is kept
+        in ``data["repairs"]`` and the first parseable answer replaces the
+        decision fields. A later attempt also carries the previous failed
+        repair, so it is not a byte-identical re-send at temperature 0.
+        Completions are capped by the adaptive token budget when set, else
+        by ``REPAIR_MAX_TOKENS``. Repair failures leave the UNKNOWN turn as is.
+        """
+        agent_id = turn.agent_id
+        choices = data.get("choices") or [{}]
+        content = str(choices[0].get("message", {}).get("content") or "").strip()
+        if not content:
+            return turn
+        body: Dict[str, Any] = {
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "Convert the text into a JSON object. "
+                    + contract.instruction(decisions)
+                    + "Respond ONLY with the JSON object.",
+                },
+                {"role": "user", "content": content[:REPAIR_EXCERPT_CHARS]},
+            ],
+            "temperature": 0.0,
+            "max_tokens": (
+                self.token_budget.current()
+                if self.token_budget is not None
+                else min(self.max_tokens, REPAIR_MAX_TOKENS)
+            ),
+        }
+        if self.model:
+            body["model"] = self.model
+        self._constrain(body, decisions, contract)
+
+        repairs = data.setdefault("repairs", [])
+        for _ in range(self.max_repairs):
+            try:
+                repaired = await self._post(headers, body, failed, stats=self.repair_hedge_stats)
+            except Exception as exc:  # noqa: BLE001 - keep the UNKNOWN turn
+                repairs.append({"error": str(exc)})
+                break
+            repairs.append(repaired)
+            candidate = self._parse_response(agent_id, repaired)
+            if candidate.decision != "UNKNOWN":
+                return AgentTurn(
+                    agent_id=agent_id,
+                    thought=candidate.thought,
+                    decision=candidate.decision,
+                    message=candidate.message,
+                    raw_response=data,
+                )
+            previous = (repaired.get("choices") or [{}])[0].get("message", {}).get("content")
+            body = dict(body, messages=body["messages"][:2] + [
+                {"role": "assistant", "content": str(previous or "")[:REPAIR_EXCERPT_CHARS]},
+                {
+                    "role": "user",
+                    "content": "That is not a valid JSON object with the required fields. "
+                    "Respond ONLY with the corrected JSON object.",
+                },
+            ])
+        return turn
+
+    async def _post(
+        self,
+        headers: Dict[str, str],
+        body: Dict[str, Any],
+        failed: set[str],
+        *,
+        stats: Optional[HedgeStats] = None,
+    ) -> Dict[str, Any]:
+        """POST to the routed replica; hedge to another once it outlives the latency percentile.
+
+        Latencies and counters go to ``stats`` (default :attr:`hedge_stats`).
+        URLs that fail are added to ``failed`` so retries route elsewhere.
+        The first successful response wins and the other request is
+        cancelled (its worker thread finishes in the background and the
+        result is discarded).
+        """
+        stats = stats or self.hedge_stats
+        stats.requests += 1
+        started = time.perf_counter()
+        primary_url = await self._route(failed) or self.base_url
+        primary = asyncio.ensure_future(self._send_to(primary_url, headers, body, failed))
+        delay = None
+        if self.pool is not None and self.hedge_percentile is not None:
+            delay = stats.threshold(self.hedge_percentile, self.hedge_min_samples)
+        if delay is None:
+            data = await primary
+            stats.latencies.append(time.perf_counter() - started)
+            return data
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            data = primary.result()
+            stats.latencies.append(time.perf_counter() - started)
+            return data
+
+        hedge_url = await self._route(failed | {primary_url})
+        if hedge_url is None:
+            data = await primary
+            stats.latencies.append(time.perf_counter() - started)
+            return data
+        stats.hedged += 1
+        hedge = asyncio.ensure_future(self._send_to(hedge_url, headers, body, failed))
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats.hedge_wins += 1
+                        stats.latencies.append(time.perf_counter() - started)
+                        return task.result()
+                    error = task.exception()
+        finally:
+            for task in pending:
+                task.cancel()
+        assert error is not None
+        raise error
+
+    async def _route(self, avoid: set[str]) -> Optional[str]:
+        if self.pool is None:
+            return None if self.base_url in avoid else self.base_url
+        return await self.pool.acquire(avoid)
+
+    async def _send_to(
+        self,
+        base_url: str,
+        headers: Dict[str, str],
+        body: Dict[str, Any],
+        failed: Optional[set[str]] = None,
+    ) -> Dict[str, Any]:
+        url = f"{base_url}/v1/chat/completions"
+        if self.pool is None:
+            return await asyncio.to_thread(self._send_request, url, headers, body)
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+
+        def send() -> Dict[str, Any]:
+            # Book the result from the worker thread itself: a cancelled
+            # caller (the losing side of a hedge) cannot stop the HTTP call,
+            # so the replica stays loaded until the call really returns.
+            started = time.perf_counter()
+            try:
+                data = self._send_request(url, headers, body)
+            except Exception:
+                _call_soon(loop, lambda: pool.finished(base_url, None, ok=False))
+                raise
+            latency = time.perf_counter() - started
+            _call_soon(loop, lambda: pool.finished(base_url, latency, ok=True))
+            return data
+
+        pool.started(base_url)
+        try:
+            return await asyncio.to_thread(send)
+        except Exception:
+            if failed is not None:
+                failed.add(base_url)
+            raise
+
+    async def prime(self, system: str, *, url: Optional[str] = None) -> float:
+        """Send ``system`` with a one-token completion; return the elapsed seconds.
+
+        Used by the warm-up stage to load the model and cache the prompt
+        prefix before turn 1, on ``url`` (one of :attr:`urls`, default the
+        primary endpoint). No retries: failures propagate to the caller.
+        """
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        body: Dict[str, Any] = {
+            "messages": [
+                {"role": "system", "content": system},
+                {"role": "user", "content": "Ready?"},
+            ],
+            "temperature": 0.0,
+            "max_tokens": 1,
+        }
+        if self.model:
+            body["model"] = self.model
+        started = time.perf_counter()
+        await self._send_to(url or self.base_url, headers, body)
+        return time.perf_counter() - started
+
     def _send_request(self, url: str, headers: Dict[str, str], body: Dict[str, Any]) -> Dict[str, Any]:
         payload = json.dumps(body).encode("utf-8")
         req = request.Request(url=url, data=payload, headers=headers, method="POST")
@@ -104,9 +760,9 @@ class LLMWrapper:
                     "MESSAGE": content,
                 }
 
-        thought = output.get("thought") or output.get("THOUGHT") or ""
-        decision = output.get("decision") or output.get("DECISION") or "UNKNOWN"
-        message = output.get("message") or output.get("MESSAGE") or ""
+        thought = _field(output, "thought", self.contract) or ""
+        decision = _field(output, "decision", self.contract) or "UNKNOWN"
+        message = _field(output, "message", self.contract) or ""
         return AgentTurn(
             agent_id=agent_id,
             thought=thought,
@@ -115,7 +771,22 @@ class LLMWrapper:
             raw_response=data,
         )
 
-    def _build_messages(self, payload: PromptPayload) -> list[dict[str, str]]:
+    def _sample_decisions(self, data: Dict[str, Any]) -> list[str]:
+        """Parsed decision of every choice in ``data`` (``UNKNOWN`` when unparseable)."""
+        decisions: list[str] = []
+        for choice in data.get("choices") or []:
+            content = str(choice.get("message", {}).get("content") or "")
+            parsed = self._extract_structured_fields(content) or {}
+            decisions.append(str(_field(parsed, "decision", self.contract) or "UNKNOWN"))
+        return decisions
+
+    def _build_messages(
+        self, payload: PromptPayload, contract: ResponseContract = DEFAULT_CONTRACT
+    ) -> list[dict[str, str]]:
+        user = self._user_message(payload, contract)
+        if payload.buffer is not None:
+            return payload.buffer.request(user)
+
         messages: list[dict[str, str]] = [
             {"role": "system", "content": payload.system}
         ]
@@ -125,23 +796,26 @@ class LLMWrapper:
             content = entry.get("content", "")
             messages.append({"role": role, "content": content})
 
-        user_lines: list[str] = []
-        if payload.constraints:
-            user_lines.append("Constraints:")
-            user_lines.append(json.dumps(payload.constraints, ensure_ascii=False, indent=2))
-        user_lines.append(
-            "Return a JSON object with keys THOUGHT, DECISION, MESSAGE. "
-            "DECISION must be a single word action (e.g., Join, Defect, Observe). "
-            "Respond ONLY with the JSON object and no additional narration."
-        )
-
-        messages.append({
-            "role": "user",
-            "content": "\n".join(user_lines),
-        })
-
+        messages.append(user)
         return messages
 
+    def _user_message(self, payload: PromptPayload, contract: ResponseContract) -> dict[str, str]:
+        """Trailing user message; cached since it only varies with phase and contract."""
+        block = payload.constraints_text or constraints_block(payload.constraints)
+        key = (block, tuple(payload.decisions or ()), contract)
+        message = self._user_messages.get(key)
+        if message is None:
+            user_lines: list[str] = []
+            if block:
+                user_lines.append(block)
+            user_lines.append(
+                contract.instruction(payload.decisions)
+                + "Respond ONLY with the JSON object and no additional narration."
+            )
+            message = {"role": "user", "content": "\n".join(user_lines)}
+            self._user_messages[key] = message
+        return message
+
     def _extract_structured_fields(self, content: str) -> Optional[Dict[str, Any]]:
         text = content.strip()
         if not text:
@@ -182,9 +856,23 @@ class LLMWrapper:
                 value = value.strip().strip(',').strip()
                 if value.startswith('"') and value.endswith('"'):
                     value = value[1:-1]
-                if key in {"THOUGHT", "DECISION", "MESSAGE"}:
-                    fields[key] = value
+                for name in FIELD_KEYS:
+                    if key in self.contract.aliases(name):
+                        fields[name.upper()] = value
         return fields or None
 
 
-__all__ = ["PromptPayload", "AgentTurn", "LLMWrapper"]
+__all__ = [
+    "PromptPayload",
+    "AgentTurn",
+    "HedgeStats",
+    "LLMWrapper",
+    "MessageBuffer",
+    "OutputStats",
+    "ResponseContract",
+    "STRUCTURED_OUTPUT_MODES",
+    "TokenBudget",
+    "constraints_block",
+    "decision_grammar",
+    "decision_schema",
+]
@@ -2,46 +2,23 @@
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import math
-import re
-from collections import defaultdict
-from dataclasses import dataclass, field
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field, fields
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Mapping, MutableMapping, Optional
+from typing import Any, Callable, Dict, List, Mapping, MutableMapping, Optional, Sequence, Tuple
 
 from src.utils.config import get_section, load_config, resolve_path
+from src.utils.columnar import INT_NULL, NUMPY_MESSAGE, ColumnarStore, is_columnar_store
+from src.utils.event_log import load_events, resolve_log_path
+from src.utils.intent import infer_message_intent
 
-
-COOP_MESSAGE_KEYWORDS = {
-    "cooperate",
-    "cooperation",
-    "collaborate",
-    "together",
-    "assist",
-    "support",
-    "share",
-    "join",
-    "alliance",
-    "help",
-    "trust",
-    "rebuild",
-    "stabilize",
-}
-
-DEFECT_MESSAGE_KEYWORDS = {
-    "defect",
-    "betray",
-    "steal",
-    "hoard",
-    "withhold",
-    "refuse",
-    "withdraw",
-    "sabotage",
-    "abandon",
-    "reject",
-}
+# Bump whenever metric definitions change so cached results are invalidated.
+EVALUATOR_VERSION = "2"
 
 
 @dataclass(frozen=True)
@@ -90,6 +67,11 @@ class EvaluationRules:
             "resource_key": self.resource_key,
         }
 
+    def fingerprint(self) -> str:
+        """Stable hash of the rule set, used as a cache key component."""
+        encoded = json.dumps(self.to_json(), sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
 
 @dataclass
 class MetricsResult:
@@ -104,6 +86,7 @@ class MetricsResult:
     message_counts: Dict[str, int] = field(default_factory=dict)
     phase_summary: Dict[str, Any] = field(default_factory=dict)
     turn_series: List[Dict[str, Any]] = field(default_factory=list)
+    rolling_series: List[Dict[str, Any]] = field(default_factory=list)
     shock_windows: Dict[str, Any] = field(default_factory=dict)
     message_action_mismatch_count: int = 0
     message_action_mismatch_rate: float = 0.0
@@ -114,9 +97,10 @@ class MetricsResult:
     shock_matrix_summary: Dict[str, Any] = field(default_factory=dict)
     message_action_alignment: Dict[str, Any] = field(default_factory=dict)
     metadata: Dict[str, Any] = field(default_factory=dict)
+    extras: Dict[str, Any] = field(default_factory=dict)
 
     def to_json(self) -> Dict[str, Any]:
-        return {
+        payload = {
             "cooperation_rate": self.cooperation_rate,
             "average_contribution": self.average_contribution,
             "average_recovery_time": self.average_recovery_time,
@@ -128,6 +112,7 @@ class MetricsResult:
             "message_counts": self.message_counts,
             "phase_summary": self.phase_summary,
             "turn_series": self.turn_series,
+            "rolling_series": self.rolling_series,
             "shock_windows": self.shock_windows,
             "message_action_mismatch_count": self.message_action_mismatch_count,
             "message_action_mismatch_rate": self.message_action_mismatch_rate,
@@ -139,73 +124,40 @@ class MetricsResult:
             "message_action_alignment": self.message_action_alignment,
             "metadata": self.metadata,
         }
+        if self.extras:
+            payload["extras"] = self.extras
+        return payload
 
 
-class Evaluator:
-    """Evaluate experiment logs and compute collaboration metrics."""
-
-    def __init__(self, rules: EvaluationRules | None = None) -> None:
-        self.rules = rules or EvaluationRules.default()
-
-    def evaluate(self, log_path: Path) -> MetricsResult:
-        entries = self._load_entries(log_path)
-        return self._compute_metrics(entries, log_path)
-
-    def save(self, metrics: MetricsResult, out_path: Path) -> None:
-        out_path.parent.mkdir(parents=True, exist_ok=True)
-        out_path.write_text(
-            json.dumps(metrics.to_json(), indent=2, ensure_ascii=False),
-            encoding="utf-8",
-        )
+@dataclass
+class _LogAggregate:
+    """Rule-independent aggregates of one log, shared across rule sets.
 
-    def _load_entries(self, log_path: Path) -> List[Dict[str, Any]]:
-        if not log_path.exists():
-            raise FileNotFoundError(f"Log file not found: {log_path}")
-        entries: List[Dict[str, Any]] = []
-        with log_path.open("r", encoding="utf-8") as handle:
-            for line in handle:
-                stripped = line.strip()
-                if not stripped:
-                    continue
-                entries.append(json.loads(stripped))
-        return entries
+    Decisions are lower-cased and message intents classified once; anything
+    that depends on ``EvaluationRules`` is kept as decision-keyed counts so
+    each rule set only sums the decisions it cares about.
+    """
 
-    def _compute_metrics(
-        self,
-        entries: List[Dict[str, Any]],
-        log_path: Path,
-    ) -> MetricsResult:
-        if not entries:
-            metadata = {
-                "generated_at": self._now_iso(),
-                "log_path": str(log_path),
-                "agents": [],
-                "turns": [],
-                "rules": self.rules.to_json(),
-            }
-            return MetricsResult(
-                cooperation_rate=0.0,
-                average_contribution=0.0,
-                average_recovery_time=None,
-                gini_coefficient=0.0,
-                dialogue_entropy=0.0,
-                total_events=0,
-                total_turns=0,
-                contributions={},
-                message_counts={},
-                phase_summary={},
-                turn_series=[],
-                shock_windows={},
-                message_action_mismatch_count=0,
-                message_action_mismatch_rate=0.0,
-                message_action_mismatches={},
-                metadata=metadata,
-            )
-
-        cooperative = self.rules.cooperative_decisions
-        betrayal = self.rules.betrayal_decisions
-        resource_key = self.rules.resource_key
+    total_events: int = 0
+    turns: set[int] = field(default_factory=set)
+    agents: Dict[str, None] = field(default_factory=dict)
+    message_counts: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    decision_counts: Counter = field(default_factory=Counter)
+    phase_stats: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    turn_stats: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    agent_trust_sum: Dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    agent_trust_count: Dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    agent_decisions: Dict[str, List[Tuple[int, str]]] = field(
+        default_factory=lambda: defaultdict(list)
+    )
+    intent_decisions: Counter = field(default_factory=Counter)
+    resources: List[Tuple[str, Mapping[str, Any]]] = field(default_factory=list)
+    _contributions: Dict[str, Tuple[Dict[str, float], int]] = field(default_factory=dict)
+    # (store, row order, agent codes, agent labels) when built from columns.
+    _columns: Optional[Tuple[Any, Any, Any, List[str]]] = None
 
+    @classmethod
+    def from_entries(cls, entries: List[Dict[str, Any]]) -> "_LogAggregate":
         ordered_entries = entries
         previous_turn: Optional[int] = None
         for entry in entries:
@@ -218,88 +170,50 @@ class Evaluator:
                 break
             previous_turn = turn
 
-        total_events = len(ordered_entries)
-        turns: set[int] = set()
-        agents: set[str] = set()
-
-        coop_count = 0
-        contributions: Dict[str, float] = defaultdict(float)
-        contribution_events = 0
-        message_counts: Dict[str, int] = defaultdict(int)
-        last_resources: Dict[str, float] = {}
-        last_defection_turn: Dict[str, Optional[int]] = {}
-        recovery_durations: List[int] = []
-        mismatch_counts: Dict[str, int] = defaultdict(int)
-        mismatch_total = 0
-        agent_trust_sum: Dict[str, float] = defaultdict(float)
-        agent_trust_count: Dict[str, int] = defaultdict(int)
-        phase_stats: Dict[str, Dict[str, Any]] = defaultdict(
-            lambda: {
-                "total": 0,
-                "coop": 0,
-                "betrayal": 0,
-                "trust_sum": 0.0,
-                "trust_count": 0,
-                "turns": set(),
-            }
-        )
-        turn_stats: Dict[int, Dict[str, Any]] = {}
-
+        aggregate = cls(total_events=len(ordered_entries))
         for entry in ordered_entries:
             agent = str(entry.get("agent", ""))
-            agents.add(agent)
-            decision_raw = str(entry.get("decision", ""))
-            decision = decision_raw.lower()
+            aggregate.agents.setdefault(agent, None)
+            decision = str(entry.get("decision", "")).lower()
             turn = int(entry.get("turn", 0))
-            turns.add(turn)
+            aggregate.turns.add(turn)
             phase_raw = str(entry.get("phase", "") or "unknown")
 
-            phase_data = phase_stats[phase_raw]
+            phase_data = aggregate.phase_stats.get(phase_raw)
+            if phase_data is None:
+                phase_data = aggregate.phase_stats[phase_raw] = {
+                    "total": 0,
+                    "decisions": Counter(),
+                    "trust_sum": 0.0,
+                    "trust_count": 0,
+                    "turns": set(),
+                }
             phase_data["total"] += 1
+            phase_data["decisions"][decision] += 1
             phase_data["turns"].add(turn)
 
-            if turn not in turn_stats:
-                turn_stats[turn] = {
+            turn_info = aggregate.turn_stats.get(turn)
+            if turn_info is None:
+                turn_info = aggregate.turn_stats[turn] = {
                     "total": 0,
-                    "coop": 0,
-                    "betrayal": 0,
+                    "decisions": Counter(),
                     "trust_sum": 0.0,
                     "trust_count": 0,
                     "phase_counts": defaultdict(int),
                 }
-            turn_info = turn_stats[turn]
             turn_info["total"] += 1
+            turn_info["decisions"][decision] += 1
             turn_info["phase_counts"][phase_raw] += 1
 
-            contributions.setdefault(agent, 0.0)
-            last_defection_turn.setdefault(agent, None)
+            aggregate.decision_counts[decision] += 1
+            aggregate.agent_decisions[agent].append((turn, decision))
 
-            if decision in cooperative:
-                coop_count += 1
-                phase_data["coop"] += 1
-                turn_info["coop"] += 1
-                if last_defection_turn.get(agent) is not None:
-                    diff = turn - last_defection_turn[agent]  # type: ignore[index]
-                    if diff > 0:
-                        recovery_durations.append(diff)
-                    last_defection_turn[agent] = None
-            elif decision in betrayal:
-                phase_data["betrayal"] += 1
-                turn_info["betrayal"] += 1
-                last_defection_turn[agent] = turn
-
-            message_text = str(entry.get("message", ""))
-            intent = _infer_message_intent(message_text)
-            decision_intent = (
-                "coop"
-                if decision in cooperative
-                else "defect"
-                if decision in betrayal
-                else None
-            )
-            if intent and decision_intent and intent != decision_intent:
-                mismatch_counts[agent] += 1
-                mismatch_total += 1
+            if "message" in entry:
+                intent = infer_message_intent(str(entry.get("message", "")))
+            else:
+                intent = entry.get("message_intent")
+            if intent:
+                aggregate.intent_decisions[(agent, intent, decision)] += 1
 
             trust_score = entry.get("trust_score")
             if isinstance(trust_score, (int, float)):
@@ -308,274 +222,816 @@ class Evaluator:
                 phase_data["trust_count"] += 1
                 turn_info["trust_sum"] += trust_value
                 turn_info["trust_count"] += 1
-                agent_trust_sum[agent] += trust_value
-                agent_trust_count[agent] += 1
+                aggregate.agent_trust_sum[agent] += trust_value
+                aggregate.agent_trust_count[agent] += 1
 
             resources = entry.get("resources", {})
-            if isinstance(resources, Mapping) and resource_key in resources:
-                current_value = float(resources[resource_key])
-                if agent in last_resources:
-                    delta = last_resources[agent] - current_value
-                    if delta > 0:
-                        contributions[agent] += delta
-                        contribution_events += 1
-                last_resources[agent] = current_value
-
-            message_counts[agent] += 1
-
-        cooperation_rate = coop_count / total_events if total_events else 0.0
-        average_contribution = (
-            sum(contributions.values()) / contribution_events if contribution_events else 0.0
-        )
-        gini = _gini(list(contributions.values()))
-        entropy = _entropy(list(message_counts.values()))
-        average_recovery_time = (
-            sum(recovery_durations) / len(recovery_durations) if recovery_durations else None
-        )
-        mismatch_rate = mismatch_total / total_events if total_events else 0.0
-        total_contribution = sum(value for value in contributions.values() if value > 0)
-        if contributions:
-            top_agent, top_value = max(contributions.items(), key=lambda item: item[1])
+            if isinstance(resources, Mapping):
+                aggregate.resources.append((agent, resources))
+
+            aggregate.message_counts[agent] += 1
+        return aggregate
+
+    @classmethod
+    def from_columns(cls, store: ColumnarStore, fields: Sequence[str]) -> Optional["_LogAggregate"]:
+        """Build the aggregate from a columnar store without materializing rows.
+
+        Group-bys run on the memmapped code arrays, so only dictionaries and
+        per-group results become Python objects. Per-agent decision
+        histories keep the first and last turn of each run of equal
+        decisions, which is all the recovery metric reads. Returns ``None``
+        when a column has a kind the row reader must handle instead.
+        """
+        np = _numpy()
+        wanted = set(fields)
+
+        def present(name: str) -> bool:
+            return name in wanted and store.has(name)
+
+        expected = {
+            "turn": ("int",),
+            "agent": ("dict",),
+            "decision": ("dict",),
+            "phase": ("dict",),
+            "message_intent": ("dict",),
+            "trust_score": ("int", "float"),
+        }
+        if any(present(name) and store.kind(name) not in kinds for name, kinds in expected.items()):
+            return None
+        rows = store.rows
+        if rows == 0:
+            return cls()
+
+        def codes(
+            name: str, normalize: Callable[[str], Any], missing: Any
+        ) -> Tuple[Any, List[Any]]:
+            if not present(name):
+                return np.zeros(rows, dtype=np.int64), [missing]
+            index: Dict[Any, int] = {}
+            mapping = [
+                index.setdefault(missing if value is None else normalize(value), len(index))
+                for value in [*store.dictionary(name), None]
+            ]
+            # Missing values are stored as -1, which picks the trailing ``None`` slot.
+            raw = np.asarray(store.column(name), dtype=np.int64)
+            return np.asarray(mapping, dtype=np.int64)[raw], list(index)
+
+        if present("turn"):
+            raw_turns = np.asarray(store.column("turn"), dtype=np.int64)
+            turns = np.where(raw_turns == INT_NULL, 0, raw_turns)
         else:
-            top_agent, top_value = None, 0.0
-        top_share = top_value / total_contribution if total_contribution > 0 else 0.0
-        total_messages = sum(message_counts.values())
-        persona_summary: Dict[str, Any] = {}
-        for agent in sorted(agents):
-            contrib_val = round(contributions.get(agent, 0.0), 4)
-            contribution_share = (
-                round(contributions.get(agent, 0.0) / total_contribution, 4)
-                if total_contribution > 0
-                else 0.0
+            turns = np.zeros(rows, dtype=np.int64)
+        agents, agent_labels = codes("agent", str, "")
+        decisions, decision_labels = codes("decision", lambda value: value.lower(), "")
+        phases, phase_labels = codes("phase", lambda value: value or "unknown", "unknown")
+        intents, intent_labels = codes("message_intent", lambda value: value, None)
+        if present("trust_score"):
+            trust = np.asarray(store.column("trust_score"), dtype=np.float64)
+            if store.kind("trust_score") == "int":
+                trust = np.where(trust == INT_NULL, np.nan, trust)
+        else:
+            trust = np.full(rows, np.nan)
+
+        # Same order as ``from_entries``: file order unless turns go backwards.
+        order = None
+        if (np.diff(turns) < 0).any():
+            ranks = np.empty(len(agent_labels), dtype=np.int64)
+            ranks[sorted(range(len(agent_labels)), key=agent_labels.__getitem__)] = np.arange(
+                len(agent_labels)
             )
-            messages = message_counts.get(agent, 0)
-            message_share = round(messages / total_messages, 4) if total_messages else 0.0
-            avg_trust_agent = (
-                round(agent_trust_sum[agent] / agent_trust_count[agent], 4)
-                if agent_trust_count[agent]
-                else None
+            order = np.lexsort((ranks[agents], turns))
+            turns, agents, decisions = turns[order], agents[order], decisions[order]
+            phases, intents, trust = phases[order], intents[order], trust[order]
+        has_trust = ~np.isnan(trust)
+
+        def groups(*keys: Any) -> Tuple[Any, Any, Any]:
+            """Distinct key tuples in first-appearance order, with counts and row labels."""
+            unique, first, inverse, counts = np.unique(
+                np.stack(keys, axis=1),
+                axis=0,
+                return_index=True,
+                return_inverse=True,
+                return_counts=True,
             )
-            persona_summary[agent] = {
-                "contribution": contrib_val,
-                "contribution_share": contribution_share,
-                "messages": messages,
-                "message_share": message_share,
-                "avg_trust": avg_trust_agent,
+            ranked = np.argsort(first, kind="stable")
+            position = np.empty(len(ranked), dtype=np.int64)
+            position[ranked] = np.arange(len(ranked))
+            return unique[ranked], counts[ranked], position[inverse.ravel()]
+
+        def sums(labels: Any, size: int) -> Tuple[List[float], List[int]]:
+            totals = np.bincount(labels[has_trust], weights=trust[has_trust], minlength=size)
+            counts = np.bincount(labels[has_trust], minlength=size)
+            return totals.tolist(), counts.tolist()
+
+        aggregate = cls(total_events=rows, turns=set(np.unique(turns).tolist()))
+        agent_keys, agent_counts, agent_rows = groups(agents)
+        for (code,), count in zip(agent_keys.tolist(), agent_counts.tolist()):
+            aggregate.agents[agent_labels[code]] = None
+            aggregate.message_counts[agent_labels[code]] = count
+        decision_totals = np.bincount(decisions, minlength=len(decision_labels)).tolist()
+        for code, count in enumerate(decision_totals):
+            if count:
+                aggregate.decision_counts[decision_labels[code]] = count
+        trust_totals, trust_counts = sums(agents, len(agent_labels))
+        for code, label in enumerate(agent_labels):
+            if trust_counts[code]:
+                aggregate.agent_trust_sum[label] = trust_totals[code]
+                aggregate.agent_trust_count[label] = trust_counts[code]
+
+        phase_keys, phase_counts, phase_rows = groups(phases)
+        trust_totals, trust_counts = sums(phase_rows, len(phase_keys))
+        phase_names = [phase_labels[code] for (code,) in phase_keys.tolist()]
+        for position, name in enumerate(phase_names):
+            aggregate.phase_stats[name] = {
+                "total": phase_counts[position].item(),
+                "decisions": Counter(),
+                "trust_sum": trust_totals[position],
+                "trust_count": trust_counts[position],
+                "turns": set(),
+            }
+        for (phase, decision), count in zip(*_pairs(groups(phases, decisions))):
+            phase_decisions = aggregate.phase_stats[phase_labels[phase]]["decisions"]
+            phase_decisions[decision_labels[decision]] = count
+        for (phase, turn), _ in zip(*_pairs(groups(phases, turns))):
+            aggregate.phase_stats[phase_labels[phase]]["turns"].add(turn)
+
+        turn_keys, turn_counts, turn_rows = groups(turns)
+        trust_totals, trust_counts = sums(turn_rows, len(turn_keys))
+        for position, (turn,) in enumerate(turn_keys.tolist()):
+            aggregate.turn_stats[turn] = {
+                "total": turn_counts[position].item(),
+                "decisions": Counter(),
+                "trust_sum": trust_totals[position],
+                "trust_count": trust_counts[position],
+                "phase_counts": defaultdict(int),
             }
+        for (turn, decision), count in zip(*_pairs(groups(turns, decisions))):
+            aggregate.turn_stats[turn]["decisions"][decision_labels[decision]] = count
+        for (turn, phase), count in zip(*_pairs(groups(turns, phases))):
+            aggregate.turn_stats[turn]["phase_counts"][phase_labels[phase]] = count
+
+        by_agent = np.argsort(agents, kind="stable")
+        ordered_agents, ordered_decisions = agents[by_agent], decisions[by_agent]
+        changed = (ordered_agents[1:] != ordered_agents[:-1]) | (
+            ordered_decisions[1:] != ordered_decisions[:-1]
+        )
+        keep = np.ones(rows, dtype=bool)
+        keep[1:-1] = changed[:-1] | changed[1:]
+        for agent, turn, decision in zip(
+            ordered_agents[keep].tolist(),
+            turns[by_agent][keep].tolist(),
+            ordered_decisions[keep].tolist(),
+        ):
+            aggregate.agent_decisions[agent_labels[agent]].append((turn, decision_labels[decision]))
+
+        if present("message_intent"):
+            intent_groups = groups(agents, intents, decisions)
+            for (agent, intent, decision), count in zip(*_pairs(intent_groups)):
+                if intent_labels[intent]:
+                    key = (agent_labels[agent], intent_labels[intent], decision_labels[decision])
+                    aggregate.intent_decisions[key] = count
+
+        if "resources" in wanted:
+            aggregate._columns = (store, order, agents, agent_labels)
+        return aggregate
+
+    def contributions(self, resource_key: str) -> Tuple[Dict[str, float], int]:
+        """Return per-agent contributions and contribution events for ``resource_key``."""
+        cached = self._contributions.get(resource_key)
+        if cached is not None:
+            return cached
+        if self._columns is not None:
+            self._contributions[resource_key] = self._column_contributions(resource_key)
+            return self._contributions[resource_key]
+        contributions: Dict[str, float] = {agent: 0.0 for agent in self.agents}
+        contribution_events = 0
+        last_resources: Dict[str, float] = {}
+        for agent, resources in self.resources:
+            if resource_key not in resources:
+                continue
+            current_value = float(resources[resource_key])
+            if agent in last_resources:
+                delta = last_resources[agent] - current_value
+                if delta > 0:
+                    contributions[agent] += delta
+                    contribution_events += 1
+            last_resources[agent] = current_value
+        self._contributions[resource_key] = (contributions, contribution_events)
+        return contributions, contribution_events
+
+    def _column_contributions(self, resource_key: str) -> Tuple[Dict[str, float], int]:
+        np = _numpy()
+        assert self._columns is not None
+        store, order, agents, labels = self._columns
+        contributions: Dict[str, float] = {agent: 0.0 for agent in self.agents}
+        column = f"resources.{resource_key}"
+        if not store.has(column):
+            return contributions, 0
+        values = np.asarray(store.column(column), dtype=np.float64)
+        if order is not None:
+            values = values[order]
+        rows = np.nonzero(~np.isnan(values))[0]
+        by_agent = np.argsort(agents[rows], kind="stable")
+        owners = agents[rows][by_agent]
+        ordered = values[rows][by_agent]
+        deltas = ordered[:-1] - ordered[1:]
+        hits = (owners[1:] == owners[:-1]) & (deltas > 0)
+        totals = np.bincount(owners[1:][hits], weights=deltas[hits], minlength=len(labels)).tolist()
+        for code, label in enumerate(labels):
+            if label in contributions:
+                contributions[label] = totals[code]
+        return contributions, int(hits.sum())
+
+
+def _numpy():
+    try:
+        import numpy as np  # type: ignore
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError(NUMPY_MESSAGE) from exc
+    return np
+
+
+def _pairs(grouped: Tuple[Any, Any, Any]) -> Tuple[List[Tuple[int, ...]], List[int]]:
+    keys, counts, _ = grouped
+    return [tuple(key) for key in keys.tolist()], counts.tolist()
+
+
+class TurnIndex:
+    """Per-turn sums answering any ``[start, end]`` window without rescanning events.
+
+    Event counts are laid out densely from the first to the last recorded
+    turn as integer prefix sums, so a window's counts are the difference of
+    two prefix entries. Trust sums are floats, where prefix differences would
+    drift in the last bits and move rounded means, so they are added up over
+    the window's recorded turns in turn order instead, exactly as a direct
+    summation would.
+    """
+
+    COUNTERS = ("total", "coop", "betrayal", "trust_sum", "trust_count")
+    PREFIX_COUNTERS = ("total", "coop", "betrayal", "trust_count")
+
+    def __init__(self, turn_stats: Mapping[int, Mapping[str, Any]]) -> None:
+        self.turns = sorted(turn_stats)
+        self.first = self.turns[0] if self.turns else 0
+        self._stats = turn_stats
+        span = self.turns[-1] - self.first + 1 if self.turns else 0
+        self._prefix: Dict[str, List[int]] = {}
+        for name in self.PREFIX_COUNTERS:
+            prefix = [0] * (span + 1)
+            running = 0
+            for offset in range(span):
+                info = turn_stats.get(self.first + offset)
+                if info is not None:
+                    running += int(info[name])
+                prefix[offset + 1] = running
+            self._prefix[name] = prefix
+
+    def sums(self, start: int, end: int) -> Dict[str, float]:
+        """Return counter sums over turns ``start..end`` (inclusive, clamped)."""
+        last = self.first + len(self._prefix["total"]) - 2
+        low = max(start, self.first) - self.first
+        high = min(end, last) - self.first + 1
+        if high <= low:
+            return {name: 0 for name in self.COUNTERS}
+        sums: Dict[str, float] = {
+            name: prefix[high] - prefix[low] for name, prefix in self._prefix.items()
+        }
+        sums["trust_sum"] = sum(self._stats[turn]["trust_sum"] for turn in self.recorded(start, end))
+        return sums
+
+    def recorded(self, start: int, end: int) -> List[int]:
+        """Return the recorded turns within ``start..end``."""
+        return self.turns[bisect_left(self.turns, start) : bisect_right(self.turns, end)]
+
+    def window(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        """Summarize turns ``start..end``; ``None`` when the range has no events."""
+        if start > end:
+            return None
+        sums = self.sums(start, end)
+        total = int(sums["total"])
+        if total <= 0:
+            return None
+        coop = int(sums["coop"])
+        betrayal = int(sums["betrayal"])
+        mean_trust = sums["trust_sum"] / sums["trust_count"] if sums["trust_count"] else None
+        return {
+            "turns": self.recorded(start, end),
+            "events": total,
+            "cooperative_events": coop,
+            "betrayal_events": betrayal,
+            "cooperation_rate": round(coop / total, 4),
+            "betrayal_rate": round(betrayal / total, 4),
+            "mean_trust": round(mean_trust, 4) if mean_trust is not None else None,
+        }
+
+
+FamilyCompute = Callable[[_LogAggregate, EvaluationRules, Dict[str, Any]], Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class MetricFamily:
+    """A group of metrics computed from the shared log aggregate.
+
+    ``fields`` lists the log fields the family reads (on top of ``turn`` and
+    ``agent``); ``requires`` names families whose outputs it consumes.
+    ``compute`` returns ``MetricsResult`` attributes, ``_``-prefixed
+    intermediates for dependent families, and any other key as a plugin
+    metric stored in ``MetricsResult.extras``.
+    """
+
+    name: str
+    fields: Tuple[str, ...]
+    compute: FamilyCompute
+    requires: Tuple[str, ...] = ()
+
+
+METRIC_FAMILIES: Dict[str, MetricFamily] = {}
+BASE_FIELDS = ("turn", "agent")
+
+
+def register_metric_family(
+    name: str,
+    *,
+    fields: Sequence[str] = (),
+    requires: Sequence[str] = (),
+) -> Callable[[FamilyCompute], FamilyCompute]:
+    """Register ``compute`` as metric family ``name`` (decorator)."""
+
+    def decorator(compute: FamilyCompute) -> FamilyCompute:
+        METRIC_FAMILIES[name] = MetricFamily(name, tuple(fields), compute, tuple(requires))
+        return compute
+
+    return decorator
+
+
+def resolve_families(names: Optional[Sequence[str]] = None) -> List[MetricFamily]:
+    """Return the selected families plus their dependencies, dependencies first."""
+    selected = list(METRIC_FAMILIES) if names is None else list(names)
+    ordered: List[MetricFamily] = []
+    visiting: set[str] = set()
+
+    def visit(name: str) -> None:
+        if any(family.name == name for family in ordered):
+            return
+        if name not in METRIC_FAMILIES:
+            raise ValueError(
+                f"Unknown metric family: {name} (expected one of {sorted(METRIC_FAMILIES)})"
+            )
+        if name in visiting:
+            raise ValueError(f"Metric family dependency cycle at: {name}")
+        visiting.add(name)
+        for dependency in METRIC_FAMILIES[name].requires:
+            visit(dependency)
+        visiting.discard(name)
+        ordered.append(METRIC_FAMILIES[name])
+
+    for name in selected:
+        visit(name)
+    return ordered
 
-        leadership_distribution = {
+
+def fields_for(families: Sequence[MetricFamily]) -> Tuple[str, ...]:
+    """Return the log fields needed to compute ``families``."""
+    names = list(BASE_FIELDS)
+    for family in families:
+        names.extend(name for name in family.fields if name not in names)
+    return tuple(names)
+
+
+def _count_in(decisions: Mapping[str, int], vocabulary: frozenset[str]) -> int:
+    return sum(count for decision, count in decisions.items() if decision in vocabulary)
+
+
+@register_metric_family("cooperation", fields=("decision",))
+def _cooperation_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    cooperative = rules.cooperative_decisions
+    betrayal = rules.betrayal_decisions
+    coop_count = _count_in(aggregate.decision_counts, cooperative)
+
+    recovery_durations: List[int] = []
+    for history in aggregate.agent_decisions.values():
+        last_defection: Optional[int] = None
+        for turn, decision in history:
+            if decision in cooperative:
+                if last_defection is not None:
+                    diff = turn - last_defection
+                    if diff > 0:
+                        recovery_durations.append(diff)
+                    last_defection = None
+            elif decision in betrayal:
+                last_defection = turn
+
+    total_events = aggregate.total_events
+    return {
+        "cooperation_rate": coop_count / total_events if total_events else 0.0,
+        "average_recovery_time": (
+            sum(recovery_durations) / len(recovery_durations) if recovery_durations else None
+        ),
+    }
+
+
+@register_metric_family("contribution", fields=("resources",))
+def _contribution_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    contributions, contribution_events = aggregate.contributions(rules.resource_key)
+    average_contribution = (
+        sum(contributions.values()) / contribution_events if contribution_events else 0.0
+    )
+    gini = _gini(list(contributions.values()))
+    total_contribution = sum(value for value in contributions.values() if value > 0)
+    if contributions:
+        top_agent, top_value = max(contributions.items(), key=lambda item: item[1])
+    else:
+        top_agent, top_value = None, 0.0
+    top_share = top_value / total_contribution if total_contribution > 0 else 0.0
+    return {
+        "average_contribution": average_contribution,
+        "gini_coefficient": gini,
+        "contributions": {
+            agent: round(contributions.get(agent, 0.0), 4) for agent in sorted(aggregate.agents)
+        },
+        "top_contributor_share": round(top_share, 4),
+        "leadership_distribution": {
             "gini": round(gini, 4),
             "top_contributor": top_agent,
             "top_contribution": round(top_value, 4),
             "top_contributor_share": round(top_share, 4),
             "total_contribution": round(total_contribution, 4),
+        },
+    }
+
+
+@register_metric_family("dialogue")
+def _dialogue_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    message_counts = aggregate.message_counts
+    return {
+        "dialogue_entropy": _entropy(list(message_counts.values())),
+        "message_counts": {
+            agent: message_counts.get(agent, 0) for agent in sorted(aggregate.agents)
+        },
+    }
+
+
+# Split logs keep ``message`` in the cold sidecar; ``message_intent`` replaces it.
+@register_metric_family("alignment", fields=("decision", "message_intent"))
+def _alignment_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    cooperative = rules.cooperative_decisions
+    betrayal = rules.betrayal_decisions
+    mismatch_counts: Dict[str, int] = defaultdict(int)
+    mismatch_total = 0
+    for (agent, intent, decision), count in aggregate.intent_decisions.items():
+        decision_intent = (
+            "coop"
+            if decision in cooperative
+            else "defect"
+            if decision in betrayal
+            else None
+        )
+        if decision_intent and intent != decision_intent:
+            mismatch_counts[agent] += count
+            mismatch_total += count
+
+    total_events = aggregate.total_events
+    mismatch_rate = mismatch_total / total_events if total_events else 0.0
+    by_agent = {agent: mismatch_counts.get(agent, 0) for agent in sorted(aggregate.agents)}
+    return {
+        "message_action_mismatch_count": mismatch_total,
+        "message_action_mismatch_rate": round(mismatch_rate, 4),
+        "message_action_mismatches": by_agent,
+        "message_action_alignment": {
+            "total_mismatches": mismatch_total,
+            "mismatch_rate": round(mismatch_rate, 4),
+            "by_agent": dict(by_agent),
+        },
+    }
+
+
+@register_metric_family("phases", fields=("phase", "decision", "trust_score"))
+def _phases_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    phase_summary: Dict[str, Any] = {}
+    for phase_name, stats in aggregate.phase_stats.items():
+        total_phase_events = stats["total"]
+        phase_coop = _count_in(stats["decisions"], rules.cooperative_decisions)
+        phase_betrayal = _count_in(stats["decisions"], rules.betrayal_decisions)
+        phase_coop_rate = phase_coop / total_phase_events if total_phase_events else 0.0
+        phase_betrayal_rate = (
+            phase_betrayal / total_phase_events if total_phase_events else 0.0
+        )
+        mean_trust_phase = (
+            stats["trust_sum"] / stats["trust_count"] if stats["trust_count"] else None
+        )
+        phase_summary[phase_name] = {
+            "events": total_phase_events,
+            "cooperative_events": phase_coop,
+            "betrayal_events": phase_betrayal,
+            "cooperation_rate": round(phase_coop_rate, 4) if total_phase_events else 0.0,
+            "betrayal_rate": round(phase_betrayal_rate, 4) if total_phase_events else 0.0,
+            "mean_trust": round(mean_trust_phase, 4) if mean_trust_phase is not None else None,
+            "turns": sorted(stats["turns"]),
         }
+    return {"phase_summary": phase_summary}
 
-        phase_summary: Dict[str, Any] = {}
-        for phase_name, stats in phase_stats.items():
-            total_phase_events = stats["total"]
-            phase_coop_rate = stats["coop"] / total_phase_events if total_phase_events else 0.0
-            phase_betrayal_rate = (
-                stats["betrayal"] / total_phase_events if total_phase_events else 0.0
-            )
-            mean_trust_phase = (
-                stats["trust_sum"] / stats["trust_count"] if stats["trust_count"] else None
-            )
-            phase_summary[phase_name] = {
-                "events": total_phase_events,
-                "cooperative_events": stats["coop"],
-                "betrayal_events": stats["betrayal"],
-                "cooperation_rate": round(phase_coop_rate, 4) if total_phase_events else 0.0,
-                "betrayal_rate": round(phase_betrayal_rate, 4) if total_phase_events else 0.0,
-                "mean_trust": round(mean_trust_phase, 4) if mean_trust_phase is not None else None,
-                "turns": sorted(stats["turns"]),
+
+@register_metric_family("turn_series", fields=("phase", "decision", "trust_score"))
+def _turn_series_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    turn_stats = {
+        turn: dict(
+            info,
+            coop=_count_in(info["decisions"], rules.cooperative_decisions),
+            betrayal=_count_in(info["decisions"], rules.betrayal_decisions),
+        )
+        for turn, info in aggregate.turn_stats.items()
+    }
+    turn_series: List[Dict[str, Any]] = []
+    for turn in sorted(turn_stats):
+        info = turn_stats[turn]
+        total_turn_events = info["total"]
+        coop_events = info["coop"]
+        betrayal_events = info["betrayal"]
+        coop_rate_turn = coop_events / total_turn_events if total_turn_events else 0.0
+        betrayal_rate_turn = (
+            betrayal_events / total_turn_events if total_turn_events else 0.0
+        )
+        mean_trust_turn = (
+            info["trust_sum"] / info["trust_count"] if info["trust_count"] else None
+        )
+        if info["phase_counts"]:
+            dominant_phase = max(info["phase_counts"].items(), key=lambda item: item[1])[0]
+        else:
+            dominant_phase = "unknown"
+        turn_series.append(
+            {
+                "turn": turn,
+                "phase": dominant_phase,
+                "events": total_turn_events,
+                "cooperative_events": coop_events,
+                "betrayal_events": betrayal_events,
+                "cooperation_rate": round(coop_rate_turn, 4)
+                if total_turn_events
+                else 0.0,
+                "betrayal_rate": round(betrayal_rate_turn, 4)
+                if total_turn_events
+                else 0.0,
+                "mean_trust": round(mean_trust_turn, 4)
+                if mean_trust_turn is not None
+                else None,
             }
+        )
+    return {"turn_series": turn_series, "_turn_stats": turn_stats}
 
-        turn_series: List[Dict[str, Any]] = []
-        for turn in sorted(turn_stats):
-            info = turn_stats[turn]
-            total_turn_events = info["total"]
-            coop_events = info["coop"]
-            betrayal_events = info["betrayal"]
-            coop_rate_turn = coop_events / total_turn_events if total_turn_events else 0.0
-            betrayal_rate_turn = (
-                betrayal_events / total_turn_events if total_turn_events else 0.0
-            )
-            mean_trust_turn = (
-                info["trust_sum"] / info["trust_count"] if info["trust_count"] else None
-            )
-            if info["phase_counts"]:
-                dominant_phase = max(info["phase_counts"].items(), key=lambda item: item[1])[0]
-            else:
-                dominant_phase = "unknown"
-            turn_series.append(
-                {
-                    "turn": turn,
-                    "phase": dominant_phase,
-                    "events": total_turn_events,
-                    "cooperative_events": coop_events,
-                    "betrayal_events": betrayal_events,
-                    "cooperation_rate": round(coop_rate_turn, 4)
-                    if total_turn_events
-                    else 0.0,
-                    "betrayal_rate": round(betrayal_rate_turn, 4)
-                    if total_turn_events
-                    else 0.0,
-                    "mean_trust": round(mean_trust_turn, 4)
-                    if mean_trust_turn is not None
-                    else None,
-                }
-            )
 
-        def build_window(turn_numbers: List[int]) -> Optional[Dict[str, Any]]:
-            if not turn_numbers:
-                return None
-            existing = [turn_stats.get(number) for number in sorted(set(turn_numbers))]
-            existing = [item for item in existing if item]
-            if not existing:
-                return None
-            total_e = sum(item["total"] for item in existing)
-            if total_e <= 0:
-                return None
-            coop_e = sum(item["coop"] for item in existing)
-            betrayal_e = sum(item["betrayal"] for item in existing)
-            trust_sum = sum(item["trust_sum"] for item in existing)
-            trust_count = sum(item["trust_count"] for item in existing)
-            mean_trust_value = trust_sum / trust_count if trust_count else None
-            turn_list = sorted(set(turn_numbers))
-            return {
-                "turns": turn_list,
-                "events": total_e,
-                "cooperative_events": coop_e,
-                "betrayal_events": betrayal_e,
-                "cooperation_rate": round(coop_e / total_e, 4),
-                "betrayal_rate": round(betrayal_e / total_e, 4),
-                "mean_trust": round(mean_trust_value, 4) if mean_trust_value is not None else None,
-            }
+SHOCK_WINDOW_SPAN = 3
+SHOCK_EXTENDED_SPAN = 10
+ROLLING_WINDOW = 3
+
+
+def _shock_phases(turn_series: List[Dict[str, Any]]) -> List[Tuple[str, int, int]]:
+    """Return ``(phase, start, end)`` for each contiguous run of shock turns."""
+    runs: List[Tuple[str, int, int]] = []
+    for item in turn_series:
+        phase = str(item["phase"])
+        if "shock" not in phase.lower():
+            continue
+        turn = int(item["turn"])
+        if runs and runs[-1][0] == phase and runs[-1][2] == turn - 1:
+            runs[-1] = (phase, runs[-1][1], turn)
+        else:
+            runs.append((phase, turn, turn))
+    return runs
 
-        shock_windows: Dict[str, Any] = {}
-        shock_turns = [
-            item["turn"] for item in turn_series if "shock" in item["phase"].lower()
-        ]
-        if shock_turns:
-            shock_start = min(shock_turns)
-            shock_end = max(shock_turns)
-            recorded_turns = sorted(turn_stats)
-            min_turn_recorded = recorded_turns[0]
-            max_turn_recorded = recorded_turns[-1]
-            window_span = 3
-
-            def collect_range(start: int, end: int) -> List[int]:
-                if start > end:
-                    return []
-                return [turn for turn in range(start, end + 1) if turn in turn_stats]
-
-            pre_span = min(window_span, shock_start - min_turn_recorded)
-            post_span = min(window_span, max_turn_recorded - shock_end)
-            pre_turns = collect_range(shock_start - pre_span, shock_start - 1) if pre_span > 0 else []
-            shock_range = collect_range(shock_start, shock_end)
-            post_turns = (
-                collect_range(shock_end + 1, shock_end + post_span) if post_span > 0 else []
-            )
-            extended_span = min(10, max_turn_recorded - shock_end)
-            post_extended_turns = (
-                collect_range(shock_end + 1, shock_end + extended_span)
-                if extended_span > 0
-                else []
-            )
-            shock_windows = {
-                "phase_turns": shock_range,
-                "window_size": window_span,
-                "pre_shock": build_window(pre_turns),
-                "shock": build_window(shock_range),
-                "post_shock": build_window(post_turns),
-                "post_shock_extended": build_window(post_extended_turns),
-                "post_shock_extended_span": extended_span,
-            }
-        shock_matrix_summary: Dict[str, Any] = {}
-        if shock_windows:
-            def extract_block(key: str) -> Optional[Dict[str, Any]]:
-                block = shock_windows.get(key)
-                if not isinstance(block, Mapping):
-                    return None
-                return {
-                    "turns": block.get("turns"),
-                    "cooperation_rate": block.get("cooperation_rate"),
-                    "mean_trust": block.get("mean_trust"),
-                }
 
-            shock_matrix_summary = {
-                "shock_turns": shock_windows.get("phase_turns"),
-                "pre_shock": extract_block("pre_shock"),
-                "shock": extract_block("shock"),
-                "post_shock": extract_block("post_shock"),
-                "post_shock_extended": extract_block("post_shock_extended"),
+@register_metric_family("turn_index", requires=("turn_series",))
+def _turn_index_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    return {"_turn_index": TurnIndex(computed["_turn_stats"])}
+
+
+@register_metric_family("shock_windows", requires=("turn_series", "turn_index"))
+def _shock_windows_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    index: TurnIndex = computed["_turn_index"]
+    shock_runs = _shock_phases(computed["turn_series"])
+    if not shock_runs:
+        return {"shock_windows": {}, "shock_matrix_summary": {}}
+
+    min_turn_recorded = index.turns[0]
+    max_turn_recorded = index.turns[-1]
+    window_span = SHOCK_WINDOW_SPAN
+
+    def pre_post(start: int, end: int, post_limit: int = window_span) -> Dict[str, Any]:
+        pre_span = min(window_span, start - min_turn_recorded)
+        post_span = min(post_limit, max_turn_recorded - end)
+        return {
+            "pre_shock": index.window(start - pre_span, start - 1) if pre_span > 0 else None,
+            "shock": index.window(start, end),
+            "post_shock": index.window(end + 1, end + post_span) if post_span > 0 else None,
+        }
+
+    # The aggregate windows span the first to the last shock turn.
+    shock_start = min(start for _, start, _ in shock_runs)
+    shock_end = max(end for _, _, end in shock_runs)
+    extended_span = min(SHOCK_EXTENDED_SPAN, max_turn_recorded - shock_end)
+    shock_windows: Dict[str, Any] = {
+        "phase_turns": index.recorded(shock_start, shock_end),
+        "window_size": window_span,
+        **pre_post(shock_start, shock_end),
+        "post_shock_extended": (
+            index.window(shock_end + 1, shock_end + extended_span) if extended_span > 0 else None
+        ),
+        "post_shock_extended_span": extended_span,
+        "per_shock": [
+            {"phase": phase, "phase_turns": index.recorded(start, end), **pre_post(start, end)}
+            for phase, start, end in shock_runs
+        ],
+    }
+
+    def extract_block(block: Any) -> Optional[Dict[str, Any]]:
+        if not isinstance(block, Mapping):
+            return None
+        return {
+            "turns": block.get("turns"),
+            "cooperation_rate": block.get("cooperation_rate"),
+            "mean_trust": block.get("mean_trust"),
+        }
+
+    shock_matrix_summary = {
+        "shock_turns": shock_windows["phase_turns"],
+        "pre_shock": extract_block(shock_windows["pre_shock"]),
+        "shock": extract_block(shock_windows["shock"]),
+        "post_shock": extract_block(shock_windows["post_shock"]),
+        "post_shock_extended": extract_block(shock_windows["post_shock_extended"]),
+    }
+    return {"shock_windows": shock_windows, "shock_matrix_summary": shock_matrix_summary}
+
+
+@register_metric_family("rolling", requires=("turn_index",))
+def _rolling_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    index: TurnIndex = computed["_turn_index"]
+    rolling_series: List[Dict[str, Any]] = []
+    for turn in index.turns:
+        window = index.window(turn - ROLLING_WINDOW + 1, turn)
+        if window is None:
+            continue
+        rolling_series.append(
+            {
+                "turn": turn,
+                "window": ROLLING_WINDOW,
+                "events": window["events"],
+                "cooperation_rate": window["cooperation_rate"],
+                "betrayal_rate": window["betrayal_rate"],
+                "mean_trust": window["mean_trust"],
             }
+        )
+    return {"rolling_series": rolling_series}
+
+
+@register_metric_family("persona", fields=("resources", "trust_score"))
+def _persona_family(
+    aggregate: _LogAggregate, rules: EvaluationRules, computed: Dict[str, Any]
+) -> Dict[str, Any]:
+    contributions, _ = aggregate.contributions(rules.resource_key)
+    total_contribution = sum(value for value in contributions.values() if value > 0)
+    message_counts = aggregate.message_counts
+    total_messages = sum(message_counts.values())
+    persona_summary: Dict[str, Any] = {}
+    for agent in sorted(aggregate.agents):
+        contrib_val = round(contributions.get(agent, 0.0), 4)
+        contribution_share = (
+            round(contributions.get(agent, 0.0) / total_contribution, 4)
+            if total_contribution > 0
+            else 0.0
+        )
+        messages = message_counts.get(agent, 0)
+        message_share = round(messages / total_messages, 4) if total_messages else 0.0
+        avg_trust_agent = (
+            round(aggregate.agent_trust_sum[agent] / aggregate.agent_trust_count[agent], 4)
+            if aggregate.agent_trust_count[agent]
+            else None
+        )
+        persona_summary[agent] = {
+            "contribution": contrib_val,
+            "contribution_share": contribution_share,
+            "messages": messages,
+            "message_share": message_share,
+            "avg_trust": avg_trust_agent,
+        }
+    return {"persona_summary": persona_summary}
+
+
+_RESULT_FIELDS = frozenset(item.name for item in fields(MetricsResult)) - {"extras", "metadata"}
+
+
+class Evaluator:
+    """Evaluate experiment logs and compute collaboration metrics.
+
+    ``families`` restricts evaluation to the named metric families (and their
+    dependencies); the log reader then decodes only the fields they declare.
+    Metrics outside the selection keep their empty defaults.
+    """
+
+    def __init__(
+        self,
+        rules: EvaluationRules | None = None,
+        families: Optional[Sequence[str]] = None,
+    ) -> None:
+        self.rules = rules or EvaluationRules.default()
+        self.families = resolve_families(families)
+
+    def evaluate(self, log_path: Path) -> MetricsResult:
+        return self.evaluate_many(log_path, [self.rules])[0]
+
+    def evaluate_many(
+        self,
+        log_path: Path,
+        rules: Sequence[EvaluationRules],
+    ) -> List[MetricsResult]:
+        """Evaluate several rule sets from a single read of ``log_path``.
+
+        Returns one ``MetricsResult`` per rule set, in the given order.
+        """
+        aggregate = self._load_aggregate(log_path)
+        return [self._compute_metrics(aggregate, item, log_path) for item in rules]
+
+    def save(self, metrics: MetricsResult, out_path: Path) -> None:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(
+            json.dumps(metrics.to_json(), indent=2, ensure_ascii=False),
+            encoding="utf-8",
+        )
+
+    def _load_aggregate(self, log_path: Path) -> _LogAggregate:
+        resolved = resolve_log_path(log_path)
+        if is_columnar_store(resolved):
+            store = ColumnarStore(resolved)
+            aggregate = _LogAggregate.from_columns(store, fields_for(self.families))
+            if aggregate is not None:
+                return aggregate
+        return _LogAggregate.from_entries(self._load_entries(log_path))
+
+    def _load_entries(self, log_path: Path) -> List[Dict[str, Any]]:
+        return load_events(log_path, fields=fields_for(self.families))
 
-        metadata = {
+    def _compute_metrics(
+        self,
+        aggregate: _LogAggregate,
+        rules: EvaluationRules,
+        log_path: Path,
+    ) -> MetricsResult:
+        metadata: Dict[str, Any] = {
             "generated_at": self._now_iso(),
             "log_path": str(log_path),
-            "agents": sorted(agents),
-            "turns": sorted(turns),
-            "rules": self.rules.to_json(),
+            "agents": [],
+            "turns": [],
+            "rules": rules.to_json(),
         }
+        if len(self.families) != len(METRIC_FAMILIES):
+            metadata["families"] = [family.name for family in self.families]
+        values: Dict[str, Any] = {
+            "cooperation_rate": 0.0,
+            "average_contribution": 0.0,
+            "average_recovery_time": None,
+            "gini_coefficient": 0.0,
+            "dialogue_entropy": 0.0,
+            "total_events": aggregate.total_events,
+            "total_turns": len(aggregate.turns),
+            "metadata": metadata,
+        }
+        if not aggregate.total_events:
+            return MetricsResult(**values)
 
-        return MetricsResult(
-            cooperation_rate=cooperation_rate,
-            average_contribution=average_contribution,
-            average_recovery_time=average_recovery_time,
-            gini_coefficient=gini,
-            dialogue_entropy=entropy,
-            total_events=total_events,
-            total_turns=len(turns),
-            contributions={agent: round(contributions.get(agent, 0.0), 4) for agent in sorted(agents)},
-            message_counts={agent: message_counts.get(agent, 0) for agent in sorted(agents)},
-            phase_summary=phase_summary,
-            turn_series=turn_series,
-            shock_windows=shock_windows,
-            message_action_mismatch_count=mismatch_total,
-            message_action_mismatch_rate=round(mismatch_rate, 4),
-            message_action_mismatches={agent: mismatch_counts.get(agent, 0) for agent in sorted(agents)},
-            top_contributor_share=round(top_share, 4),
-            leadership_distribution=leadership_distribution,
-            persona_summary=persona_summary,
-            shock_matrix_summary=shock_matrix_summary,
-            message_action_alignment={
-                "total_mismatches": mismatch_total,
-                "mismatch_rate": round(mismatch_rate, 4),
-                "by_agent": {agent: mismatch_counts.get(agent, 0) for agent in sorted(agents)},
-            },
-            metadata=metadata,
-        )
+        metadata["agents"] = sorted(aggregate.agents)
+        metadata["turns"] = sorted(aggregate.turns)
+        computed: Dict[str, Any] = {}
+        for family in self.families:
+            computed.update(family.compute(aggregate, rules, computed))
+        extras: Dict[str, Any] = {}
+        for key, value in computed.items():
+            if key in _RESULT_FIELDS:
+                values[key] = value
+            elif not key.startswith("_"):
+                extras[key] = value
+        return MetricsResult(**values, extras=extras)
 
     @staticmethod
     def _now_iso() -> str:
         return datetime.now(timezone.utc).isoformat()
 
 
-def _infer_message_intent(message: str) -> Optional[str]:
-    message_lower = message.lower()
-    coop_hits = {kw for kw in COOP_MESSAGE_KEYWORDS if kw in message_lower}
-    defect_hits = {kw for kw in DEFECT_MESSAGE_KEYWORDS if kw in message_lower}
-
-    if coop_hits and not defect_hits:
-        return "coop"
-    if defect_hits and not coop_hits:
-        return "defect"
-    if not message_lower.strip():
-        return None
-    # Detect explicit negations like "not cooperate"
-    if coop_hits:
-        for kw in coop_hits:
-            if re.search(rf"not\s+{re.escape(kw)}", message_lower):
-                return "defect"
-    if defect_hits:
-        for kw in defect_hits:
-            if re.search(rf"not\s+{re.escape(kw)}", message_lower):
-                return "coop"
-    return None
-
-
 def _gini(values: List[float]) -> float:
     filtered = [value for value in values if value >= 0]
     if not filtered:
@@ -619,6 +1075,10 @@ def run_cli(argv: Optional[List[str]] = None) -> None:
     parser.add_argument("--log", help="Override log file path.")
     parser.add_argument("--out", help="Override metrics output path.")
     parser.add_argument("--rules", help="JSON file overriding evaluation rules.")
+    parser.add_argument(
+        "--families",
+        help=f"Comma-separated metric families to compute (default: all of {', '.join(METRIC_FAMILIES)}).",
+    )
     args = parser.parse_args(argv)
 
     config_path = Path(args.config).resolve()
@@ -645,7 +1105,12 @@ def run_cli(argv: Optional[List[str]] = None) -> None:
         rules_config.update(override)
 
     rules = EvaluationRules.from_mapping(rules_config)
-    evaluator = Evaluator(rules)
+    families = (
+        [name.strip() for name in args.families.split(",") if name.strip()]
+        if args.families
+        else None
+    )
+    evaluator = Evaluator(rules, families=families)
     metrics = evaluator.evaluate(log_path)
     metadata = metrics.metadata
     metadata.update(
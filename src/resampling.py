@@ -0,0 +1,295 @@
+"""Batched bootstrap confidence intervals and permutation tests.
+
+Every function takes a mapping from an arbitrary key (typically
+``(variant, metric)``) to a sample and resamples all keys at once: samples
+are concatenated into one array and each chunk of resamples is a single
+gather/reduce over it (``CHUNK_ELEMENTS`` caps memory). ``None`` and NaN
+values are dropped per sample first.
+"""
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass
+from statistics import NormalDist
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+NUMPY_MESSAGE = "NumPy가 필요합니다. `pip install numpy`로 설치 후 다시 시도하세요."
+DEFAULT_RESAMPLES = 10_000
+# Upper bound on random draws materialized per chunk.
+CHUNK_ELEMENTS = 4_000_000
+
+
+def _numpy():
+    try:
+        import numpy as np  # type: ignore
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError(NUMPY_MESSAGE) from exc
+    return np
+
+
+@dataclass(frozen=True)
+class BootstrapInterval:
+    mean: float
+    low: float
+    high: float
+    n: int
+
+    def to_json(self) -> Dict[str, Any]:
+        return {"mean": self.mean, "low": self.low, "high": self.high, "n": self.n}
+
+
+@dataclass(frozen=True)
+class PermutationResult:
+    difference: float
+    p_value: float
+    n_a: int
+    n_b: int
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "difference": self.difference,
+            "p_value": self.p_value,
+            "n_a": self.n_a,
+            "n_b": self.n_b,
+        }
+
+
+def _clean(values: Sequence[Optional[float]]) -> List[float]:
+    return [float(value) for value in values if value is not None and value == value]
+
+
+def _chunk_size(resamples: int, elements_per_resample: int) -> int:
+    return max(1, min(resamples, CHUNK_ELEMENTS // max(1, elements_per_resample)))
+
+
+def bootstrap_ci(
+    samples: Mapping[Hashable, Sequence[Optional[float]]],
+    *,
+    resamples: int = DEFAULT_RESAMPLES,
+    confidence: float = 0.95,
+    seed: Optional[int] = None,
+) -> Dict[Hashable, BootstrapInterval]:
+    """Return percentile bootstrap CIs of the mean for every sample.
+
+    Samples with no values are omitted; single-value samples get a
+    degenerate interval.
+    """
+    np = _numpy()
+    cleaned = {key: _clean(values) for key, values in samples.items()}
+    keys = [key for key, values in cleaned.items() if values]
+    if not keys:
+        return {}
+    flat = np.concatenate([np.asarray(cleaned[key]) for key in keys])
+    lengths = np.array([len(cleaned[key]) for key in keys], dtype=np.intp)
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    # Every position draws uniformly from its own key's segment of ``flat``.
+    span = np.repeat(lengths, lengths)
+    base = np.repeat(offsets, lengths)
+
+    rng = np.random.default_rng(seed)
+    means = np.empty((resamples, len(keys)))
+    step = _chunk_size(resamples, flat.size)
+    for start in range(0, resamples, step):
+        count = min(step, resamples - start)
+        draws = (rng.random((count, flat.size)) * span).astype(np.intp) + base
+        means[start : start + count] = np.add.reduceat(flat[draws], offsets, axis=1) / lengths
+
+    alpha = (1.0 - confidence) / 2.0
+    low, high = np.quantile(means, [alpha, 1.0 - alpha], axis=0)
+    observed = np.add.reduceat(flat, offsets) / lengths
+    return {
+        key: BootstrapInterval(
+            mean=float(observed[idx]),
+            low=float(low[idx]),
+            high=float(high[idx]),
+            n=int(lengths[idx]),
+        )
+        for idx, key in enumerate(keys)
+    }
+
+
+def permutation_test(
+    pairs: Mapping[Hashable, Tuple[Sequence[Optional[float]], Sequence[Optional[float]]]],
+    *,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Optional[int] = None,
+) -> Dict[Hashable, PermutationResult]:
+    """Two-sided permutation test on the difference of means (``a - b``) per pair.
+
+    Pairs with equal group sizes are permuted together in one batch. Pairs
+    where either side is empty are omitted. The p-value uses the
+    ``(hits + 1) / (resamples + 1)`` estimator, so it is never zero.
+    """
+    np = _numpy()
+    batches: Dict[Tuple[int, int], List[Tuple[Hashable, List[float]]]] = {}
+    for key, (first, second) in pairs.items():
+        a, b = _clean(first), _clean(second)
+        if a and b:
+            batches.setdefault((len(a), len(b)), []).append((key, a + b))
+
+    rng = np.random.default_rng(seed)
+    results: Dict[Hashable, PermutationResult] = {}
+    for (n_a, n_b), members in batches.items():
+        pooled = np.array([values for _, values in members])
+        width = n_a + n_b
+        totals = pooled.sum(axis=1)
+        observed = pooled[:, :n_a].mean(axis=1) - pooled[:, n_a:].mean(axis=1)
+        rows = np.arange(len(members))[None, :, None]
+        hits = np.zeros(len(members), dtype=np.int64)
+        step = _chunk_size(resamples, len(members) * width)
+        for start in range(0, resamples, step):
+            count = min(step, resamples - start)
+            # The n_a smallest random keys of each row pick a relabelled group A.
+            picks = np.argpartition(
+                rng.random((count, len(members), width), dtype=np.float32), n_a - 1, axis=2
+            )[..., :n_a]
+            sum_a = pooled[rows, picks].sum(axis=2)
+            diffs = sum_a / n_a - (totals - sum_a) / n_b
+            hits += (np.abs(diffs) >= np.abs(observed) - 1e-12).sum(axis=0)
+        for idx, (key, _) in enumerate(members):
+            results[key] = PermutationResult(
+                difference=float(observed[idx]),
+                p_value=float((hits[idx] + 1) / (resamples + 1)),
+                n_a=n_a,
+                n_b=n_b,
+            )
+    return {key: results[key] for key in pairs if key in results}
+
+
+# Below this many degrees of freedom the exact t distribution is inverted;
+# above it the Cornish-Fisher expansion is accurate to better than 0.01%.
+EXACT_T_DOF = 30
+
+
+def _t_coverage(t: float, dof: int) -> float:
+    """P(|T| <= t) for Student's t with integer ``dof`` (Abramowitz & Stegun 26.7.3-4)."""
+    theta = math.atan(t / math.sqrt(dof))
+    cos2 = math.cos(theta) ** 2
+    if dof % 2:
+        if dof == 1:
+            return 2.0 * theta / math.pi
+        term = total = 1.0
+        for k in range(3, dof - 1, 2):
+            term *= cos2 * (k - 1) / k
+            total += term
+        return 2.0 / math.pi * (theta + math.sin(theta) * math.cos(theta) * total)
+    term = total = 1.0
+    for k in range(2, dof - 1, 2):
+        term *= cos2 * (k - 1) / k
+        total += term
+    return math.sin(theta) * total
+
+
+def t_critical(confidence: float, dof: int) -> float:
+    """Two-sided Student-t critical value.
+
+    Exact (bisection on the closed-form CDF) up to ``EXACT_T_DOF`` degrees of
+    freedom, where sweeps with few runs make the interval width most
+    sensitive to it; Cornish-Fisher expansion above.
+    """
+    if dof <= 0:
+        return math.inf
+    z = NormalDist().inv_cdf(0.5 + confidence / 2.0)
+    if dof <= EXACT_T_DOF:
+        low, high = z, z
+        while _t_coverage(high, dof) < confidence:
+            high *= 2.0
+        for _ in range(200):
+            mid = (low + high) / 2.0
+            if _t_coverage(mid, dof) < confidence:
+                low = mid
+            else:
+                high = mid
+            if high - low <= 1e-12 * high:
+                break
+        return high
+    v = float(dof)
+    return (
+        z
+        + (z**3 + z) / (4 * v)
+        + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * v**2)
+        + (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / (384 * v**3)
+    )
+
+
+class RunningInterval:
+    """Welford running mean/variance with a t-based confidence interval.
+
+    Pure Python so sweep drivers can update it after every run without NumPy.
+    """
+
+    def __init__(self, confidence: float = 0.95) -> None:
+        self.confidence = confidence
+        self.n = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: Optional[float]) -> None:
+        if value is None or value != value:
+            return
+        self.n += 1
+        delta = float(value) - self.mean
+        self.mean += delta / self.n
+        self._m2 += delta * (float(value) - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.n - 1) if self.n > 1 else math.inf
+
+    @property
+    def half_width(self) -> float:
+        if self.n < 2:
+            return math.inf
+        return t_critical(self.confidence, self.n - 1) * math.sqrt(self.variance / self.n)
+
+    def to_json(self) -> Dict[str, Any]:
+        half = self.half_width
+        return {
+            "n": self.n,
+            "mean": self.mean if self.n else None,
+            "half_width": half if math.isfinite(half) else None,
+            "confidence": self.confidence,
+        }
+
+
+def group_samples(
+    rows: Sequence[Mapping[str, Any]],
+    metrics: Sequence[str],
+    *,
+    group_key: str = "variant",
+) -> Dict[Tuple[str, str], List[Optional[float]]]:
+    """Collect ``{(group, metric): values}`` from summary rows."""
+    grouped: Dict[Tuple[str, str], List[Optional[float]]] = {}
+    for row in rows:
+        group = str(row.get(group_key, ""))
+        for metric in metrics:
+            grouped.setdefault((group, metric), []).append(row.get(metric))
+    return grouped
+
+
+def compare_to_reference(
+    samples: Mapping[Tuple[str, str], Sequence[Optional[float]]],
+    reference: str,
+    *,
+    resamples: int = DEFAULT_RESAMPLES,
+    seed: Optional[int] = None,
+) -> Dict[Tuple[str, str], PermutationResult]:
+    """Permutation-test every ``(group, metric)`` sample against ``(reference, metric)``."""
+    pairs = {
+        (group, metric): (values, samples[(reference, metric)])
+        for (group, metric), values in samples.items()
+        if group != reference and (reference, metric) in samples
+    }
+    return permutation_test(pairs, resamples=resamples, seed=seed)
+
+
+__all__ = [
+    "BootstrapInterval",
+    "PermutationResult",
+    "RunningInterval",
+    "bootstrap_ci",
+    "compare_to_reference",
+    "group_samples",
+    "permutation_test",
+    "t_critical",
+]
@@ -8,8 +8,22 @@ from pathlib import Path
 from typing import Any, Dict, List
 
 from src.agents.agent_manager import AgentConfig, AgentManager
-from src.agents.llm_wrapper import AgentTurn, LLMWrapper, PromptPayload
+from src.agents.endpoints import ReplicaPool, warm_up
+from src.agents.llm_wrapper import (
+    AgentTurn,
+    HedgeStats,
+    LLMWrapper,
+    OutputStats,
+    PromptPayload,
+    ResponseContract,
+    TokenBudget,
+)
+from src.metrics import EvaluationRules
+from src.simulator.retention import RawResponsePolicy
+from src.simulator.scheduler import SchedulerConfig
+from src.simulator.stability import StopRule
 from src.simulator.turn_manager import (
+    DeadlineFallback,
     PhaseConfig,
     TurnConfig,
     TurnManager,
@@ -67,6 +81,12 @@ def build_turn_config(raw: Dict[str, Any], override_max_turns: int | None = None
                 event=phase.get("event"),
                 parameters=phase.get("parameters", {}),
                 constraints=phase.get("constraints", {}),
+                deadline=float(phase["deadline"]) if phase.get("deadline") else None,
+                fallback=DeadlineFallback.from_mapping(phase.get("deadline_fallback")),
+                decisions=[str(item) for item in phase.get("decisions", [])],
+                thought_chars=(
+                    int(phase["thought_chars"]) if phase.get("thought_chars") is not None else None
+                ),
             )
         )
 
@@ -75,9 +95,34 @@ def build_turn_config(raw: Dict[str, Any], override_max_turns: int | None = None
         max_turns=max_turns,
         log_path=log_path,
         phases=phases,
+        log_layout=str(experiment.get("log_layout", "jsonl")),
+        compress_cold=bool(experiment.get("log_compress_cold", False)),
+        compress_log=bool(experiment.get("log_compress", False)),
+        stop_rule=StopRule.from_mapping(experiment.get("stop_rule")),
+        scheduler=SchedulerConfig.from_mapping(experiment.get("scheduler")),
+        turn_deadline=float(experiment["turn_deadline"]) if experiment.get("turn_deadline") else None,
+        deadline_fallback=(
+            DeadlineFallback.from_mapping(experiment.get("deadline_fallback")) or DeadlineFallback()
+        ),
+        decisions=[str(item) for item in experiment.get("decisions", [])],
+        history_encoding=experiment.get("history_encoding", "json"),
+        history_window=(
+            int(experiment["history_window"]) if experiment.get("history_window") else None
+        ),
+        raw_responses=RawResponsePolicy.from_mapping(experiment.get("raw_responses")),
+        response_contract=ResponseContract.from_mapping(experiment.get("response_contract")),
+        cooperative_decisions=EvaluationRules.from_mapping(
+            get_section(raw, "evaluation")
+        ).cooperative_decisions,
     )
 
 
+def _url_list(value: Any) -> List[str]:
+    """Endpoint setting as a list of URLs: the first is primary, the rest are replicas."""
+    values = value if isinstance(value, (list, tuple)) else [value]
+    return [str(item).rstrip("/") for item in values if item]
+
+
 class DryRunWrapper(LLMWrapper):
     """Simple deterministic wrapper for --dry-run executions."""
 
@@ -118,12 +163,20 @@ async def run_experiment(args: argparse.Namespace) -> None:
 
     default_endpoint = experiment_section.get("endpoint")
     endpoint_map_raw = experiment_section.get("endpoint_map", {})
-    endpoint_map: Dict[str, str] = {}
+    endpoint_map: Dict[str, List[str]] = {}
     if isinstance(endpoint_map_raw, dict):
         endpoint_map = {
-            str(key): str(value)
+            str(key): _url_list(value)
             for key, value in endpoint_map_raw.items()
         }
+    hedging = experiment_section.get("hedging") or {}
+    hedge_percentile = float(hedging["percentile"]) if hedging.get("percentile") else None
+    hedge_min_samples = int(hedging.get("min_samples", 10))
+    hedge_stats: Dict[tuple, HedgeStats] = {}
+    repair_hedge_stats: Dict[tuple, HedgeStats] = {}
+    routing = experiment_section.get("routing") or {}
+    pools: Dict[tuple, ReplicaPool] = {}
+    output_stats: Dict[str, OutputStats] = {}
 
     if args.dry_run:
         wrappers = {
@@ -139,23 +192,46 @@ async def run_experiment(args: argparse.Namespace) -> None:
             timeout = float(params.get("timeout", 30.0))
             max_retries = int(params.get("max_retries", 2))
             model_id = str(params.get("model")) if params.get("model") else cfg.model_name
+            structured_output = params.get("structured_output", experiment_section.get("structured_output"))
+            max_repairs = int(params.get("max_repairs", experiment_section.get("max_repairs", 0)))
+            adaptive = params.get(
+                "adaptive_max_tokens", experiment_section.get("adaptive_max_tokens")
+            )
 
             if cfg.endpoint:
-                base_url = cfg.endpoint.rstrip("/")
+                urls = _url_list(cfg.endpoint)
             elif cfg.model_slot and cfg.model_slot in endpoint_map:
-                base_url = endpoint_map[cfg.model_slot].rstrip("/")
+                urls = endpoint_map[cfg.model_slot]
             elif default_endpoint:
-                base_url = str(default_endpoint).rstrip("/")
+                urls = _url_list(default_endpoint)
             else:
-                base_url = f"http://localhost:{cfg.port}"
+                urls = [f"http://localhost:{cfg.port}"]
+            stats_key = (tuple(urls), model_id)
             wrappers[cfg.agent_id] = LLMWrapper(
-                base_url=base_url,
+                base_url=urls[0],
                 timeout=timeout,
                 max_retries=max_retries,
                 temperature=temperature,
                 max_tokens=max_tokens,
                 top_p=top_p,
                 model=model_id,
+                pool=(
+                    pools.setdefault(tuple(urls), ReplicaPool.from_mapping(urls, routing))
+                    if len(urls) > 1
+                    else None
+                ),
+                hedge_percentile=hedge_percentile,
+                hedge_min_samples=hedge_min_samples,
+                hedge_stats=hedge_stats.setdefault(stats_key, HedgeStats()),
+                repair_hedge_stats=repair_hedge_stats.setdefault(stats_key, HedgeStats()),
+                structured_output=str(structured_output) if structured_output else None,
+                output_stats=output_stats.setdefault(
+                    cfg.model_slot or model_id or cfg.agent_id, OutputStats()
+                ),
+                max_repairs=max_repairs,
+                token_budget=TokenBudget.from_mapping(max_tokens, adaptive),
+                samples=int(params.get("samples", experiment_section.get("decision_samples", 1))),
+                contract=turn_config.response_contract,
             )
 
     progress_cb = None
@@ -179,22 +255,75 @@ async def run_experiment(args: argparse.Namespace) -> None:
         turn_config,
         progress_callback=progress_cb,
     )
-    results = await manager.run()
+    warmup_report = None
+    warmup_cfg = experiment_section.get("warmup")
+    if (args.warmup or warmup_cfg) and not args.dry_run:
+        warmup_timeout = float(warmup_cfg.get("timeout", 3.0)) if isinstance(warmup_cfg, dict) else 3.0
+        warmup_report = await warm_up(
+            wrappers,
+            {agent_id: manager.system_prompt(agent_id) for agent_id in wrappers},
+            timeout=warmup_timeout,
+        )
+        print(  # noqa: T201 - CLI status output
+            "Warm-up completed.",
+            json.dumps(
+                {
+                    "cold_seconds": warmup_report["cold_seconds"],
+                    "warm_seconds": warmup_report["warm_seconds"],
+                    "failed": warmup_report["failed"],
+                }
+            ),
+            flush=True,
+        )
+
+    turns = 0
+    late_decisions = 0
+    async for result in manager.iter_turns():
+        turns += 1
+        late_decisions += len(result.late_agents)
+
+    summary = {
+        "turns": turns,
+        "log_path": str(turn_config.log_path),
+        "dry_run": bool(args.dry_run),
+        "stop_reason": manager.stop_reason,
+        "late_decisions": late_decisions,
+    }
+    if manager.detector is not None:
+        summary["stability"] = manager.detector.summary()
+    summary["scheduler"] = manager.scheduler.report()
+    if warmup_report is not None:
+        summary["warmup"] = warmup_report
+    if hedge_percentile is not None:
+        summary["hedging"] = {
+            f"{model or '-'}@{'|'.join(urls)}": dict(
+                stats.to_json(), repairs=repair_hedge_stats[(urls, model)].to_json()
+            )
+            for (urls, model), stats in hedge_stats.items()
+            if len(urls) > 1
+        }
+    budgets = {
+        agent_id: wrapper.token_budget.to_json()
+        for agent_id, wrapper in wrappers.items()
+        if getattr(wrapper, "token_budget", None) is not None
+    }
+    if budgets:
+        summary["token_budgets"] = budgets
+    summary["history_tokens"] = manager.history_tokens.report()
+    summary["prompts"] = manager.prompts.report()
+    if output_stats:
+        summary["output"] = {slot: stats.to_json() for slot, stats in output_stats.items()}
+    if pools:
+        summary["replicas"] = {"|".join(urls): pool.to_json() for urls, pool in pools.items()}
+    run_info_path = turn_config.log_path.with_name("run_info.json")
+    run_info_path.write_text(json.dumps(summary, indent=2, ensure_ascii=True), encoding="utf-8")
 
     metrics_path = experiment_section.get("metrics_path")
     if metrics_path:
         metrics_path = resolve_path(Path(raw_config["base_dir"]), metrics_path)
         metrics_path.parent.mkdir(parents=True, exist_ok=True)
         metrics_path.write_text(
-            json.dumps(
-                {
-                    "turns": len(results),
-                    "log_path": str(turn_config.log_path),
-                    "dry_run": bool(args.dry_run),
-                },
-                indent=2,
-                ensure_ascii=True,
-            ),
+            json.dumps(summary, indent=2, ensure_ascii=True),
             encoding="utf-8",
         )
 
@@ -202,9 +331,10 @@ async def run_experiment(args: argparse.Namespace) -> None:
         "Run completed.",
         json.dumps(
             {
-                "turns": len(results),
+                "turns": turns,
                 "log": str(turn_config.log_path),
                 "dry_run": bool(args.dry_run),
+                "stop_reason": manager.stop_reason,
             }
         ),
     )
@@ -221,6 +351,11 @@ def build_parser() -> argparse.ArgumentParser:
         action="store_true",
         help="Print per-turn progress (phase, events, decisions).",
     )
+    parser.add_argument(
+        "--warmup",
+        action="store_true",
+        help="Probe endpoints and prime system prompts before turn 1.",
+    )
     return parser
 
 
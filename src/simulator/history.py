@@ -0,0 +1,298 @@
+"""Pluggable encoders that turn an agent's past turns into chat history messages.
+
+Every encoder receives :class:`HistoryRecord` items in turn order and returns
+``{"role", "content"}`` messages. ``json`` reproduces the original format;
+``line`` and ``tuple`` drop the repeated key names; ``digest`` keeps the
+last few turns verbatim and folds older ones into one decision table.
+"""
+from __future__ import annotations
+
+import abc
+import json
+import re
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, Iterable, List, Mapping, Optional, Sequence, Type
+
+from src.utils.event_log import iter_events
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+@dataclass(frozen=True)
+class HistoryRecord:
+    turn: int
+    decision: Any
+    message: str
+
+
+def estimate_tokens(text: str) -> int:
+    """Tokenizer-free estimate: one token per word run or punctuation mark."""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+class TokenCounter:
+    """Estimated tokens of one agent's rendered history, updated one record at a time.
+
+    With ``window`` only the last ``window`` entries count, as in the prompt.
+    """
+
+    def __init__(self, encoder: "HistoryEncoder", window: Optional[int] = None) -> None:
+        self.encoder = encoder
+        self.tokens = 0
+        self._sizes: Optional[Deque[int]] = deque() if window else None
+        self._window = window
+
+    def add(self, record: HistoryRecord) -> int:
+        """Account for ``record``; return the tokens of the history so far."""
+        size = estimate_tokens(self.encoder.entry(record)["content"])
+        self.tokens += size
+        if self._sizes is not None:
+            self._sizes.append(size)
+            if len(self._sizes) > self._window:
+                self.tokens -= self._sizes.popleft()
+        return self.tokens
+
+
+class HistoryEncoder(abc.ABC):
+    """Base encoder: one assistant message per past turn.
+
+    Encoders with ``incremental = True`` only ever append one message per
+    record, so callers may extend the message list instead of re-rendering.
+    Others re-render from the last :meth:`span` records each turn. ``limit``
+    is the run's ``history_window`` in turns.
+    """
+
+    name = "base"
+    incremental = True
+
+    def __init__(self, **options: Any) -> None:
+        self.options = options
+
+    @abc.abstractmethod
+    def entry(self, record: HistoryRecord) -> Dict[str, str]:
+        """Message for a single past turn."""
+
+    def render(
+        self, records: Sequence[HistoryRecord], limit: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        if limit:
+            records = records[-limit:]
+        return [self.entry(record) for record in records]
+
+    def span(self, limit: Optional[int] = None) -> Optional[int]:
+        """How many of the latest records :meth:`render` reads (``None``: all)."""
+        return limit or None
+
+    def counter(self, limit: Optional[int] = None) -> TokenCounter:
+        """Running token estimate of :meth:`render` over a growing record list."""
+        return TokenCounter(self, limit)
+
+
+HISTORY_ENCODERS: Dict[str, Type[HistoryEncoder]] = {}
+
+
+def register_history_encoder(name: str) -> Callable[[Type[HistoryEncoder]], Type[HistoryEncoder]]:
+    def decorator(cls: Type[HistoryEncoder]) -> Type[HistoryEncoder]:
+        cls.name = name
+        HISTORY_ENCODERS[name] = cls
+        return cls
+
+    return decorator
+
+
+def get_history_encoder(spec: str | Mapping[str, Any] | None = None) -> HistoryEncoder:
+    """Build an encoder from a name or ``{"encoder": name, **options}``."""
+    if spec is None or spec == "":
+        return HISTORY_ENCODERS["json"]()
+    if isinstance(spec, str):
+        name, options = spec, {}
+    else:
+        options = dict(spec)
+        name = str(options.pop("encoder", "json"))
+    if name not in HISTORY_ENCODERS:
+        raise ValueError(f"Unknown history encoder: {name}")
+    return HISTORY_ENCODERS[name](**options)
+
+
+@register_history_encoder("json")
+class JsonEncoder(HistoryEncoder):
+    def entry(self, record: HistoryRecord) -> Dict[str, str]:
+        return {
+            "role": "assistant",
+            "content": json.dumps(
+                {"turn": record.turn, "decision": record.decision, "message": record.message}
+            ),
+        }
+
+
+@register_history_encoder("line")
+class LineEncoder(HistoryEncoder):
+    def entry(self, record: HistoryRecord) -> Dict[str, str]:
+        return {"role": "assistant", "content": f"T{record.turn} {record.decision}: {record.message}"}
+
+
+@register_history_encoder("tuple")
+class TupleEncoder(HistoryEncoder):
+    def entry(self, record: HistoryRecord) -> Dict[str, str]:
+        return {
+            "role": "assistant",
+            "content": json.dumps([record.turn, record.decision, record.message], ensure_ascii=False),
+        }
+
+
+@register_history_encoder("digest")
+class DigestEncoder(HistoryEncoder):
+    """Last ``recent`` turns as lines; older turns as one ``turn:decision`` table.
+
+    ``rows`` caps the table to its newest rows (default: no cap). With
+    ``limit`` only the last ``limit`` turns are shown: the table row is kept,
+    at most ``limit - 1`` turns are lines and the table covers the rest.
+    """
+
+    incremental = False
+    HEADER = "Earlier decisions (turn:decision): "
+
+    @property
+    def recent(self) -> int:
+        return int(self.options.get("recent", 3))
+
+    @property
+    def rows(self) -> Optional[int]:
+        rows = self.options.get("rows")
+        return None if rows is None else int(rows)
+
+    def _lines(self, limit: Optional[int]) -> int:
+        return self.recent if not limit else min(self.recent, max(0, limit - 1))
+
+    def _table(self, limit: Optional[int]) -> Optional[int]:
+        caps = [cap for cap in (self.rows, limit - self._lines(limit) if limit else None) if cap is not None]
+        return min(caps) if caps else None
+
+    def entry(self, record: HistoryRecord) -> Dict[str, str]:
+        return LineEncoder().entry(record)
+
+    def render(
+        self, records: Sequence[HistoryRecord], limit: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        span = self.span(limit)
+        if span is not None:
+            records = records[-span:] if span else []
+        cut = max(0, len(records) - self._lines(limit))
+        older, latest = records[:cut], records[cut:]
+        messages: List[Dict[str, str]] = []
+        if older:
+            rows = " ".join(self._row(record) for record in older)
+            messages.append({"role": "assistant", "content": self.HEADER + rows})
+        messages.extend(self.entry(record) for record in latest)
+        return messages
+
+    def span(self, limit: Optional[int] = None) -> Optional[int]:
+        table = self._table(limit)
+        return None if table is None else self._lines(limit) + table
+
+    @staticmethod
+    def _row(record: HistoryRecord) -> str:
+        return f"{record.turn}:{record.decision}"
+
+    def counter(self, limit: Optional[int] = None) -> TokenCounter:
+        return _DigestCounter(self, limit)
+
+
+class _DigestCounter(TokenCounter):
+    """Digest tokens without re-rendering: table row tokens plus recent line tokens."""
+
+    def __init__(self, encoder: DigestEncoder, limit: Optional[int]) -> None:
+        super().__init__(encoder)
+        self.line_cap = encoder._lines(limit)
+        self.row_cap = encoder._table(limit)
+        self.lines: Deque[tuple[HistoryRecord, int]] = deque()
+        self.rows: Deque[int] = deque()
+        self.header = estimate_tokens(DigestEncoder.HEADER)
+
+    def add(self, record: HistoryRecord) -> int:
+        self.lines.append((record, estimate_tokens(self.encoder.entry(record)["content"])))
+        while len(self.lines) > self.line_cap:
+            older, _ = self.lines.popleft()
+            self.rows.append(estimate_tokens(DigestEncoder._row(older)))
+            if self.row_cap is not None and len(self.rows) > self.row_cap:
+                self.rows.popleft()
+        table = self.header + sum(self.rows) if self.rows else 0
+        self.tokens = table + sum(size for _, size in self.lines)
+        return self.tokens
+
+
+class HistoryTokenMeter:
+    """Running per-encoder history token totals, fed one record per agent turn.
+
+    ``final_history_tokens`` is the history at the end of the run;
+    ``prefill_tokens`` sums the history sent on each turn (turn ``t`` resends
+    turns ``1..t-1``), which is what a run pays in prompt processing. Both
+    apply ``window`` (the run's ``history_window``) the way the prompt does.
+    Counters keep at most ``window`` sizes per agent.
+    """
+
+    def __init__(self, encoders: Optional[Iterable[str]] = None, window: Optional[int] = None) -> None:
+        self.encoders = {name: get_history_encoder(name) for name in encoders or HISTORY_ENCODERS}
+        self.window = window
+        self._counters: Dict[str, Dict[str, TokenCounter]] = {name: {} for name in self.encoders}
+        self._prefill: Dict[str, int] = {name: 0 for name in self.encoders}
+
+    def add(self, agent_id: str, record: HistoryRecord) -> None:
+        for name, encoder in self.encoders.items():
+            counter = self._counters[name].get(agent_id)
+            if counter is None:
+                counter = self._counters[name][agent_id] = encoder.counter(self.window)
+            self._prefill[name] += counter.tokens
+            counter.add(record)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "final_history_tokens": sum(counter.tokens for counter in counters.values()),
+                "prefill_tokens": self._prefill[name],
+            }
+            for name, counters in self._counters.items()
+        }
+
+
+def history_token_report(
+    records: Mapping[str, Iterable[HistoryRecord]],
+    encoders: Optional[Iterable[str]] = None,
+    window: Optional[int] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Estimated tokens of each agent's history under every encoder (see :class:`HistoryTokenMeter`)."""
+    meter = HistoryTokenMeter(encoders, window)
+    for agent_id, agent_records in records.items():
+        for record in agent_records:
+            meter.add(agent_id, record)
+    return meter.report()
+
+
+def records_from_log(log_path: Path) -> Dict[str, List[HistoryRecord]]:
+    """Rebuild per-agent history records from an event log."""
+    records: Dict[str, List[HistoryRecord]] = {}
+    for entry in iter_events(log_path, fields=("turn", "agent", "decision", "message")):
+        records.setdefault(str(entry.get("agent")), []).append(
+            HistoryRecord(
+                turn=int(entry.get("turn") or 0),
+                decision=str(entry.get("decision") or ""),
+                message=str(entry.get("message") or ""),
+            )
+        )
+    return records
+
+
+__all__ = [
+    "HISTORY_ENCODERS",
+    "HistoryEncoder",
+    "HistoryRecord",
+    "HistoryTokenMeter",
+    "TokenCounter",
+    "estimate_tokens",
+    "get_history_encoder",
+    "history_token_report",
+    "records_from_log",
+    "register_history_encoder",
+]
@@ -0,0 +1,93 @@
+"""Per-(agent, phase) prompt compilation.
+
+Persona, role, phase name and phase constraints do not change during a run,
+so the system prompt and the serialized constraint block are rendered once
+per agent and phase and then reused every turn. Each compiled prompt also
+carries its estimated token counts for the run report.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from src.agents.agent_manager import AgentManager
+from src.agents.llm_wrapper import ResponseContract, constraints_block
+from src.simulator.history import estimate_tokens
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle with turn_manager
+    from src.simulator.turn_manager import PhaseConfig
+
+PromptKey = Tuple[str, Optional[str], Optional[int]]
+
+
+@dataclass(frozen=True)
+class CompiledPrompt:
+    system: str
+    system_message: Dict[str, str]
+    constraints: Optional[str]
+    system_tokens: int
+    constraints_tokens: int
+
+    @property
+    def tokens(self) -> int:
+        return self.system_tokens + self.constraints_tokens
+
+
+class PromptCompiler:
+    """Render and cache the static prompt parts of every agent and phase."""
+
+    def __init__(self, agent_manager: AgentManager, contract: ResponseContract) -> None:
+        self.agent_manager = agent_manager
+        self.contract = contract
+        self.hits = 0
+        self._cache: Dict[PromptKey, CompiledPrompt] = {}
+
+    def compile(self, agent_id: str, phase: Optional[PhaseConfig]) -> CompiledPrompt:
+        key: PromptKey = (agent_id, phase.name if phase else None, phase.start if phase else None)
+        compiled = self._cache.get(key)
+        if compiled is not None:
+            self.hits += 1
+            return compiled
+        system = self._render_system(agent_id, phase)
+        constraints = constraints_block(phase.constraints if phase else None)
+        compiled = CompiledPrompt(
+            system=system,
+            system_message={"role": "system", "content": system},
+            constraints=constraints,
+            system_tokens=estimate_tokens(system),
+            constraints_tokens=estimate_tokens(constraints) if constraints else 0,
+        )
+        self._cache[key] = compiled
+        return compiled
+
+    def _render_system(self, agent_id: str, phase: Optional[PhaseConfig]) -> str:
+        state = self.agent_manager.get_agent(agent_id)
+        persona = state.config.persona or ""
+        model_name = state.config.model_name or ""
+        model_slot = state.config.model_slot or ""
+        contract = self.contract.for_phase(phase.thought_chars if phase else None)
+        return (
+            f"You are {state.config.name} ({state.config.role}). "
+            f"Current phase: {phase.name if phase else 'free'}. "
+            + contract.system_hint()
+            + (
+                f"\nModel identifier: {model_name or model_slot}."
+                if (model_name or model_slot)
+                else ""
+            )
+            + (
+                "\nPersona guidelines:\n" + persona
+                if persona
+                else ""
+            )
+        )
+
+    def report(self) -> Dict[str, Any]:
+        """Cache counters and estimated static prompt tokens per agent and phase."""
+        tokens: Dict[str, Dict[str, int]] = {}
+        for (agent_id, phase_name, _), compiled in self._cache.items():
+            tokens.setdefault(agent_id, {})[phase_name or "free"] = compiled.tokens
+        return {"compiled": len(self._cache), "hits": self.hits, "tokens": tokens}
+
+
+__all__ = ["CompiledPrompt", "PromptCompiler"]
@@ -0,0 +1,98 @@
+"""Retention of ``AgentTurn.raw_response`` payloads during long runs."""
+from __future__ import annotations
+
+import json
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Deque, Mapping, Optional
+
+from src.utils.event_log import raw_path_for
+
+if TYPE_CHECKING:  # pragma: no cover - import cycle with turn_manager
+    from src.simulator.turn_manager import TurnResult
+
+RETENTION_MODES = ("keep", "drop", "last", "spill")
+
+
+@dataclass(frozen=True)
+class RawResponsePolicy:
+    """What happens to a turn's raw responses once the consumer moves on.
+
+    - ``keep``: retain every raw response (default, unbounded).
+    - ``drop``: replace them with ``{}``.
+    - ``last``: retain them on the last ``keep`` turns only.
+    - ``spill``: append them to ``path`` (JSONL) and keep ``{"spilled": offset}``.
+    """
+
+    mode: str = "keep"
+    keep: int = 0
+    path: Optional[Path] = None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any] | str | None) -> "RawResponsePolicy":
+        if not data:
+            return cls()
+        if isinstance(data, str):
+            data = {"mode": data}
+        mode = str(data.get("mode", cls.mode)).lower()
+        if mode not in RETENTION_MODES:
+            raise ValueError(f"Unknown raw response retention mode: {mode}")
+        keep = int(data.get("keep", 0))
+        if mode == "last" and keep < 1:
+            raise ValueError(f"raw response retention 'last' needs keep >= 1, got {keep}")
+        path = data.get("path")
+        return cls(mode=mode, keep=keep, path=Path(path) if path else None)
+
+
+class RawResponseRetainer:
+    """Apply a :class:`RawResponsePolicy` to results as they are released."""
+
+    def __init__(self, policy: RawResponsePolicy, log_path: Path) -> None:
+        self.policy = policy
+        self.spill_path = policy.path or raw_path_for(log_path)
+        self._recent: Deque[TurnResult] = deque()
+        self._spill: Optional[IO[bytes]] = None
+
+    def release(self, result: TurnResult) -> None:
+        """Called once the consumer is done with ``result``."""
+        mode = self.policy.mode
+        if mode == "keep":
+            return
+        if mode == "last":
+            self._recent.append(result)
+            while len(self._recent) > self.policy.keep:
+                self._clear(self._recent.popleft())
+            return
+        if mode == "spill":
+            self._write(result)
+        else:
+            self._clear(result)
+
+    def _write(self, result: TurnResult) -> None:
+        if self._spill is None:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            # Offsets only mean something within one run, so start the file afresh.
+            self._spill = self.spill_path.open("wb")
+        for agent_turn in result.agent_turns:
+            offset = self._spill.tell()
+            record = {
+                "turn": result.turn,
+                "agent": agent_turn.agent_id,
+                "raw_response": agent_turn.raw_response,
+            }
+            self._spill.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+            agent_turn.raw_response = {"spilled": offset}
+
+    @staticmethod
+    def _clear(result: TurnResult) -> None:
+        for agent_turn in result.agent_turns:
+            agent_turn.raw_response = {}
+
+    def close(self) -> None:
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+
+__all__ = ["RETENTION_MODES", "RawResponsePolicy", "RawResponseRetainer"]
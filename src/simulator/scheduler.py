@@ -0,0 +1,382 @@
+"""Model-affinity scheduling of a turn's LLM requests.
+
+Several model slots often share one LM Studio host, which keeps a single
+model resident and swaps on demand. Issuing requests in agent order makes the
+host reload a model on almost every call; grouping them by
+``(endpoint, model)`` swaps at most once per model per turn. Batches for
+different endpoints run concurrently, batches on one endpoint run back to
+back starting with the model that is already loaded. A slot backed by a
+replica pool runs up to one request per healthy replica at a time.
+
+With ``lock_dir`` set, runs on the same machine coordinate through a lock
+file per endpoint: each affinity batch holds the lock, and the model that was
+loaded last (by any run) is recorded next to it so the next batch prefers it.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import statistics
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Mapping, Optional, Tuple
+
+try:  # pragma: no cover - platform dependent
+    import fcntl
+except ImportError:  # pragma: no cover - Windows hosts fall back to in-process ordering
+    fcntl = None  # type: ignore[assignment]
+
+from src.agents.llm_wrapper import AgentTurn, LLMWrapper, PromptPayload
+
+SCHEDULER_MODES = ("sequential", "affinity")
+# Interval between attempts to take a contended endpoint lock.
+LOCK_POLL_SECONDS = 0.05
+# Share of a turn deadline after which queued requests start concurrently.
+STRAGGLER_FRACTION = 0.5
+AffinityKey = Tuple[str, str]
+
+
+@dataclass(frozen=True)
+class SchedulerConfig:
+    """``mode``: ``sequential`` (agent order) or ``affinity`` (grouped by model).
+
+    - ``spike_factor``: a call slower than this multiple of the model's warm
+      median latency (and at least ``min_spike`` seconds slower) is reported
+      as a latency spike.
+    - ``lock_dir``: directory for cross-run endpoint locks (``None`` disables).
+    - ``max_records``: per-call records kept for warm medians and spikes;
+      call, swap and latency totals cover the whole run.
+    """
+
+    mode: str = "sequential"
+    spike_factor: float = 3.0
+    min_spike: float = 0.5
+    lock_dir: Optional[Path] = None
+    max_records: int = 5000
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any] | str | None) -> "SchedulerConfig":
+        if not data:
+            return cls()
+        if isinstance(data, str):
+            data = {"mode": data}
+        mode = str(data.get("mode", cls.mode)).lower()
+        if mode not in SCHEDULER_MODES:
+            raise ValueError(f"Unknown scheduler mode: {mode}")
+        lock_dir = data.get("lock_dir")
+        max_records = int(data.get("max_records", cls.max_records))
+        if max_records < 1:
+            raise ValueError(f"scheduler.max_records must be >= 1, got {max_records}")
+        return cls(
+            mode=mode,
+            spike_factor=float(data.get("spike_factor", cls.spike_factor)),
+            min_spike=float(data.get("min_spike", cls.min_spike)),
+            lock_dir=Path(lock_dir) if lock_dir else None,
+            max_records=max_records,
+        )
+
+
+@dataclass
+class PendingRequest:
+    agent_id: str
+    wrapper: LLMWrapper
+    payload: PromptPayload
+
+    @property
+    def key(self) -> AffinityKey:
+        return affinity_key(self.wrapper)
+
+
+@dataclass
+class CallRecord:
+    turn: int
+    agent_id: str
+    endpoint: str
+    model: str
+    latency: float
+    after_swap: bool
+
+
+def affinity_key(wrapper: LLMWrapper) -> AffinityKey:
+    """``(endpoint, model)``; a replicated slot's endpoint joins all replica URLs."""
+    urls = getattr(wrapper, "urls", None) or [getattr(wrapper, "base_url", "") or ""]
+    return ("|".join(urls), getattr(wrapper, "model", None) or "")
+
+
+ChatCall = Callable[[PendingRequest], Awaitable[AgentTurn]]
+
+
+@dataclass
+class TurnBudget:
+    """Loop-time expiry of one turn's deadline and the agents already started."""
+
+    expires: float
+    started: set[str] = field(default_factory=set)
+
+    def remaining(self) -> float:
+        return self.expires - asyncio.get_running_loop().time()
+
+
+class AffinityScheduler:
+    """Execute pending requests and keep per-call latency/swap records."""
+
+    def __init__(self, config: Optional[SchedulerConfig] = None) -> None:
+        self.config = config or SchedulerConfig()
+        self.records: Deque[CallRecord] = deque(maxlen=self.config.max_records)
+        self.calls = 0
+        self.swaps = 0
+        self.total_latency = 0.0
+        self.swap_latency = 0.0
+        self._loaded: Dict[str, str] = {}
+
+    async def execute(
+        self,
+        turn: int,
+        requests: List[PendingRequest],
+        call: ChatCall,
+        responses: Optional[Dict[str, AgentTurn]] = None,
+        *,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, AgentTurn]:
+        """Run ``call`` for every request; return responses keyed by agent id.
+
+        Responses are stored in ``responses`` as they arrive, so a caller
+        that cancels the execution keeps finished ones. ``deadline`` bounds
+        the whole turn: each request gets what is left of it, and requests
+        still queued after ``STRAGGLER_FRACTION`` of it start concurrently,
+        so agents late in the order are not starved by their position.
+        Requests that miss the deadline are cancelled and left out of
+        ``responses``.
+        """
+        responses = {} if responses is None else responses
+        if deadline is None:
+            await self._schedule(turn, requests, call, responses, None)
+            return responses
+
+        budget = TurnBudget(asyncio.get_running_loop().time() + deadline)
+        tasks = {asyncio.ensure_future(self._schedule(turn, requests, call, responses, budget))}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=deadline * STRAGGLER_FRACTION)
+            if not done:
+                tasks.update(
+                    asyncio.ensure_future(self._store(turn, item, call, responses, budget))
+                    for item in requests
+                    if item.agent_id not in budget.started
+                )
+                await asyncio.wait(tasks, timeout=max(0.0, budget.remaining()))
+        finally:
+            for task in tasks:
+                task.cancel()
+        return responses
+
+    async def _schedule(
+        self,
+        turn: int,
+        requests: List[PendingRequest],
+        call: ChatCall,
+        responses: Dict[str, AgentTurn],
+        budget: Optional[TurnBudget],
+    ) -> None:
+        if self.config.mode == "sequential":
+            for item in requests:
+                await self._store(turn, item, call, responses, budget)
+            return
+
+        lanes: Dict[str, Dict[str, List[PendingRequest]]] = {}
+        for item in requests:
+            endpoint, model = item.key
+            lanes.setdefault(endpoint, {}).setdefault(model, []).append(item)
+        await asyncio.gather(
+            *(
+                self._run_lane(turn, endpoint, batches, call, responses, budget)
+                for endpoint, batches in lanes.items()
+            )
+        )
+
+    async def _run_lane(
+        self,
+        turn: int,
+        endpoint: str,
+        batches: Dict[str, List[PendingRequest]],
+        call: ChatCall,
+        responses: Dict[str, AgentTurn],
+        budget: Optional[TurnBudget],
+    ) -> None:
+        while batches:
+            async with self._endpoint_lock(endpoint):
+                loaded = self._shared_loaded(endpoint)
+                model = loaded if loaded in batches else next(iter(batches))
+                await self._run_batch(turn, batches.pop(model), call, responses, budget)
+                self._store_loaded(endpoint, model)
+
+    async def _run_batch(
+        self,
+        turn: int,
+        items: List[PendingRequest],
+        call: ChatCall,
+        responses: Dict[str, AgentTurn],
+        budget: Optional[TurnBudget],
+    ) -> None:
+        """Run one affinity batch, up to one request per healthy replica at a time."""
+        limit = asyncio.Semaphore(getattr(items[0].wrapper, "concurrency", 1))
+
+        async def run(item: PendingRequest) -> None:
+            async with limit:
+                await self._store(turn, item, call, responses, budget)
+
+        await asyncio.gather(*(run(item) for item in items))
+
+    async def _store(
+        self,
+        turn: int,
+        item: PendingRequest,
+        call: ChatCall,
+        responses: Dict[str, AgentTurn],
+        budget: Optional[TurnBudget],
+    ) -> None:
+        if budget is None:
+            responses[item.agent_id] = await self._timed(turn, item, call)
+            return
+        if item.agent_id in budget.started:
+            return  # already started as a straggler
+        budget.started.add(item.agent_id)
+        remaining = budget.remaining()
+        if remaining <= 0:
+            return
+        try:
+            responses[item.agent_id] = await asyncio.wait_for(
+                self._timed(turn, item, call), timeout=remaining
+            )
+        except asyncio.TimeoutError:
+            pass  # late: the caller applies its fallback
+
+    async def _timed(self, turn: int, item: PendingRequest, call: ChatCall) -> AgentTurn:
+        endpoint, model = item.key
+        after_swap = self._loaded.get(endpoint, model) != model
+        started = time.perf_counter()
+        response = await call(item)
+        self.record(
+            CallRecord(
+                turn=turn,
+                agent_id=item.agent_id,
+                endpoint=endpoint,
+                model=model,
+                latency=time.perf_counter() - started,
+                after_swap=after_swap,
+            )
+        )
+        self._loaded[endpoint] = model
+        return response
+
+    def record(self, record: CallRecord) -> None:
+        """Add ``record`` to the run totals and the bounded recent records."""
+        self.records.append(record)
+        self.calls += 1
+        self.total_latency += record.latency
+        if record.after_swap:
+            self.swaps += 1
+            self.swap_latency += record.latency
+
+    @contextlib.asynccontextmanager
+    async def _endpoint_lock(self, endpoint: str) -> AsyncIterator[None]:
+        if self.config.lock_dir is None or fcntl is None:
+            yield
+            return
+        self.config.lock_dir.mkdir(parents=True, exist_ok=True)
+        handle = self._lock_path(endpoint, ".lock").open("a")
+        try:
+            # Poll a non-blocking flock instead of blocking in a worker thread:
+            # a cancelled wait (e.g. a turn deadline) then leaves no thread
+            # behind that could take the lock after the file is closed.
+            while True:
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(LOCK_POLL_SECONDS)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+        finally:
+            handle.close()
+
+    def _lock_path(self, endpoint: str, suffix: str) -> Path:
+        assert self.config.lock_dir is not None
+        name = hashlib.sha1(endpoint.encode("utf-8")).hexdigest()[:16]
+        return self.config.lock_dir / f"{name}{suffix}"
+
+    def _shared_loaded(self, endpoint: str) -> Optional[str]:
+        if self.config.lock_dir is not None:
+            path = self._lock_path(endpoint, ".json")
+            if path.exists():
+                try:
+                    self._loaded[endpoint] = json.loads(path.read_text(encoding="utf-8"))["model"]
+                except (OSError, ValueError, KeyError):
+                    pass
+        return self._loaded.get(endpoint)
+
+    def _store_loaded(self, endpoint: str, model: str) -> None:
+        if self.config.lock_dir is not None:
+            self._lock_path(endpoint, ".json").write_text(
+                json.dumps({"endpoint": endpoint, "model": model}), encoding="utf-8"
+            )
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize swaps over the run and latency spikes over the kept records.
+
+        A spike is a call slower than ``spike_factor`` times the warm
+        (non-swap) median of its ``(endpoint, model)``; spikes on calls that
+        did not follow a swap in this run usually mean another process
+        swapped the model underneath it.
+        """
+        warm: Dict[AffinityKey, List[float]] = {}
+        for record in self.records:
+            if not record.after_swap:
+                warm.setdefault((record.endpoint, record.model), []).append(record.latency)
+        medians = {key: statistics.median(values) for key, values in warm.items()}
+
+        spikes: List[Dict[str, Any]] = []
+        for record in self.records:
+            median = medians.get((record.endpoint, record.model))
+            if median is None or record.latency - median < self.config.min_spike:
+                continue
+            if record.latency > self.config.spike_factor * median:
+                spikes.append(
+                    {
+                        "turn": record.turn,
+                        "agent": record.agent_id,
+                        "endpoint": record.endpoint,
+                        "model": record.model,
+                        "latency": round(record.latency, 4),
+                        "warm_median": round(median, 4),
+                        "after_swap": record.after_swap,
+                    }
+                )
+        return {
+            "mode": self.config.mode,
+            "calls": self.calls,
+            "swaps": self.swaps,
+            "swap_latency": round(self.swap_latency, 4),
+            "total_latency": round(self.total_latency, 4),
+            "warm_median": {
+                f"{endpoint}|{model}": round(value, 4)
+                for (endpoint, model), value in sorted(medians.items())
+            },
+            "spikes": spikes,
+        }
+
+
+__all__ = [
+    "AffinityScheduler",
+    "CallRecord",
+    "PendingRequest",
+    "SCHEDULER_MODES",
+    "SchedulerConfig",
+    "TurnBudget",
+    "affinity_key",
+]
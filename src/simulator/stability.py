@@ -0,0 +1,133 @@
+"""Online collapse/recovery detection over the live cooperation and trust series."""
+from __future__ import annotations
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Mapping, Optional
+
+
+@dataclass(frozen=True)
+class StopRule:
+    """Stop once cooperation has recovered and stayed flat after the last shock.
+
+    - ``window``: turns in the rolling cooperation/trust average.
+    - ``stable_turns``: consecutive post-shock turns whose rolling values must
+      stay within ``tolerance`` (cooperation) and ``trust_tolerance`` (trust).
+    - ``recovery_ratio``: rolling cooperation must reach this fraction of the
+      pre-shock baseline to count as recovered.
+    - ``collapse_drop``: drop below the baseline that marks a collapse.
+    - ``min_turn``: never stop before this turn.
+    """
+
+    stable_turns: int = 5
+    window: int = 3
+    tolerance: float = 0.1
+    trust_tolerance: float = 0.05
+    recovery_ratio: float = 0.9
+    collapse_drop: float = 0.2
+    min_turn: int = 0
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any] | None) -> Optional["StopRule"]:
+        if not data or not data.get("enabled", True):
+            return None
+        return cls(
+            stable_turns=int(data.get("stable_turns", cls.stable_turns)),
+            window=int(data.get("window", cls.window)),
+            tolerance=float(data.get("tolerance", cls.tolerance)),
+            trust_tolerance=float(data.get("trust_tolerance", cls.trust_tolerance)),
+            recovery_ratio=float(data.get("recovery_ratio", cls.recovery_ratio)),
+            collapse_drop=float(data.get("collapse_drop", cls.collapse_drop)),
+            min_turn=int(data.get("min_turn", cls.min_turn)),
+        )
+
+
+@dataclass
+class StabilityDetector:
+    """Track per-turn cooperation/trust and report when ``rule`` fires.
+
+    ``last_shock_turn`` is the final turn of the last scheduled shock phase
+    (``None`` when the scenario has no shock). The pre-shock mean cooperation
+    rate is the recovery baseline; the first rolling value below
+    ``baseline - collapse_drop`` marks the collapse turn and the first later
+    value back at ``recovery_ratio * baseline`` marks the recovery turn.
+    """
+
+    rule: StopRule
+    last_shock_turn: Optional[int] = None
+    baseline: Optional[float] = None
+    collapse_turn: Optional[int] = None
+    recovery_turn: Optional[int] = None
+    stop_reason: Optional[str] = None
+    stopped_at: Optional[int] = None
+    _pre_shock: List[float] = field(default_factory=list)
+    _coop: Deque[float] = field(default_factory=deque)
+    _trust: Deque[float] = field(default_factory=deque)
+    _rolling: Deque[tuple] = field(default_factory=deque)
+    _shock_seen: bool = False
+
+    def update(
+        self,
+        turn: int,
+        phase: Optional[str],
+        cooperation_rate: float,
+        mean_trust: Optional[float],
+    ) -> Optional[str]:
+        """Feed one finished turn; return the stop reason when the rule fires."""
+        in_shock = bool(phase) and "shock" in str(phase).lower()
+        self._shock_seen = self._shock_seen or in_shock
+        if not self._shock_seen:
+            self._pre_shock.append(cooperation_rate)
+        elif self.baseline is None and self._pre_shock:
+            self.baseline = sum(self._pre_shock) / len(self._pre_shock)
+
+        window = max(1, self.rule.window)
+        self._coop.append(cooperation_rate)
+        if len(self._coop) > window:
+            self._coop.popleft()
+        if mean_trust is not None:
+            self._trust.append(mean_trust)
+            if len(self._trust) > window:
+                self._trust.popleft()
+        rolling_coop = sum(self._coop) / len(self._coop)
+        rolling_trust = sum(self._trust) / len(self._trust) if self._trust else None
+
+        recovered = self.baseline is None or rolling_coop >= self.rule.recovery_ratio * self.baseline
+        if self._shock_seen and self.baseline is not None:
+            if self.collapse_turn is None and rolling_coop < self.baseline - self.rule.collapse_drop:
+                self.collapse_turn = turn
+            elif self.collapse_turn is not None and self.recovery_turn is None and recovered:
+                self.recovery_turn = turn
+
+        after_shocks = self.last_shock_turn is None or turn > self.last_shock_turn
+        if not after_shocks:
+            self._rolling.clear()
+            return None
+        self._rolling.append((rolling_coop, rolling_trust))
+        if len(self._rolling) > self.rule.stable_turns:
+            self._rolling.popleft()
+        if (
+            self.stop_reason is None
+            and turn >= self.rule.min_turn
+            and recovered
+            and len(self._rolling) >= self.rule.stable_turns
+            and self._within(0, self.rule.tolerance)
+            and self._within(1, self.rule.trust_tolerance)
+        ):
+            after = f"after turn {self.last_shock_turn}" if self.last_shock_turn else "without shocks"
+            self.stop_reason = f"recovered and stable for {self.rule.stable_turns} turns {after}"
+            self.stopped_at = turn
+        return self.stop_reason
+
+    def _within(self, index: int, tolerance: float) -> bool:
+        values = [item[index] for item in self._rolling if item[index] is not None]
+        return not values or max(values) - min(values) <= tolerance
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "stop_reason": self.stop_reason,
+            "stopped_at": self.stopped_at,
+            "baseline_cooperation": round(self.baseline, 4) if self.baseline is not None else None,
+            "collapse_turn": self.collapse_turn,
+            "recovery_turn": self.recovery_turn,
+        }
@@ -1,15 +1,49 @@
 """Turn manager orchestrates multi-agent turns and logging."""
 from __future__ import annotations
 
-import asyncio
-import json
 import random
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, TextIO
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional
 
 from src.agents.agent_manager import AgentManager
-from src.agents.llm_wrapper import AgentTurn, LLMWrapper, PromptPayload
+from src.agents.llm_wrapper import (
+    AgentTurn,
+    LLMWrapper,
+    MessageBuffer,
+    PromptPayload,
+    ResponseContract,
+)
+from src.simulator.history import HistoryRecord, HistoryTokenMeter, get_history_encoder
+from src.simulator.prompts import PromptCompiler
+from src.simulator.retention import RawResponsePolicy, RawResponseRetainer
+from src.simulator.scheduler import AffinityScheduler, PendingRequest, SchedulerConfig
+from src.simulator.stability import StabilityDetector, StopRule
+from src.utils.event_log import EventLogWriter
+
+COOPERATIVE_DECISIONS = frozenset({"join", "cooperate", "contribute", "support", "assist"})
+
+
+@dataclass(frozen=True)
+class DeadlineFallback:
+    """Decision and penalty for agents whose request misses the turn deadline."""
+
+    decision: str = "TIMEOUT"
+    trust_delta: float = 0.0
+    resources_delta: Dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_mapping(cls, data: Optional[Dict[str, Any]]) -> Optional["DeadlineFallback"]:
+        if not data:
+            return None
+        return cls(
+            decision=str(data.get("decision", cls.decision)),
+            trust_delta=float(data.get("trust_delta", 0.0)),
+            resources_delta={
+                str(key): float(value) for key, value in (data.get("resources_delta") or {}).items()
+            },
+        )
 
 
 @dataclass
@@ -20,6 +54,10 @@ class PhaseConfig:
     event: Optional[str] = None
     parameters: Dict[str, Any] = field(default_factory=dict)
     constraints: Dict[str, Any] = field(default_factory=dict)
+    deadline: Optional[float] = None
+    fallback: Optional[DeadlineFallback] = None
+    decisions: List[str] = field(default_factory=list)
+    thought_chars: Optional[int] = None
 
     def includes(self, turn: int) -> bool:
         return self.start <= turn <= self.end
@@ -31,6 +69,20 @@ class TurnConfig:
     max_turns: int
     log_path: Path
     phases: List[PhaseConfig]
+    log_layout: str = "jsonl"
+    compress_cold: bool = False
+    compress_log: bool = False
+    stop_rule: Optional[StopRule] = None
+    scheduler: SchedulerConfig = field(default_factory=SchedulerConfig)
+    turn_deadline: Optional[float] = None
+    deadline_fallback: DeadlineFallback = field(default_factory=DeadlineFallback)
+    decisions: List[str] = field(default_factory=list)
+    history_encoding: Any = "json"
+    history_window: Optional[int] = None
+    raw_responses: RawResponsePolicy = field(default_factory=RawResponsePolicy)
+    response_contract: ResponseContract = field(default_factory=ResponseContract)
+    # Decisions the stop rule counts as cooperative (the run's evaluation rules).
+    cooperative_decisions: frozenset[str] = COOPERATIVE_DECISIONS
 
 
 @dataclass
@@ -39,6 +91,7 @@ class TurnResult:
     phase: Optional[str]
     events: List[str]
     agent_turns: List[AgentTurn]
+    late_agents: List[str] = field(default_factory=list)
 
 
 class TurnManager:
@@ -60,66 +113,101 @@ class TurnManager:
         self.history: Dict[str, List[Dict[str, str]]] = {
             agent_id: [] for agent_id in wrappers
         }
+        self.history_encoder = get_history_encoder(config.history_encoding)
+        # Only encoders that re-render keep past records, and only as many as they read.
+        span = self.history_encoder.span(config.history_window)
+        self.history_records: Dict[str, Deque[HistoryRecord]] = (
+            {}
+            if self.history_encoder.incremental
+            else {agent_id: deque(maxlen=span) for agent_id in wrappers}
+        )
+        self.history_tokens = HistoryTokenMeter(window=config.history_window)
+        self.buffers: Dict[str, MessageBuffer] = {
+            agent_id: MessageBuffer(config.history_window) for agent_id in wrappers
+        }
         self._applied_events: set[tuple[str, int]] = set()
-        self._log_handle: Optional[TextIO] = None
+        self._log_handle: Optional[EventLogWriter] = None
         self._progress_callback = progress_callback
+        self.scheduler = AffinityScheduler(config.scheduler)
+        self.prompts = PromptCompiler(agent_manager, config.response_contract)
+        self.detector: Optional[StabilityDetector] = None
+        self.stop_reason: Optional[str] = None
 
     async def run(self) -> List[TurnResult]:
+        """Run every turn and return all results (see :meth:`iter_turns` for streaming)."""
+        return [result async for result in self.iter_turns()]
+
+    async def iter_turns(self) -> AsyncIterator[TurnResult]:
+        """Run turns and yield each result as soon as it is logged.
+
+        Raw responses of a yielded result are released per
+        ``config.raw_responses`` once the consumer asks for the next turn,
+        so a loop body always sees the current turn intact. ``stop_reason``
+        is already set when the stopping turn is yielded. Wrap in
+        ``contextlib.aclosing`` when breaking out early so the log is closed.
+        """
         self._set_seed(self.config.seed)
-        results: List[TurnResult] = []
-        with self.log_path.open("a", encoding="utf-8") as handle:
+        retainer = RawResponseRetainer(self.config.raw_responses, self.log_path)
+        writer = EventLogWriter(
+            self.log_path,
+            layout=self.config.log_layout,
+            compress_cold=self.config.compress_cold,
+            compress=self.config.compress_log,
+        )
+        if self.config.stop_rule is not None:
+            shock_ends = [
+                phase.end for phase in self.config.phases if "shock" in phase.name.lower()
+            ]
+            self.detector = StabilityDetector(
+                self.config.stop_rule, last_shock_turn=max(shock_ends) if shock_ends else None
+            )
+        with writer as handle:
             self._log_handle = handle
             try:
                 for turn in range(1, self.config.max_turns + 1):
                     result = await self.step(turn)
-                    results.append(result)
+                    stop = self._check_stop(result)
+                    yield result
+                    retainer.release(result)
+                    if stop:
+                        break
             finally:
                 handle.flush()
                 self._log_handle = None
-        return results
+                retainer.close()
 
     async def step(self, turn: int) -> TurnResult:
         phase = self._phase_for_turn(turn)
         events_applied = self._apply_phase_event(phase, turn)
 
+        requests = [
+            PendingRequest(agent_id, wrapper, self._build_payload(agent_id, phase))
+            for agent_id, wrapper in self.wrappers.items()
+        ]
+        responses: Dict[str, AgentTurn] = {}
+        deadline = self._deadline_for(phase)
+        await self.scheduler.execute(turn, requests, self._call_agent, responses, deadline=deadline)
+        fallback = (phase.fallback if phase and phase.fallback else None) or self.config.deadline_fallback
+        late_agents = [agent_id for agent_id in self.wrappers if agent_id not in responses]
+
         agent_turns: List[AgentTurn] = []
-        for agent_id, wrapper in self.wrappers.items():
-            state = self.agent_manager.get_agent(agent_id)
-            persona = state.config.persona or ""
-            model_name = state.config.model_name or ""
-            model_slot = state.config.model_slot or ""
-            payload = PromptPayload(
-                system=(
-                    f"You are {state.config.name} ({state.config.role}). "
-                    f"Current phase: {phase.name if phase else 'free'}. "
-                    "Respond with THOUGHT, DECISION, MESSAGE fields."
-                    + (
-                        f"\nModel identifier: {model_name or model_slot}."
-                        if (model_name or model_slot)
-                        else ""
-                    )
-                    + (
-                        "\nPersona guidelines:\n" + persona
-                        if persona
-                        else ""
-                    )
-                ),
-                history=self.history[agent_id],
-                constraints=phase.constraints if phase else {},
+        for agent_id in self.wrappers:
+            late = agent_id not in responses
+            turn_result = responses.get(agent_id) or AgentTurn(
+                agent_id=agent_id,
+                thought="",
+                decision=fallback.decision,
+                message="",
+                raw_response={"deadline": deadline, "late": True},
             )
-
-            try:
-                turn_result = await wrapper.chat(agent_id, payload)
-            except Exception as exc:  # pragma: no cover - drastic failure path
-                turn_result = AgentTurn(
-                    agent_id=agent_id,
-                    thought="",
-                    decision="ERROR",
-                    message=f"Wrapper failure: {exc}",
-                    raw_response={"error": str(exc)},
-                )
-
+            state = self.agent_manager.get_agent(agent_id)
             self._update_state_from_turn(agent_id, turn, turn_result)
+            if late and (fallback.trust_delta or fallback.resources_delta):
+                self.agent_manager.update_state(
+                    agent_id,
+                    resources_delta=dict(fallback.resources_delta) or None,
+                    trust_delta=fallback.trust_delta or None,
+                )
             updated_state = self.agent_manager.get_agent(agent_id)
             self._append_history(agent_id, turn, turn_result)
             self._write_log_entry(
@@ -127,12 +215,13 @@ class TurnManager:
                 phase,
                 turn_result,
                 resources=dict(updated_state.resources),
-                model_slot=model_slot,
-                model_name=model_name,
-                persona=persona,
+                model_slot=state.config.model_slot or "",
+                model_name=state.config.model_name or "",
+                persona=state.config.persona or "",
                 trust_score=updated_state.trust_score,
                 betrayal_count=updated_state.betrayal_count,
                 supports_given=updated_state.supports_given,
+                late=late,
             )
             agent_turns.append(turn_result)
 
@@ -144,6 +233,7 @@ class TurnManager:
             phase=phase.name if phase else None,
             events=events_applied,
             agent_turns=agent_turns,
+            late_agents=late_agents,
         )
 
         if self._progress_callback:
@@ -154,6 +244,68 @@ class TurnManager:
 
         return result
 
+    def _deadline_for(self, phase: Optional[PhaseConfig]) -> Optional[float]:
+        """Tightest of the turn-level and phase-level deadlines (seconds), if any."""
+        limits = [
+            value
+            for value in (self.config.turn_deadline, phase.deadline if phase else None)
+            if value is not None
+        ]
+        return min(limits) if limits else None
+
+    def system_prompt(self, agent_id: str, turn: int = 1) -> str:
+        """System prompt ``agent_id`` receives on ``turn`` (used for warm-up priming)."""
+        return self._build_payload(agent_id, self._phase_for_turn(turn)).system
+
+    def _build_payload(self, agent_id: str, phase: Optional[PhaseConfig]) -> PromptPayload:
+        compiled = self.prompts.compile(agent_id, phase)
+        buffer = self.buffers[agent_id]
+        buffer.set_system(compiled.system_message)
+        return PromptPayload(
+            system=compiled.system,
+            history=self.history[agent_id],
+            constraints=phase.constraints if phase else {},
+            decisions=(phase.decisions if phase and phase.decisions else self.config.decisions) or None,
+            thought_chars=phase.thought_chars if phase else None,
+            constraints_text=compiled.constraints,
+            buffer=buffer,
+        )
+
+    async def _call_agent(self, request: PendingRequest) -> AgentTurn:
+        try:
+            return await request.wrapper.chat(request.agent_id, request.payload)
+        except Exception as exc:  # pragma: no cover - drastic failure path
+            return AgentTurn(
+                agent_id=request.agent_id,
+                thought="",
+                decision="ERROR",
+                message=f"Wrapper failure: {exc}",
+                raw_response={"error": str(exc)},
+            )
+
+    def _check_stop(self, result: TurnResult) -> bool:
+        if self.detector is None or not result.agent_turns:
+            return False
+        coop = sum(
+            1
+            for agent_turn in result.agent_turns
+            if str(agent_turn.decision).lower() in self.config.cooperative_decisions
+        )
+        trust = [
+            self.agent_manager.get_agent(agent_turn.agent_id).trust_score
+            for agent_turn in result.agent_turns
+        ]
+        reason = self.detector.update(
+            result.turn,
+            result.phase,
+            coop / len(result.agent_turns),
+            sum(trust) / len(trust),
+        )
+        if reason is None:
+            return False
+        self.stop_reason = reason
+        return result.turn < self.config.max_turns
+
     def _phase_for_turn(self, turn: int) -> Optional[PhaseConfig]:
         for phase in self.config.phases:
             if phase.includes(turn):
@@ -218,7 +370,7 @@ class TurnManager:
         betrayal_inc = 0
         support_inc = 0
 
-        if decision_lower in {"join", "cooperate", "contribute", "support", "assist"}:
+        if decision_lower in COOPERATIVE_DECISIONS:
             if "stone" in state.resources and state.resources["stone"] > 0:
                 delta["stone"] = -1.0
             trust_delta += 0.05
@@ -241,17 +393,21 @@ class TurnManager:
         )
 
     def _append_history(self, agent_id: str, turn: int, turn_result: AgentTurn) -> None:
-        entry = {
-            "role": "assistant",
-            "content": json.dumps(
-                {
-                    "turn": turn,
-                    "decision": turn_result.decision,
-                    "message": turn_result.message,
-                }
-            ),
-        }
-        self.history[agent_id].append(entry)
+        record = HistoryRecord(turn=turn, decision=turn_result.decision, message=turn_result.message)
+        self.history_tokens.add(agent_id, record)
+        history = self.history[agent_id]
+        window = self.config.history_window
+        if self.history_encoder.incremental:
+            entry = self.history_encoder.entry(record)
+            history.append(entry)
+            self.buffers[agent_id].append(entry)
+            if window and len(history) > window:
+                del history[:-window]
+        else:
+            records = self.history_records[agent_id]
+            records.append(record)
+            history[:] = self.history_encoder.render(list(records), window)
+            self.buffers[agent_id].replace(history)
 
     def _write_log_entry(
         self,
@@ -266,6 +422,7 @@ class TurnManager:
         trust_score: float,
         betrayal_count: int,
         supports_given: int,
+        late: bool = False,
     ) -> None:
         if not self._log_handle:
             raise RuntimeError("Log handle not initialized; run() must set it before logging.")
@@ -285,7 +442,11 @@ class TurnManager:
             "betrayal_count": betrayal_count,
             "supports_given": supports_given,
         }
-        self._log_handle.write(json.dumps(entry, ensure_ascii=True) + "\n")
+        if late:
+            entry["late"] = True
+        if len(result.samples) > 1:
+            entry["decision_samples"] = list(result.samples)
+        self._log_handle.write(entry)
 
     @staticmethod
     def _set_seed(seed: int) -> None:
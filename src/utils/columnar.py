@@ -0,0 +1,239 @@
+"""Columnar, memory-mapped event store for archived runs.
+
+A store is a directory (``events.columns/`` next to ``events.jsonl``) holding
+``schema.json`` plus one little-endian binary file per column:
+
+- ``int``/``float`` columns are fixed-width arrays (``<i4``/``<f8``);
+- ``dict`` columns hold ``<i4`` codes into a dictionary kept in the schema
+  (``-1`` marks a missing value);
+- ``text``/``json`` columns hold ``<i8`` offsets plus a UTF-8 blob.
+
+Nested ``resources`` mappings are flattened to ``resources.<key>`` float
+columns, and a ``message_intent`` column is derived like in split logs.
+Readers map only the columns they ask for with ``numpy.memmap``; the
+Evaluator aggregates those arrays directly instead of going through
+:meth:`ColumnarStore.iter_rows`.
+"""
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional
+
+from src.utils.event_log import iter_events, log_stem
+from src.utils.intent import infer_message_intent
+
+NUMPY_MESSAGE = "NumPy가 필요합니다. `pip install numpy`로 설치 후 다시 시도하세요."
+SCHEMA_NAME = "schema.json"
+SCHEMA_VERSION = 1
+TEXT_FIELDS = frozenset({"thought", "message"})
+NESTED_FLOAT_FIELDS = frozenset({"resources"})
+INT_NULL = -(2**31)
+
+
+def _numpy():
+    try:
+        import numpy as np  # type: ignore
+    except ImportError as exc:  # pragma: no cover - optional dependency
+        raise RuntimeError(NUMPY_MESSAGE) from exc
+    return np
+
+
+def store_path_for(log_path: Path) -> Path:
+    """Return the default store directory for ``log_path`` (``events.columns``)."""
+    return log_path.with_name(f"{log_stem(log_path)}.columns")
+
+
+def is_columnar_store(path: Path) -> bool:
+    return path.is_dir() and (path / SCHEMA_NAME).exists()
+
+
+def _column_file(name: str, suffix: str = "bin") -> str:
+    return f"{name.replace('/', '_')}.{suffix}"
+
+
+def _infer_kind(name: str, values: List[Any]) -> str:
+    if name in TEXT_FIELDS:
+        return "text"
+    present = [value for value in values if value is not None]
+    if not present:
+        return "dict"
+    if all(isinstance(value, int) and not isinstance(value, bool) for value in present):
+        return "int"
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present):
+        return "float"
+    if all(isinstance(value, str) for value in present):
+        return "dict"
+    return "json"
+
+
+def write_columnar(log_path: Path, out_dir: Optional[Path] = None) -> Path:
+    """Convert an event log (any layout the shared reader accepts) into a store."""
+    np = _numpy()
+    out_dir = out_dir or store_path_for(log_path)
+    entries = list(iter_events(log_path))
+    rows = len(entries)
+    for entry in entries:
+        if "message" in entry and "message_intent" not in entry:
+            entry["message_intent"] = infer_message_intent(str(entry.get("message", "")))
+
+    raw: Dict[str, List[Any]] = {}
+    for index, entry in enumerate(entries):
+        for key, value in entry.items():
+            if key in NESTED_FLOAT_FIELDS and isinstance(value, Mapping):
+                for sub_key, sub_value in value.items():
+                    column = raw.setdefault(f"{key}.{sub_key}", [None] * rows)
+                    column[index] = float(sub_value) if sub_value is not None else None
+                continue
+            raw.setdefault(key, [None] * rows)[index] = value
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for pattern in ("*.bin", "*.blob"):
+        for stale in out_dir.glob(pattern):
+            stale.unlink()
+    columns: Dict[str, Dict[str, Any]] = {}
+    for name, values in raw.items():
+        nested = "." in name and name.split(".", 1)[0] in NESTED_FLOAT_FIELDS
+        kind = "float" if nested else _infer_kind(name, values)
+        spec: Dict[str, Any] = {"kind": kind, "file": _column_file(name)}
+        if kind == "int":
+            array = np.array([INT_NULL if v is None else v for v in values], dtype="<i4")
+        elif kind == "float":
+            array = np.array([np.nan if v is None else float(v) for v in values], dtype="<f8")
+        elif kind == "dict":
+            dictionary: Dict[str, int] = {}
+            codes = [
+                -1 if value is None else dictionary.setdefault(str(value), len(dictionary))
+                for value in values
+            ]
+            array = np.array(codes, dtype="<i4")
+            spec["dictionary"] = list(dictionary)
+        else:
+            encoded = [
+                b""
+                if value is None
+                else (value if kind == "text" else json.dumps(value, ensure_ascii=True)).encode("utf-8")
+                for value in values
+            ]
+            offsets = np.zeros(rows + 1, dtype="<i8")
+            np.cumsum([len(item) for item in encoded], out=offsets[1:])
+            (out_dir / _column_file(name, "blob")).write_bytes(b"".join(encoded))
+            spec["nulls"] = [index for index, value in enumerate(values) if value is None]
+            spec["blob"] = _column_file(name, "blob")
+            array = offsets
+        array.tofile(out_dir / spec["file"])
+        columns[name] = spec
+
+    schema = {
+        "version": SCHEMA_VERSION,
+        "rows": rows,
+        "source": str(log_path),
+        "columns": columns,
+    }
+    (out_dir / SCHEMA_NAME).write_text(json.dumps(schema, indent=2), encoding="utf-8")
+    return out_dir
+
+
+class ColumnarStore:
+    """Read-only view over a columnar store; columns are mapped lazily."""
+
+    def __init__(self, path: Path) -> None:
+        if not is_columnar_store(path):
+            raise FileNotFoundError(f"Columnar store not found: {path}")
+        self.path = path
+        self.schema = json.loads((path / SCHEMA_NAME).read_text(encoding="utf-8"))
+        self.rows = int(self.schema["rows"])
+        self._columns: Dict[str, Dict[str, Any]] = self.schema["columns"]
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def has(self, name: str) -> bool:
+        return name in self._columns
+
+    def kind(self, name: str) -> str:
+        return str(self._columns[name]["kind"])
+
+    def column(self, name: str):
+        """Return the raw column (codes for ``dict``, offsets for ``text``) zero-copy."""
+        np = _numpy()
+        spec = self._columns[name]
+        offsets = spec["kind"] in {"text", "json"}
+        if offsets:
+            dtype = "<i8"
+        else:
+            dtype = "<f8" if spec["kind"] == "float" else "<i4"
+        length = self.rows + 1 if offsets else self.rows
+        if length == 0:
+            return np.empty(0, dtype=dtype)
+        return np.memmap(self.path / spec["file"], dtype=dtype, mode="r", shape=(length,))
+
+    def dictionary(self, name: str) -> List[str]:
+        return list(self._columns[name].get("dictionary", []))
+
+    def codes_for(self, name: str, values: Iterable[str], *, lower: bool = False) -> List[int]:
+        """Return dictionary codes whose (optionally lower-cased) value is in ``values``."""
+        wanted = set(values)
+        return [
+            code
+            for code, value in enumerate(self.dictionary(name))
+            if (value.lower() if lower else value) in wanted
+        ]
+
+    def values(self, name: str) -> List[Any]:
+        """Decode a column into Python values (``None`` for missing)."""
+        spec = self._columns[name]
+        kind = spec["kind"]
+        raw = self.column(name)
+        if kind == "float":
+            return [None if value != value else value for value in raw.tolist()]
+        if kind == "int":
+            return [None if value == INT_NULL else value for value in raw.tolist()]
+        if kind == "dict":
+            dictionary = spec.get("dictionary", [])
+            return [None if code < 0 else dictionary[code] for code in raw.tolist()]
+        blob = (self.path / spec["blob"]).read_bytes()
+        offsets = raw.tolist()
+        nulls = set(spec.get("nulls", []))
+        decoded: List[Any] = []
+        for index in range(self.rows):
+            if index in nulls:
+                decoded.append(None)
+                continue
+            text = blob[offsets[index] : offsets[index + 1]].decode("utf-8")
+            decoded.append(text if kind == "text" else json.loads(text))
+        return decoded
+
+    def iter_rows(self, fields: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield event dicts built only from the requested top-level fields."""
+        wanted = None if fields is None else set(fields)
+        selected: Dict[str, List[str]] = {}
+        for name in self._columns:
+            top = name.split(".", 1)[0] if "." in name else name
+            if wanted is None or top in wanted:
+                selected.setdefault(top, []).append(name)
+        decoded = {name: self.values(name) for names in selected.values() for name in names}
+        for index in range(self.rows):
+            row: Dict[str, Any] = {}
+            for top, names in selected.items():
+                if top in NESTED_FLOAT_FIELDS and names != [top]:
+                    nested = {
+                        name.split(".", 1)[1]: decoded[name][index]
+                        for name in names
+                        if decoded[name][index] is not None
+                    }
+                    row[top] = nested
+                    continue
+                value = decoded[names[0]][index]
+                if value is not None:
+                    row[top] = value
+            yield row
+
+
+__all__ = [
+    "ColumnarStore",
+    "is_columnar_store",
+    "store_path_for",
+    "write_columnar",
+]
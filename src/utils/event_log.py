@@ -0,0 +1,361 @@
+"""Shared reader and writer for experiment event logs (`events.jsonl`)."""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.intent import infer_message_intent
+
+LOG_LAYOUTS = ("jsonl", "split")
+COLD_FIELDS = ("thought", "message")
+COLD_POINTER_KEY = "cold"
+
+
+def log_stem(log_path: Path) -> str:
+    """Return the log name without ``.jsonl``/``.jsonl.gz`` (``events``)."""
+    name = log_path.name
+    for suffix in (".jsonl.gz", ".jsonl"):
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return log_path.stem
+
+
+def cold_path_for(log_path: Path, *, compress: bool = False) -> Path:
+    """Return the cold sidecar path for ``log_path`` (``events.cold.jsonl[.gz]``)."""
+    return log_path.with_name(f"{log_stem(log_path)}.cold.jsonl" + (".gz" if compress else ""))
+
+
+def raw_path_for(log_path: Path) -> Path:
+    """Return the raw response spill file of ``log_path`` (``events.raw.jsonl``)."""
+    return log_path.with_name(f"{log_stem(log_path)}.raw.jsonl")
+
+
+def framed_path_for(log_path: Path) -> Path:
+    """Return the compressed, framed variant of ``log_path`` (``events.jsonl.gz``)."""
+    if log_path.name.endswith(".gz"):
+        return log_path
+    return log_path.with_name(log_path.name + ".gz")
+
+
+def frame_index_path_for(log_path: Path) -> Path:
+    """Return the frame index of a framed log (``events.jsonl.gz.idx``)."""
+    return framed_path_for(log_path).with_name(framed_path_for(log_path).name + ".idx")
+
+
+def resolve_log_path(log_path: Path) -> Path:
+    """Return the file that actually holds ``log_path``'s events.
+
+    Callers can keep passing ``events.jsonl`` for compressed runs: an existing
+    framed ``.gz`` log is used when the plain log is missing or empty. When
+    both hold data the more recently modified one wins, so a leftover plain
+    log never shadows a newer compressed re-run (and vice versa).
+    """
+    if log_path.is_dir() or log_path.name.endswith(".gz"):
+        return log_path
+    framed = framed_path_for(log_path)
+    if not framed.exists():
+        return log_path
+    if not log_path.exists() or log_path.stat().st_size == 0:
+        return framed
+    return framed if framed.stat().st_mtime_ns > log_path.stat().st_mtime_ns else log_path
+
+
+def find_cold_path(log_path: Path) -> Optional[Path]:
+    """Return the existing cold sidecar of ``log_path``, if any."""
+    for compress in (False, True):
+        candidate = cold_path_for(log_path, compress=compress)
+        if candidate.exists():
+            return candidate
+    return None
+
+
+def sidecar_paths(log_path: Path, *, raw: bool = True) -> List[Path]:
+    """List existing sidecar files (framed log, frame index, cold stream, raw spill) of ``log_path``.
+
+    ``raw=False`` leaves out the raw response spill, which no metric reads.
+    """
+    candidates = [
+        framed_path_for(log_path) if framed_path_for(log_path) != log_path else None,
+        frame_index_path_for(log_path),
+        find_cold_path(log_path),
+        raw_path_for(log_path) if raw else None,
+    ]
+    return [path for path in candidates if path is not None and path.exists()]
+
+
+def log_digest(log_path: Path) -> str:
+    """Return a SHA-256 over the log file and its sidecars (content identity)."""
+    digest = hashlib.sha256()
+    resolved = resolve_log_path(log_path)
+    paths = [resolved] + [path for path in sidecar_paths(log_path, raw=False) if path != resolved]
+    for path in paths:
+        if not path.is_file():
+            continue
+        digest.update(path.name.encode("utf-8"))
+        with path.open("rb") as handle:
+            for chunk in iter(lambda: handle.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_frame_index(log_path: Path) -> Optional[List[Dict[str, int]]]:
+    """Return the frame index (``turn``/``offset``/``length``/``events``) if present."""
+    index_path = frame_index_path_for(log_path)
+    if not index_path.exists():
+        return None
+    with index_path.open("r", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+class EventLogWriter:
+    """Append event entries in the plain JSONL or hot/cold split layout.
+
+    The split layout keeps numeric and categorical fields in the main log and
+    moves free text (``thought``/``message``) into a cold sidecar. Each hot
+    line carries a ``cold`` pointer ``[offset, length]`` into the (uncompressed)
+    cold stream plus a precomputed ``message_intent`` so metrics never need to
+    touch the sidecar.
+
+    With ``compress=True`` the main stream goes to ``events.jsonl.gz`` as one
+    gzip member per turn (a valid multi-member gzip file) and every frame is
+    recorded in ``events.jsonl.gz.idx`` so readers can seek by turn.
+    """
+
+    def __init__(
+        self,
+        log_path: Path,
+        *,
+        layout: str = "jsonl",
+        compress_cold: bool = False,
+        compress: bool = False,
+    ) -> None:
+        if layout not in LOG_LAYOUTS:
+            raise ValueError(f"Unknown log layout: {layout} (expected one of {LOG_LAYOUTS})")
+        self.log_path = log_path
+        self.layout = layout
+        self.compress_cold = compress_cold
+        self.compress = compress
+        self._hot: Optional[IO[str]] = None
+        self._cold: Optional[IO[bytes]] = None
+        self._cold_offset = 0
+        self._frames: Optional[IO[bytes]] = None
+        self._frame_index: Optional[IO[str]] = None
+        self._pending: List[str] = []
+        self._pending_turn: Optional[int] = None
+
+    def __enter__(self) -> "EventLogWriter":
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def open(self) -> None:
+        self.log_path.parent.mkdir(parents=True, exist_ok=True)
+        if self.compress:
+            self._frames = framed_path_for(self.log_path).open("ab")
+            self._frame_index = frame_index_path_for(self.log_path).open("a", encoding="utf-8")
+        else:
+            self._hot = self.log_path.open("a", encoding="utf-8")
+        if self.layout == "split":
+            cold_path = cold_path_for(self.log_path, compress=self.compress_cold)
+            if self.compress_cold:
+                self._cold_offset = _gzip_size(cold_path) if cold_path.exists() else 0
+                self._cold = gzip.open(cold_path, "ab")
+            else:
+                self._cold = cold_path.open("ab")
+                self._cold_offset = self._cold.tell()
+
+    def write(self, entry: Dict[str, Any]) -> None:
+        if self._hot is None and self._frames is None:
+            raise RuntimeError("Event log is not open; call open() first.")
+        if self._cold is not None:
+            entry = self._split(entry)
+        line = json.dumps(entry, ensure_ascii=True) + "\n"
+        if self._hot is not None:
+            self._hot.write(line)
+            return
+        turn = int(entry.get("turn", 0))
+        if self._pending and turn != self._pending_turn:
+            self._emit_frame()
+        self._pending.append(line)
+        self._pending_turn = turn
+
+    def flush(self) -> None:
+        if self._frames is not None:
+            self._emit_frame()
+            self._frames.flush()
+        if self._frame_index is not None:
+            self._frame_index.flush()
+        if self._hot is not None:
+            self._hot.flush()
+        if self._cold is not None:
+            self._cold.flush()
+
+    def close(self) -> None:
+        self.flush()
+        for name in ("_hot", "_cold", "_frames", "_frame_index"):
+            handle = getattr(self, name)
+            if handle is not None:
+                handle.close()
+                setattr(self, name, None)
+
+    def _emit_frame(self) -> None:
+        if not self._pending:
+            return
+        assert self._frames is not None and self._frame_index is not None
+        data = gzip.compress("".join(self._pending).encode("utf-8"))
+        offset = self._frames.tell()
+        self._frames.write(data)
+        frame = {
+            "turn": self._pending_turn,
+            "offset": offset,
+            "length": len(data),
+            "events": len(self._pending),
+        }
+        self._frame_index.write(json.dumps(frame) + "\n")
+        self._pending = []
+
+    def _split(self, entry: Dict[str, Any]) -> Dict[str, Any]:
+        assert self._cold is not None
+        cold = {key: entry.get(key) for key in COLD_FIELDS}
+        record = (json.dumps(cold, ensure_ascii=True) + "\n").encode("utf-8")
+        self._cold.write(record)
+        hot = {key: value for key, value in entry.items() if key not in COLD_FIELDS}
+        hot["message_intent"] = infer_message_intent(str(entry.get("message") or ""))
+        hot[COLD_POINTER_KEY] = [self._cold_offset, len(record)]
+        self._cold_offset += len(record)
+        return hot
+
+
+def _iter_lines(log_path: Path, turns: Optional[Tuple[int, int]]) -> Iterator[str]:
+    if not log_path.name.endswith(".gz"):
+        with log_path.open("r", encoding="utf-8") as handle:
+            yield from handle
+        return
+    index = load_frame_index(log_path) if turns is not None else None
+    if index is None:
+        with gzip.open(log_path, "rt", encoding="utf-8") as handle:
+            yield from handle
+        return
+    start, end = turns  # type: ignore[misc]
+    with log_path.open("rb") as raw:
+        for frame in index:
+            if not start <= int(frame["turn"]) <= end:
+                continue
+            raw.seek(int(frame["offset"]))
+            yield from gzip.decompress(raw.read(int(frame["length"]))).decode("utf-8").splitlines()
+
+
+def iter_events(
+    log_path: Path,
+    *,
+    fields: Optional[Iterable[str]] = None,
+    turns: Optional[Tuple[int, int]] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield log entries, joining cold fields only when ``fields`` needs them.
+
+    ``fields=None`` returns complete entries. Otherwise entries may carry more
+    keys than requested, but every requested key that exists is present.
+    ``turns`` keeps an inclusive ``(start, end)`` range; framed logs use their
+    index to decompress only the matching frames. Framed ``.gz`` logs are
+    picked up transparently when ``log_path`` names the plain ``.jsonl`` file,
+    and columnar stores (see :mod:`src.utils.columnar`) are read column-wise.
+    """
+    log_path = resolve_log_path(log_path)
+    if log_path.is_dir():
+        from src.utils.columnar import ColumnarStore
+
+        for row in ColumnarStore(log_path).iter_rows(fields):
+            if turns is None or turns[0] <= int(row.get("turn", 0)) <= turns[1]:
+                yield row
+        return
+    if not log_path.exists():
+        raise FileNotFoundError(f"Log file not found: {log_path}")
+    wanted = None if fields is None else set(fields)
+    need_cold = wanted is None or any(key in wanted for key in COLD_FIELDS)
+    cold_path = find_cold_path(log_path) if need_cold else None
+    cold_handle: Optional[IO[bytes]] = None
+    try:
+        if cold_path is not None:
+            cold_handle = (
+                gzip.open(cold_path, "rb") if cold_path.suffix == ".gz" else cold_path.open("rb")
+            )
+        for line in _iter_lines(log_path, turns):
+            stripped = line.strip()
+            if not stripped:
+                continue
+            entry = json.loads(stripped)
+            if turns is not None and not turns[0] <= int(entry.get("turn", 0)) <= turns[1]:
+                continue
+            pointer = entry.pop(COLD_POINTER_KEY, None)
+            if cold_handle is not None and pointer:
+                offset, length = pointer
+                cold_handle.seek(offset)
+                entry.update(json.loads(cold_handle.read(length)))
+            yield entry
+    finally:
+        if cold_handle is not None:
+            cold_handle.close()
+
+
+def load_events(
+    log_path: Path,
+    *,
+    fields: Optional[Iterable[str]] = None,
+    turns: Optional[Tuple[int, int]] = None,
+) -> List[Dict[str, Any]]:
+    """Materialize :func:`iter_events` into a list."""
+    return list(iter_events(log_path, fields=fields, turns=turns))
+
+
+def compress_log(log_path: Path, out_path: Optional[Path] = None) -> Path:
+    """Rewrite a plain log as a framed ``.gz`` log (one frame per turn) plus index.
+
+    Entries are re-encoded as-is, so split logs keep their cold pointers and
+    the cold sidecar stays valid. Returns the framed log path.
+    """
+    target = framed_path_for(out_path or log_path)
+    for stale in (target, frame_index_path_for(target)):
+        if stale.exists():
+            stale.unlink()
+    writer = EventLogWriter(target.with_name(target.name[: -len(".gz")]), compress=True)
+    with writer, log_path.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            stripped = line.strip()
+            if stripped:
+                writer.write(json.loads(stripped))
+    return target
+
+
+def _gzip_size(path: Path) -> int:
+    size = 0
+    with gzip.open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(1 << 20)
+            if not chunk:
+                return size
+            size += len(chunk)
+
+
+__all__ = [
+    "COLD_FIELDS",
+    "LOG_LAYOUTS",
+    "EventLogWriter",
+    "cold_path_for",
+    "compress_log",
+    "find_cold_path",
+    "frame_index_path_for",
+    "framed_path_for",
+    "iter_events",
+    "load_events",
+    "load_frame_index",
+    "log_digest",
+    "log_stem",
+    "raw_path_for",
+    "resolve_log_path",
+    "sidecar_paths",
+]
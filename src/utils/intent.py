@@ -0,0 +1,60 @@
+"""Keyword-based message intent classification shared by log writers and metrics."""
+from __future__ import annotations
+
+import re
+from typing import Optional
+
+COOP_MESSAGE_KEYWORDS = {
+    "cooperate",
+    "cooperation",
+    "collaborate",
+    "together",
+    "assist",
+    "support",
+    "share",
+    "join",
+    "alliance",
+    "help",
+    "trust",
+    "rebuild",
+    "stabilize",
+}
+
+DEFECT_MESSAGE_KEYWORDS = {
+    "defect",
+    "betray",
+    "steal",
+    "hoard",
+    "withhold",
+    "refuse",
+    "withdraw",
+    "sabotage",
+    "abandon",
+    "reject",
+}
+
+
+def infer_message_intent(message: str) -> Optional[str]:
+    message_lower = message.lower()
+    coop_hits = {kw for kw in COOP_MESSAGE_KEYWORDS if kw in message_lower}
+    defect_hits = {kw for kw in DEFECT_MESSAGE_KEYWORDS if kw in message_lower}
+
+    if coop_hits and not defect_hits:
+        return "coop"
+    if defect_hits and not coop_hits:
+        return "defect"
+    if not message_lower.strip():
+        return None
+    # Detect explicit negations like "not cooperate"
+    if coop_hits:
+        for kw in coop_hits:
+            if re.search(rf"not\s+{re.escape(kw)}", message_lower):
+                return "defect"
+    if defect_hits:
+        for kw in defect_hits:
+            if re.search(rf"not\s+{re.escape(kw)}", message_lower):
+                return "coop"
+    return None
+
+
+__all__ = ["COOP_MESSAGE_KEYWORDS", "DEFECT_MESSAGE_KEYWORDS", "infer_message_intent"]
@@ -0,0 +1,178 @@
+"""Tests for the columnar event store."""
+from __future__ import annotations
+
+import json
+import random
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from src.metrics import Evaluator, EvaluationRules
+from src.utils.event_log import load_events
+
+try:
+    import numpy  # type: ignore  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAS_NUMPY = False
+
+try:
+    import matplotlib  # type: ignore  # noqa: F401
+
+    HAS_MATPLOTLIB = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAS_MATPLOTLIB = False
+
+
+ENTRIES = [
+    {
+        "turn": 1,
+        "phase": "formation",
+        "agent": "A",
+        "thought": "Plan",
+        "decision": "Join",
+        "message": "Let's help",
+        "resources": {"stone": 2.0, "wood": 1.0},
+        "model_slot": None,
+        "trust_score": 0.55,
+        "betrayal_count": 0,
+    },
+    {
+        "turn": 1,
+        "phase": "formation",
+        "agent": "B",
+        "thought": "",
+        "decision": "Defect",
+        "message": "I will steal",
+        "resources": {"stone": 3.0},
+        "model_slot": "M2",
+        "betrayal_count": 1,
+    },
+    {
+        "turn": 2,
+        "phase": "shock",
+        "agent": "A",
+        "thought": "Again",
+        "decision": "Join",
+        "message": "I refuse to wait",
+        "resources": {"stone": 1.0, "wood": 1.0},
+        "model_slot": None,
+        "trust_score": 0.6,
+        "betrayal_count": 0,
+    },
+]
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy not installed")
+class ColumnarStoreTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.log_path = Path(self._tmp.name) / "events.jsonl"
+        self.log_path.write_text(
+            "\n".join(json.dumps(entry) for entry in ENTRIES) + "\n",
+            encoding="utf-8",
+        )
+
+    def test_round_trip_and_column_access(self) -> None:
+        from src.utils.columnar import ColumnarStore, write_columnar
+
+        store_path = write_columnar(self.log_path)
+        self.assertEqual(store_path.name, "events.columns")
+        store = ColumnarStore(store_path)
+        self.assertEqual(store.rows, 3)
+        self.assertEqual(store.kind("turn"), "int")
+        self.assertEqual(store.kind("decision"), "dict")
+        self.assertEqual(store.column("turn").tolist(), [1, 1, 2])
+        self.assertEqual(store.values("trust_score"), [0.55, None, 0.6])
+        self.assertEqual(store.values("resources.wood"), [1.0, None, 1.0])
+        self.assertEqual(store.codes_for("decision", {"join"}, lower=True), [0])
+
+        rows = load_events(store_path, fields=["turn", "message", "resources"])
+        self.assertEqual(rows[1], {"turn": 1, "message": "I will steal", "resources": {"stone": 3.0}})
+
+        full = load_events(store_path)
+        self.assertEqual(full[0]["thought"], "Plan")
+        self.assertNotIn("model_slot", full[0])
+        self.assertEqual(full[1]["model_slot"], "M2")
+
+    def test_evaluator_reads_store(self) -> None:
+        from src.utils.columnar import write_columnar
+
+        store_path = write_columnar(self.log_path)
+        evaluator = Evaluator(EvaluationRules.default())
+        expected = evaluator.evaluate(self.log_path).to_json()
+        result = evaluator.evaluate(store_path).to_json()
+        for payload in (expected, result):
+            payload.pop("metadata")
+        self.assertEqual(result, expected)
+        self.assertEqual(result["message_action_mismatch_count"], 1)
+
+    def test_evaluator_aggregates_columns_without_rows(self) -> None:
+        from src.utils.columnar import ColumnarStore, write_columnar
+
+        rng = random.Random(3)
+        entries = []
+        for turn in range(1, 31):
+            for agent in ("B", "A", "C"):
+                entry = {
+                    "turn": turn,
+                    "phase": rng.choice(["formation", "shock_A", "", None]),
+                    "agent": agent,
+                    "decision": rng.choice(["Join", "join", "Defect", "Observe", "steal"]),
+                    "message": rng.choice(["let us help", "I will steal", "", "not cooperate"]),
+                    "resources": {"stone": round(rng.uniform(0, 5), 2)},
+                }
+                if rng.random() < 0.8:
+                    entry["trust_score"] = round(rng.random(), 3)
+                entries.append(entry)
+        # Out-of-order turns exercise the (turn, agent) re-sort.
+        entries[3], entries[40] = entries[40], entries[3]
+        self.log_path.write_text(
+            "\n".join(json.dumps(entry) for entry in entries) + "\n", encoding="utf-8"
+        )
+        store_path = write_columnar(self.log_path)
+        rules = [
+            EvaluationRules.default(),
+            EvaluationRules.from_mapping({"cooperative_decisions": ["observe"]}),
+        ]
+        evaluator = Evaluator()
+        expected = [item.to_json() for item in evaluator.evaluate_many(self.log_path, rules)]
+        with patch.object(ColumnarStore, "iter_rows", side_effect=AssertionError("row path")):
+            result = [item.to_json() for item in evaluator.evaluate_many(store_path, rules)]
+        for payload in expected + result:
+            payload.pop("metadata")
+        self.assertEqual(result, expected)
+
+    @unittest.skipUnless(HAS_MATPLOTLIB, "matplotlib not installed")
+    def test_coop_trust_series_checks_column_kinds(self) -> None:
+        from scripts.analyze_raid_and_coop import coop_trust_series
+        from src.utils.columnar import write_columnar
+
+        cases = {
+            "int_trust": [
+                {"turn": 1, "agent": "A", "decision": "Join", "trust_score": 1},
+                {"turn": 1, "agent": "B", "decision": "Defect"},
+                {"turn": 2, "agent": "A", "decision": "Join", "trust_score": 0},
+            ],
+            "json_decision": [
+                {"turn": 1, "agent": "A", "decision": "Join", "trust_score": 0.5},
+                {"turn": 1, "agent": "B", "decision": {"choice": "Join"}, "trust_score": 0.25},
+                {"turn": 2, "agent": "A", "decision": "join", "trust_score": 0.75},
+            ],
+        }
+        for name, entries in cases.items():
+            log_path = Path(self._tmp.name) / name / "events.jsonl"
+            log_path.parent.mkdir()
+            log_path.write_text("\n".join(json.dumps(e) for e in entries) + "\n", encoding="utf-8")
+            store_path = write_columnar(log_path)
+            expected = coop_trust_series([log_path], max_turns=2)
+            result = coop_trust_series([store_path], max_turns=2)
+            for left, right in zip(result, expected):
+                self.assertEqual(left.tolist(), right.tolist(), name)
+
+
+if __name__ == "__main__":
+    unittest.main()
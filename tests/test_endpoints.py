@@ -0,0 +1,134 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import patch
+
+from src.agents.endpoints import ReplicaPool, warm_up
+from src.agents.llm_wrapper import LLMWrapper, PromptPayload
+
+
+class WarmUpTests(unittest.TestCase):
+    def test_warm_up_primes_every_agent_twice(self) -> None:
+        wrappers = {
+            "A": LLMWrapper(base_url="http://host:1234", model="m1"),
+            "B": LLMWrapper(base_url="http://host:1234", model="m2"),
+        }
+        sent: list[dict] = []
+
+        def fake_send(self, url, headers, body):  # type: ignore[no-untyped-def]
+            sent.append(body)
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+        with patch.object(LLMWrapper, "_send_request", fake_send), patch(
+            "src.agents.endpoints.ping", return_value=(True, "ok", 0.01)
+        ), patch("src.agents.endpoints.list_models", return_value=["m1"]):
+            report = asyncio.run(warm_up(wrappers, {"A": "You are A.", "B": "You are B."}))
+
+        self.assertEqual(len(sent), 4)
+        self.assertTrue(all(body["max_tokens"] == 1 for body in sent))
+        self.assertEqual(sent[0]["messages"][0], {"role": "system", "content": "You are A."})
+        self.assertTrue(report["endpoints"]["http://host:1234"]["healthy"])
+        self.assertTrue(report["agents"]["A"]["model_listed"])
+        self.assertFalse(report["agents"]["B"]["model_listed"])
+        self.assertIsNotNone(report["agents"]["B"]["warm"])
+        self.assertEqual(report["failed"], [])
+
+    def test_warm_up_primes_every_replica(self) -> None:
+        wrappers = {
+            "A": LLMWrapper(base_url="http://a:1234", model="m1", replicas=["http://b:1234"]),
+        }
+        sent: list[str] = []
+
+        def fake_send(self, url, headers, body):  # type: ignore[no-untyped-def]
+            sent.append(url)
+            time.sleep(0.1)
+            return {"choices": [{"message": {"content": "ok"}}]}
+
+        with patch.object(LLMWrapper, "_send_request", fake_send), patch(
+            "src.agents.endpoints.ping", return_value=(True, "ok", 0.01)
+        ), patch("src.agents.endpoints.list_models", return_value=["m1"]):
+            report = asyncio.run(warm_up(wrappers, {"A": "You are A."}))
+
+        self.assertEqual(
+            sorted(sent),
+            ["http://a:1234/v1/chat/completions"] * 2 + ["http://b:1234/v1/chat/completions"] * 2,
+        )
+        self.assertEqual(set(report["agents"]["A"]["replicas"]), {"http://a:1234", "http://b:1234"})
+        # Replicas are primed concurrently: the round takes about one call, not two.
+        self.assertLess(report["cold_seconds"], 0.19)
+        self.assertGreaterEqual(report["agents"]["A"]["cold"], 0.1)
+
+    def test_warm_up_reports_failed_primes(self) -> None:
+        wrappers = {"A": LLMWrapper(base_url="http://host:1234", model="m1")}
+
+        def failing_send(self, url, headers, body):  # type: ignore[no-untyped-def]
+            raise RuntimeError("connection refused")
+
+        with patch.object(LLMWrapper, "_send_request", failing_send), patch(
+            "src.agents.endpoints.ping", return_value=(False, "refused", 0.01)
+        ), patch("src.agents.endpoints.list_models", return_value=None):
+            report = asyncio.run(warm_up(wrappers, {"A": "You are A."}))
+
+        self.assertEqual(report["failed"], ["A"])
+        self.assertIsNone(report["agents"]["A"]["model_listed"])
+        self.assertEqual(report["endpoints"]["http://host:1234"]["detail"], "refused")
+
+
+class ReplicaPoolTests(unittest.TestCase):
+    def test_least_outstanding_spreads_requests(self) -> None:
+        pool = ReplicaPool(["http://a", "http://b"])
+        first = asyncio.run(pool.acquire())
+        pool.started(first)
+        second = asyncio.run(pool.acquire())
+        self.assertEqual((first, second), ("http://a", "http://b"))
+        pool.finished(first, 0.1, ok=True)
+        pool.started(second)
+        pool.finished(second, 0.1, ok=True)
+        # Both idle with one request each: ties rotate back to the first replica.
+        self.assertEqual(asyncio.run(pool.acquire()), "http://a")
+
+    def test_latency_weighted_prefers_faster_replica(self) -> None:
+        pool = ReplicaPool(["http://a", "http://b"], strategy="latency_weighted")
+        for url, latency in (("http://a", 4.0), ("http://b", 1.0)):
+            pool.started(url)
+            pool.finished(url, latency, ok=True)
+        pool.started("http://b")
+        self.assertEqual(asyncio.run(pool.acquire()), "http://b")
+
+    def test_failing_replica_is_ejected_and_probed_back(self) -> None:
+        pool = ReplicaPool(["http://a", "http://b"], failure_threshold=2, cooldown=0.0)
+        for _ in range(2):
+            pool.started("http://a")
+            pool.finished("http://a", None, ok=False)
+        self.assertEqual([replica.url for replica in pool.healthy], ["http://b"])
+        with patch("src.agents.endpoints.ping", return_value=(False, "down", 0.0)):
+            self.assertEqual(asyncio.run(pool.acquire()), "http://b")
+        self.assertEqual(len(pool.healthy), 1)
+        pool.replicas["http://a"].ejected_until = 0.0
+        with patch("src.agents.endpoints.ping", return_value=(True, "ok", 0.0)):
+            asyncio.run(pool.acquire())
+        self.assertEqual(len(pool.healthy), 2)
+        self.assertEqual(pool.to_json()["replicas"]["http://a"]["ejections"], 1)
+
+    def test_failed_request_reroutes_to_replica(self) -> None:
+        pool = ReplicaPool(["http://a", "http://b"])
+        wrapper = LLMWrapper(base_url="http://a", pool=pool)
+        calls: list[str] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            calls.append(url)
+            if url.startswith("http://a"):
+                raise RuntimeError("connection refused")
+            return {"output": {"THOUGHT": "", "DECISION": "Join", "MESSAGE": ""}}
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        with patch("src.agents.llm_wrapper.asyncio.sleep") as mocked_sleep:
+            turn = asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(turn.decision, "Join")
+        self.assertEqual([url.split("/v1")[0] for url in calls], ["http://a", "http://b"])
+        mocked_sleep.assert_not_called()
+        self.assertEqual(pool.replicas["http://a"].errors, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
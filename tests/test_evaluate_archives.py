@@ -0,0 +1,79 @@
+"""Tests for batch archive evaluation and its metrics cache."""
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from scripts import evaluate_archives
+from scripts.evaluate_archives import cache_key, evaluate_tree
+from src.metrics import EvaluationRules
+from src.utils.event_log import EventLogWriter, log_digest
+
+ENTRIES = [
+    {"turn": 1, "phase": "formation", "agent": "A", "decision": "Join", "resources": {"stone": 1.0}},
+    {"turn": 1, "phase": "formation", "agent": "B", "decision": "Defect", "resources": {"stone": 2.0}},
+    {"turn": 2, "phase": "shock", "agent": "A", "decision": "Support", "resources": {"stone": 1.0}},
+    {"turn": 2, "phase": "shock", "agent": "B", "decision": "Join", "resources": {"stone": 0.0}},
+]
+
+
+class CacheKeyTest(unittest.TestCase):
+    def test_key_covers_digest_rules_and_version(self) -> None:
+        rules = EvaluationRules.default()
+        base = cache_key("digest-a", rules)
+        self.assertEqual(base, cache_key("digest-a", EvaluationRules.default()))
+        self.assertNotEqual(base, cache_key("digest-b", rules))
+        narrowed = EvaluationRules.from_mapping({"cooperative_decisions": ["join"]})
+        self.assertNotEqual(base, cache_key("digest-a", narrowed))
+        with patch.object(evaluate_archives, "EVALUATOR_VERSION", "next"):
+            self.assertNotEqual(base, cache_key("digest-a", rules))
+
+
+class EvaluateTreeTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        base = Path(self._tmp.name)
+        self.root = base / "results"
+        self.cache_dir = base / "cache"
+        self.logs = []
+        for run in ("run_001", "run_002"):
+            log_path = self.root / "exp" / "archives" / run / "events.jsonl"
+            with EventLogWriter(log_path) as writer:
+                for entry in ENTRIES:
+                    writer.write(dict(entry, run=run))
+            self.logs.append(log_path)
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _hits(self, rules: EvaluationRules) -> list:
+        rows = evaluate_tree([self.root], rules, self.cache_dir, workers=1)
+        return [row["cache_hit"] for row in rows]
+
+    def test_cache_reuse_and_invalidation(self) -> None:
+        rules = EvaluationRules.default()
+        self.assertEqual(self._hits(rules), [0, 0])
+        self.assertEqual(len(list(self.cache_dir.glob("*.json"))), 2)
+        self.assertEqual(self._hits(rules), [1, 1])
+
+        narrowed = EvaluationRules.from_mapping({"cooperative_decisions": ["join"]})
+        rows = evaluate_tree([self.root], narrowed, self.cache_dir, workers=1)
+        self.assertEqual([row["cache_hit"] for row in rows], [0, 0])
+        self.assertAlmostEqual(rows[0]["cooperation_rate"], 0.5)
+        self.assertEqual(self._hits(rules), [1, 1])
+
+        digest = log_digest(self.logs[1])
+        with self.logs[1].open("a", encoding="utf-8") as handle:
+            handle.write(json.dumps({"turn": 3, "phase": "shock", "agent": "A", "decision": "Join"}) + "\n")
+        self.assertNotEqual(log_digest(self.logs[1]), digest)
+        self.assertEqual(self._hits(rules), [1, 0])
+
+        with patch.object(evaluate_archives, "EVALUATOR_VERSION", "next"):
+            self.assertEqual(self._hits(rules), [0, 0])
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
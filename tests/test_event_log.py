@@ -0,0 +1,161 @@
+"""Tests for the shared event log reader/writer."""
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.metrics import Evaluator, EvaluationRules
+from src.utils.event_log import (
+    EventLogWriter,
+    cold_path_for,
+    compress_log,
+    framed_path_for,
+    load_events,
+    load_frame_index,
+    resolve_log_path,
+)
+
+
+ENTRIES = [
+    {
+        "turn": 1,
+        "phase": "formation",
+        "agent": "A",
+        "thought": "Plan ahead",
+        "decision": "Join",
+        "message": "I will steal the stones",
+        "resources": {"stone": 2.0},
+        "trust_score": 0.55,
+    },
+    {
+        "turn": 1,
+        "phase": "formation",
+        "agent": "B",
+        "thought": "Hold back",
+        "decision": "Observe",
+        "message": "Waiting",
+        "resources": {"stone": 3.0},
+        "trust_score": 0.5,
+    },
+    {
+        "turn": 2,
+        "phase": "shock",
+        "agent": "A",
+        "thought": "Keep going",
+        "decision": "Join",
+        "message": "Let's help each other",
+        "resources": {"stone": 1.0},
+        "trust_score": 0.6,
+    },
+]
+
+
+class EventLogTest(unittest.TestCase):
+    def _write(self, log_path: Path, **kwargs) -> None:
+        with EventLogWriter(log_path, **kwargs) as writer:
+            for entry in ENTRIES:
+                writer.write(dict(entry))
+
+    def test_utils_layer_does_not_import_metrics(self) -> None:
+        code = (
+            "import sys, src.utils.event_log, src.utils.columnar; "
+            "sys.exit('src.metrics' in sys.modules)"
+        )
+        self.assertEqual(subprocess.run([sys.executable, "-c", code]).returncode, 0)
+
+    def test_plain_layout_round_trip(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            self._write(log_path)
+            self.assertEqual(load_events(log_path), ENTRIES)
+            self.assertFalse(cold_path_for(log_path).exists())
+
+    def test_split_layout_joins_cold_fields_on_demand(self) -> None:
+        for compress in (False, True):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                log_path = Path(tmpdir) / "events.jsonl"
+                self._write(log_path, layout="split", compress_cold=compress)
+                self.assertTrue(cold_path_for(log_path, compress=compress).exists())
+
+                hot_lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+                self.assertNotIn("thought", hot_lines[0])
+                self.assertEqual(hot_lines[0]["message_intent"], "defect")
+
+                hot = load_events(log_path, fields=["turn", "decision"])
+                self.assertNotIn("message", hot[0])
+                self.assertNotIn("cold", hot[0])
+
+                full = load_events(log_path)
+                self.assertEqual([entry["thought"] for entry in full], [e["thought"] for e in ENTRIES])
+                self.assertEqual(full[2]["message"], "Let's help each other")
+
+    def test_split_layout_appends_across_writers(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            self._write(log_path, layout="split", compress_cold=True)
+            self._write(log_path, layout="split", compress_cold=True)
+            full = load_events(log_path)
+            self.assertEqual(len(full), 6)
+            self.assertEqual(full[4]["message"], ENTRIES[1]["message"])
+
+    def test_framed_log_reads_transparently_and_seeks_by_turn(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            self._write(log_path, compress=True)
+            self.assertFalse(log_path.exists())
+            self.assertTrue(framed_path_for(log_path).exists())
+
+            index = load_frame_index(log_path)
+            self.assertEqual([frame["turn"] for frame in index], [1, 2])
+            self.assertEqual([frame["events"] for frame in index], [2, 1])
+
+            self.assertEqual(load_events(log_path), ENTRIES)
+            later = load_events(log_path, turns=(2, 2))
+            self.assertEqual([entry["agent"] for entry in later], ["A"])
+
+    def test_newer_framed_log_wins_over_stale_plain_log(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            with EventLogWriter(log_path) as writer:
+                writer.write({"turn": 1, "agent": "stale"})
+            with EventLogWriter(log_path, compress=True) as writer:
+                writer.write({"turn": 1, "agent": "fresh"})
+            framed = framed_path_for(log_path)
+            os.utime(log_path, ns=(1_000_000_000, 1_000_000_000))
+            self.assertEqual(resolve_log_path(log_path), framed)
+            self.assertEqual(load_events(log_path)[0]["agent"], "fresh")
+            os.utime(framed, ns=(500_000_000, 500_000_000))
+            self.assertEqual(resolve_log_path(log_path), log_path)
+
+    def test_compress_log_keeps_split_pointers(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            self._write(log_path, layout="split")
+            framed = compress_log(log_path)
+            log_path.unlink()
+            self.assertEqual(framed.name, "events.jsonl.gz")
+            full = load_events(log_path)
+            self.assertEqual([entry["message"] for entry in full], [e["message"] for e in ENTRIES])
+            self.assertEqual(full[0]["message_intent"], "defect")
+
+    def test_evaluator_matches_across_layouts(self) -> None:
+        evaluator = Evaluator(EvaluationRules.default())
+        with tempfile.TemporaryDirectory() as tmpdir:
+            plain = Path(tmpdir) / "plain" / "events.jsonl"
+            split = Path(tmpdir) / "split" / "events.jsonl"
+            self._write(plain)
+            self._write(split, layout="split")
+            expected = evaluator.evaluate(plain)
+            result = evaluator.evaluate(split)
+            self.assertEqual(result.message_action_mismatch_count, 1)
+            self.assertEqual(result.message_action_mismatch_count, expected.message_action_mismatch_count)
+            self.assertEqual(result.turn_series, expected.turn_series)
+
+
+if __name__ == "__main__":
+    unittest.main()
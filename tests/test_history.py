@@ -0,0 +1,119 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.simulator.history import (
+    HistoryEncoder,
+    HistoryRecord,
+    HistoryTokenMeter,
+    estimate_tokens,
+    get_history_encoder,
+    history_token_report,
+    records_from_log,
+)
+
+
+RECORDS = [
+    HistoryRecord(turn=turn, decision=decision, message=f"message {turn}")
+    for turn, decision in enumerate(["Join", "Observe", "Join", "Defect", "Join"], start=1)
+]
+
+
+class HistoryEncoderTests(unittest.TestCase):
+    def test_json_encoder_matches_original_format(self) -> None:
+        entry = get_history_encoder("json").entry(RECORDS[0])
+        self.assertEqual(
+            entry,
+            {
+                "role": "assistant",
+                "content": json.dumps({"turn": 1, "decision": "Join", "message": "message 1"}),
+            },
+        )
+
+    def test_compact_encoders(self) -> None:
+        self.assertEqual(get_history_encoder("line").entry(RECORDS[1])["content"], "T2 Observe: message 2")
+        self.assertEqual(get_history_encoder("tuple").entry(RECORDS[1])["content"], '[2, "Observe", "message 2"]')
+
+    def test_digest_folds_older_turns(self) -> None:
+        messages = get_history_encoder({"encoder": "digest", "recent": 2}).render(RECORDS)
+        self.assertEqual(len(messages), 3)
+        self.assertEqual(messages[0]["content"], "Earlier decisions (turn:decision): 1:Join 2:Observe 3:Join")
+        self.assertEqual(messages[-1]["content"], "T5 Join: message 5")
+
+    def test_digest_limit_keeps_summary_row(self) -> None:
+        encoder = get_history_encoder({"encoder": "digest", "recent": 3})
+        self.assertEqual(
+            [m["content"] for m in encoder.render(RECORDS, 2)],
+            ["Earlier decisions (turn:decision): 4:Defect", "T5 Join: message 5"],
+        )
+        self.assertEqual(encoder.span(2), 2)
+        self.assertIsNone(encoder.span())
+
+    def test_digest_rows_cap_table(self) -> None:
+        encoder = get_history_encoder({"encoder": "digest", "recent": 2, "rows": 2})
+        messages = encoder.render(RECORDS)
+        self.assertEqual(messages[0]["content"], "Earlier decisions (turn:decision): 2:Observe 3:Join")
+        self.assertEqual(encoder.span(), 4)
+        self.assertEqual(encoder.render(RECORDS[-4:]), messages)
+
+    def test_entry_is_abstract(self) -> None:
+        with self.assertRaises(TypeError):
+            HistoryEncoder()  # type: ignore[abstract]
+
+    def test_unknown_encoder_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            get_history_encoder("yaml")
+
+    def test_token_report_ranks_compact_encodings_lower(self) -> None:
+        report = history_token_report({"A": RECORDS})
+        self.assertEqual(set(report), {"json", "line", "tuple", "digest"})
+        self.assertLess(report["line"]["final_history_tokens"], report["json"]["final_history_tokens"])
+        self.assertLess(report["tuple"]["prefill_tokens"], report["json"]["prefill_tokens"])
+        json_sizes = [estimate_tokens(get_history_encoder("json").entry(r)["content"]) for r in RECORDS]
+        self.assertEqual(report["json"]["final_history_tokens"], sum(json_sizes))
+        # Turn t resends turns 1..t-1.
+        self.assertEqual(
+            report["json"]["prefill_tokens"],
+            sum(sum(json_sizes[:end]) for end in range(1, len(json_sizes))),
+        )
+
+    def test_meter_matches_rendered_history(self) -> None:
+        for window in (None, 1, 2, 4):
+            meter = HistoryTokenMeter(window=window)
+            meter.encoders["digest"] = get_history_encoder({"encoder": "digest", "recent": 2, "rows": 1})
+            for end, record in enumerate(RECORDS, start=1):
+                meter.add("A", record)
+                for name, encoder in meter.encoders.items():
+                    rendered = encoder.render(RECORDS[:end], window)
+                    self.assertEqual(
+                        meter._counters[name]["A"].tokens,
+                        sum(estimate_tokens(m["content"]) for m in rendered),
+                        (name, window, end),
+                    )
+        meter = HistoryTokenMeter()
+        for record in RECORDS:
+            meter.add("A", record)
+        self.assertEqual(meter.report(), history_token_report({"A": RECORDS}))
+
+    def test_window_lowers_reported_prefill(self) -> None:
+        full = history_token_report({"A": RECORDS})
+        windowed = history_token_report({"A": RECORDS}, window=2)
+        for name in full:
+            self.assertLess(windowed[name]["prefill_tokens"], full[name]["prefill_tokens"], name)
+
+    def test_records_from_log(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            log_path.write_text(
+                "\n".join(
+                    json.dumps({"turn": r.turn, "agent": "A", "decision": r.decision, "message": r.message})
+                    for r in RECORDS
+                ),
+                encoding="utf-8",
+            )
+            self.assertEqual(records_from_log(log_path), {"A": RECORDS})
+
+
+if __name__ == "__main__":
+    unittest.main()
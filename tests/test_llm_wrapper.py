@@ -3,7 +3,19 @@ import asyncio
 import unittest
 from unittest.mock import AsyncMock, patch
 
-from src.agents.llm_wrapper import AgentTurn, LLMWrapper, PromptPayload
+import time
+
+from src.agents.llm_wrapper import (
+    AgentTurn,
+    HedgeStats,
+    LLMWrapper,
+    MessageBuffer,
+    OutputStats,
+    REPAIR_MAX_TOKENS,
+    PromptPayload,
+    ResponseContract,
+    TokenBudget,
+)
 
 
 class LLMWrapperTests(unittest.TestCase):
@@ -107,5 +119,354 @@ class LLMWrapperTests(unittest.TestCase):
             asyncio.run(run_chat())
 
 
+class StructuredOutputTests(unittest.TestCase):
+    def _chat(self, mode, content: str, decisions=None):  # type: ignore[no-untyped-def]
+        wrapper = LLMWrapper(base_url="http://localhost:9001", structured_output=mode)
+        bodies: list[dict] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            bodies.append(body)
+            return {
+                "choices": [{"message": {"content": content}}],
+                "usage": {"completion_tokens": 40},
+            }
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        payload = PromptPayload(system="sys", history=[], decisions=decisions)
+        turn = asyncio.run(wrapper.chat("A", payload))
+        return wrapper, bodies[0], turn
+
+    def test_json_schema_restricts_decisions_to_phase_vocabulary(self) -> None:
+        content = '{"THOUGHT": "t", "DECISION": "raid", "MESSAGE": "m"}'
+        wrapper, body, turn = self._chat("json_schema", content, ["raid", "skip"])
+        schema = body["response_format"]["json_schema"]["schema"]
+        self.assertEqual(schema["properties"]["DECISION"]["enum"], ["raid", "skip"])
+        self.assertIn("DECISION must be one of: raid, skip", body["messages"][-1]["content"])
+        self.assertEqual(turn.decision, "raid")
+        self.assertEqual(wrapper.output_stats.to_json()["unknown"], 0)
+
+    def test_grammar_mode_and_unknown_tracking(self) -> None:
+        wrapper, body, turn = self._chat("grammar", "I am not sure what to do")
+        self.assertIn("decision ::= string", body["grammar"])
+        self.assertNotIn("response_format", body)
+        self.assertEqual(turn.decision, "UNKNOWN")
+        stats = wrapper.output_stats.to_json()
+        self.assertEqual((stats["unknown"], stats["wasted_tokens"]), (1, 40))
+        self.assertEqual(stats["unknown_rate"], 1.0)
+
+    def test_default_request_has_no_constraints(self) -> None:
+        _, body, _ = self._chat(None, '{"THOUGHT": "", "DECISION": "Join", "MESSAGE": ""}')
+        self.assertNotIn("response_format", body)
+        self.assertNotIn("grammar", body)
+
+    def test_unknown_mode_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            LLMWrapper(base_url="http://localhost:9001", structured_output="xml")
+
+
+class ResponseContractTests(unittest.TestCase):
+    def _chat(self, contract, content: str, thought_chars=None):  # type: ignore[no-untyped-def]
+        wrapper = LLMWrapper(
+            base_url="http://localhost:9001", structured_output="json_schema", contract=contract
+        )
+        bodies: list[dict] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            bodies.append(body)
+            return {"choices": [{"message": {"content": content}}]}
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        payload = PromptPayload(system="sys", history=[], thought_chars=thought_chars)
+        return bodies, asyncio.run(wrapper.chat("A", payload))
+
+    def test_short_keys_with_capped_thought(self) -> None:
+        contract = ResponseContract(short_keys=True, thought_chars=80)
+        bodies, turn = self._chat(contract, '{"t": "brief", "d": "Join", "m": "ok"}')
+        schema = bodies[0]["response_format"]["json_schema"]["schema"]
+        self.assertEqual(schema["required"], ["t", "d", "m"])
+        self.assertEqual(schema["properties"]["t"]["maxLength"], 80)
+        self.assertIn("Keep t under 80 characters", bodies[0]["messages"][-1]["content"])
+        self.assertEqual((turn.thought, turn.decision, turn.message), ("brief", "Join", "ok"))
+
+    def test_phase_cap_of_zero_drops_thought(self) -> None:
+        bodies, turn = self._chat(ResponseContract(), '{"DECISION": "Observe", "MESSAGE": "wait"}', 0)
+        schema = bodies[0]["response_format"]["json_schema"]["schema"]
+        self.assertEqual(schema["required"], ["DECISION", "MESSAGE"])
+        self.assertNotIn("THOUGHT", bodies[0]["messages"][-1]["content"])
+        self.assertEqual((turn.thought, turn.decision), ("", "Observe"))
+
+    def test_short_keys_are_parsed_only_under_short_contract(self) -> None:
+        default = LLMWrapper(base_url="http://localhost:9001")
+        short = LLMWrapper(base_url="http://localhost:9001", contract=ResponseContract(short_keys=True))
+        full_forms = ('{"THOUGHT": "x", "DECISION": "Join", "MESSAGE": "m"}', '{"decision": "Join", "message": "m"}')
+        short_forms = ('{"d": "Join", "m": "m"}', "t: x\nd: Join\nm: m")
+        for wrapper, contents in ((default, full_forms), (short, full_forms + short_forms)):
+            for content in contents:
+                turn = wrapper._parse_response("A", {"choices": [{"message": {"content": content}}]})
+                self.assertEqual((turn.decision, turn.message), ("Join", "m"), content)
+        for content in short_forms + ("Plan A\nD: Join the raid later",):
+            turn = default._parse_response("A", {"choices": [{"message": {"content": content}}]})
+            self.assertEqual(turn.decision, "UNKNOWN", content)
+
+
+class MessageBufferTests(unittest.TestCase):
+    def test_buffer_is_sent_in_place_and_windowed(self) -> None:
+        wrapper = LLMWrapper(base_url="http://localhost:9001")
+        sent: list[list] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            sent.append(body["messages"])
+            return {"output": {"decision": "Join"}}
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        buffer = MessageBuffer(window=2)
+        buffer.set_system({"role": "system", "content": "sys"})
+        payload = PromptPayload(system="sys", history=[], buffer=buffer)
+        for turn in range(1, 4):
+            asyncio.run(wrapper.chat("A", payload))
+            buffer.append({"role": "assistant", "content": f"T{turn}"})
+        self.assertIs(sent[0], buffer.messages)
+        self.assertIs(sent[1][-1], sent[2][-1])
+        self.assertEqual([entry["content"] for entry in buffer.history], ["T2", "T3"])
+        self.assertEqual(buffer.messages[0]["content"], "sys")
+        expected = wrapper._build_messages(PromptPayload(system="sys", history=buffer.history))
+        self.assertEqual(wrapper._build_messages(payload), expected)
+
+
+class RepairTests(unittest.TestCase):
+    def _wrapper(self, replies: list[str], max_repairs: int) -> tuple[LLMWrapper, list[dict]]:
+        wrapper = LLMWrapper(base_url="http://localhost:9001", max_repairs=max_repairs)
+        bodies: list[dict] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            bodies.append(body)
+            content = replies[min(len(bodies), len(replies)) - 1]
+            return {
+                "choices": [{"message": {"content": content}}],
+                "usage": {"prompt_tokens": 30 * len(body["messages"]), "completion_tokens": 20},
+            }
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        return wrapper, bodies
+
+    def test_repair_recovers_decision_from_bad_output_only(self) -> None:
+        wrapper, bodies = self._wrapper(
+            ["I think joining is best, let us build.", '{"THOUGHT": "t", "DECISION": "Join", "MESSAGE": "m"}'],
+            max_repairs=2,
+        )
+        history = [{"role": "assistant", "content": "x" * 500}] * 5
+        turn = asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=history, decisions=["Join", "Observe"])))
+        self.assertEqual(turn.decision, "Join")
+        self.assertEqual(len(bodies), 2)
+        repair_messages = bodies[1]["messages"]
+        self.assertEqual(len(repair_messages), 2)
+        self.assertEqual(repair_messages[1]["content"], "I think joining is best, let us build.")
+        self.assertIn("Join, Observe", repair_messages[0]["content"])
+        self.assertEqual(len(turn.raw_response["repairs"]), 1)
+        stats = wrapper.output_stats.to_json()
+        self.assertEqual((stats["repairs"], stats["repaired"], stats["unknown"]), (1, 1, 0))
+        self.assertEqual(stats["repair_prompt_tokens"], 60)
+
+    def test_repairs_are_capped(self) -> None:
+        wrapper, bodies = self._wrapper(["no json here"], max_repairs=2)
+        turn = asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(turn.decision, "UNKNOWN")
+        self.assertEqual(len(bodies), 3)
+        stats = wrapper.output_stats.to_json()
+        self.assertEqual((stats["repairs"], stats["repaired"], stats["wasted_tokens"]), (2, 0, 60))
+        # The second repair carries the first failed attempt instead of re-sending it.
+        self.assertEqual(len(bodies[1]["messages"]), 2)
+        self.assertEqual(
+            [message["role"] for message in bodies[2]["messages"]],
+            ["system", "user", "assistant", "user"],
+        )
+        self.assertEqual(bodies[2]["messages"][2]["content"], "no json here")
+        self.assertEqual(bodies[1]["max_tokens"], min(wrapper.max_tokens, REPAIR_MAX_TOKENS))
+        # Repair posts feed their own hedge statistics, not the decision-call ones.
+        self.assertEqual((wrapper.hedge_stats.requests, len(wrapper.hedge_stats.latencies)), (1, 1))
+        self.assertEqual(wrapper.repair_hedge_stats.requests, 2)
+
+    def test_repair_uses_adaptive_budget(self) -> None:
+        wrapper, bodies = self._wrapper(["no json here"], max_repairs=1)
+        wrapper.token_budget = TokenBudget(ceiling=1024, floor=64, min_samples=1)
+        asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(bodies[1]["max_tokens"], wrapper.token_budget.current())
+        self.assertLess(bodies[1]["max_tokens"], 1024)
+
+    def test_repair_disabled_by_default(self) -> None:
+        wrapper, bodies = self._wrapper(["no json here"], max_repairs=0)
+        asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(len(bodies), 1)
+
+
+class TokenBudgetTests(unittest.TestCase):
+    @staticmethod
+    def _response(tokens: int, finish: str = "stop") -> dict:
+        return {"choices": [{"finish_reason": finish}], "usage": {"completion_tokens": tokens}}
+
+    def test_budget_shrinks_to_percentile_with_margin(self) -> None:
+        budget = TokenBudget(ceiling=512, min_samples=4, margin=1.25)
+        for tokens in (80, 90, 100, 96):
+            self.assertEqual(budget.current(), 512)
+            budget.observe(self._response(tokens), budget.current())
+        self.assertEqual(budget.current(), 125)
+
+    def test_truncation_widens_and_holds_budget(self) -> None:
+        budget = TokenBudget(ceiling=512, min_samples=2, margin=1.0)
+        for tokens in (100, 100):
+            budget.observe(self._response(tokens), budget.current())
+        self.assertEqual(budget.current(), 100)
+        budget.observe(self._response(100, finish="length"), 100)
+        self.assertEqual((budget.current(), budget.truncations), (200, 1))
+        budget.observe(self._response(110), 200)
+        self.assertEqual(budget.current(), 200)
+        budget.observe(self._response(110), 200)
+        budget.observe(self._response(110), 200)
+        self.assertEqual(budget.current(), 110)
+
+    def test_sampled_responses_are_observed_per_choice(self) -> None:
+        budget = TokenBudget(ceiling=512, min_samples=1, margin=1.0)
+        sampled = {
+            "choices": [{"finish_reason": "stop"}] * 3,
+            "usage": {"completion_tokens": 300},
+        }
+        budget.observe(sampled, 512)
+        self.assertEqual(budget.current(), 100)
+        sampled["choices"] = [{"finish_reason": "stop"}, {"finish_reason": "length"}, {"finish_reason": "stop"}]
+        budget.observe(sampled, 100)
+        self.assertEqual((budget.current(), budget.truncations), (200, 1))
+
+        stats = OutputStats()
+        stats.record("UNKNOWN", sampled)
+        self.assertEqual((stats.completion_tokens, stats.wasted_tokens), (100, 100))
+
+    def test_chat_sends_adaptive_budget(self) -> None:
+        wrapper = LLMWrapper(
+            base_url="http://localhost:9001",
+            max_tokens=400,
+            token_budget=TokenBudget.from_mapping(400, {"min_samples": 1, "margin": 1.5}),
+        )
+        sent: list[int] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            sent.append(body["max_tokens"])
+            return {
+                "choices": [{"message": {"content": '{"DECISION": "Join"}'}, "finish_reason": "stop"}],
+                "usage": {"completion_tokens": 60},
+            }
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        for _ in range(2):
+            asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(sent, [400, 90])
+        self.assertIsNone(TokenBudget.from_mapping(400, None))
+
+    def test_from_mapping_reads_and_validates_window(self) -> None:
+        self.assertEqual(TokenBudget.from_mapping(400, {"window": 16}).window, 16)
+        self.assertEqual(TokenBudget.from_mapping(32, True).floor, 32)
+        for data in ({"window": 4, "min_samples": 8}, {"floor": 500}, {"min_samples": 0}, {"percentile": 1.5}):
+            with self.assertRaises(ValueError, msg=data):
+                TokenBudget.from_mapping(400, data)
+
+
+class MultiSampleTests(unittest.TestCase):
+    def test_n_samples_are_parsed_and_first_drives(self) -> None:
+        wrapper = LLMWrapper(base_url="http://localhost:9001", samples=3)
+        bodies: list[dict] = []
+        contents = [
+            '{"THOUGHT": "a", "DECISION": "Join", "MESSAGE": "m"}',
+            '{"THOUGHT": "b", "DECISION": "Defect", "MESSAGE": "m"}',
+            "no idea",
+        ]
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            bodies.append(body)
+            return {"choices": [{"message": {"content": content}} for content in contents]}
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        turn = asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(bodies[0]["n"], 3)
+        self.assertEqual(turn.decision, "Join")
+        self.assertEqual(turn.thought, "a")
+        self.assertEqual(turn.samples, ["Join", "Defect", "UNKNOWN"])
+
+    def test_single_sample_sends_no_n(self) -> None:
+        wrapper = LLMWrapper(base_url="http://localhost:9001")
+        bodies: list[dict] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            bodies.append(body)
+            return {"choices": [{"message": {"content": '{"DECISION": "Join"}'}}]}
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        turn = asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertNotIn("n", bodies[0])
+        self.assertEqual(turn.samples, [])
+
+
+class HedgedRequestTests(unittest.TestCase):
+    RESPONSE = {"output": {"THOUGHT": "t", "DECISION": "Join", "MESSAGE": "m"}}
+
+    def _wrapper(self, primary_delay: float) -> tuple[LLMWrapper, list[str]]:
+        stats = HedgeStats()
+        stats.latencies.extend([0.01] * 10)
+        wrapper = LLMWrapper(
+            base_url="http://primary",
+            replicas=["http://replica"],
+            hedge_percentile=0.9,
+            hedge_min_samples=5,
+            hedge_stats=stats,
+        )
+        calls: list[str] = []
+
+        def fake_send(url, headers, body):  # type: ignore[no-untyped-def]
+            calls.append(url)
+            if url.startswith("http://primary"):
+                time.sleep(primary_delay)
+                return {"output": {"DECISION": "Observe"}}
+            return self.RESPONSE
+
+        wrapper._send_request = fake_send  # type: ignore[method-assign]
+        return wrapper, calls
+
+    def test_slow_primary_is_hedged_to_replica(self) -> None:
+        wrapper, calls = self._wrapper(primary_delay=0.3)
+        payload = PromptPayload(system="sys", history=[])
+        turn = asyncio.run(wrapper.chat("A", payload))
+        self.assertEqual(turn.decision, "Join")
+        self.assertEqual(calls, ["http://primary/v1/chat/completions", "http://replica/v1/chat/completions"])
+        self.assertEqual(wrapper.hedge_stats.to_json()["hedge_wins"], 1)
+        self.assertEqual(wrapper.hedge_stats.hedged, 1)
+
+    def test_losing_primary_counts_as_load_until_it_returns(self) -> None:
+        wrapper, _ = self._wrapper(primary_delay=0.3)
+        assert wrapper.pool is not None
+        primary = wrapper.pool.replicas["http://primary"]
+
+        async def scenario() -> tuple[int, int]:
+            await wrapper.chat("A", PromptPayload(system="sys", history=[]))
+            during = primary.outstanding
+            await asyncio.sleep(0.4)
+            return during, primary.outstanding
+
+        during, after = asyncio.run(scenario())
+        self.assertEqual((during, after), (1, 0))
+        self.assertIsNotNone(primary.latency)
+        self.assertEqual(wrapper.pool.replicas["http://replica"].outstanding, 0)
+
+    def test_fast_primary_is_not_hedged(self) -> None:
+        wrapper, calls = self._wrapper(primary_delay=0.0)
+        turn = asyncio.run(wrapper.chat("A", PromptPayload(system="sys", history=[])))
+        self.assertEqual(turn.decision, "Observe")
+        self.assertEqual(calls, ["http://primary/v1/chat/completions"])
+        self.assertEqual(wrapper.hedge_stats.to_json()["hedge_rate"], 0.0)
+
+    def test_threshold_waits_for_min_samples(self) -> None:
+        stats = HedgeStats()
+        stats.latencies.extend([1.0, 2.0, 3.0])
+        self.assertIsNone(stats.threshold(0.5, 5))
+        self.assertEqual(stats.threshold(0.5, 3), 2.0)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -8,7 +8,15 @@ from contextlib import redirect_stdout
 from pathlib import Path
 import tempfile
 
-from src.metrics import Evaluator, EvaluationRules, run_cli
+from src.metrics import (
+    METRIC_FAMILIES,
+    Evaluator,
+    EvaluationRules,
+    TurnIndex,
+    register_metric_family,
+    resolve_families,
+    run_cli,
+)
 
 
 class EvaluatorTest(unittest.TestCase):
@@ -82,6 +90,195 @@ class EvaluatorTest(unittest.TestCase):
             self.assertEqual(result.contributions["B"], 0.0)
 
 
+class EvaluationRulesTest(unittest.TestCase):
+    def test_rules_fingerprint_is_order_insensitive(self) -> None:
+        first = EvaluationRules.from_mapping({"cooperative_decisions": ["join", "support"]})
+        second = EvaluationRules.from_mapping({"cooperative_decisions": ["Support", "Join"]})
+        self.assertEqual(first.fingerprint(), second.fingerprint())
+        self.assertNotEqual(first.fingerprint(), EvaluationRules.default().fingerprint())
+
+    def test_evaluate_many_matches_reference_values(self) -> None:
+        rule_sets = [
+            EvaluationRules.default(),
+            EvaluationRules.from_mapping(
+                {
+                    "cooperative_decisions": ["observe"],
+                    "betrayal_decisions": ["join"],
+                    "resource_key": "wood",
+                }
+            ),
+        ]
+        entries = [
+            {"turn": 1, "phase": "formation", "agent": "A", "decision": "Join",
+             "message": "I will steal", "resources": {"stone": 3.0, "wood": 2.0}},
+            {"turn": 1, "phase": "formation", "agent": "B", "decision": "Observe",
+             "message": "help", "resources": {"stone": 1.0, "wood": 4.0}, "trust_score": 0.4},
+            {"turn": 2, "phase": "shock", "agent": "A", "decision": "Defect",
+             "message": "", "resources": {"stone": 2.0, "wood": 1.0}},
+            {"turn": 3, "phase": "recovery", "agent": "A", "decision": "Join",
+             "message": "together", "resources": {"stone": 1.0, "wood": 1.0}},
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            log_path.write_text(
+                "\n".join(json.dumps(entry) for entry in entries),
+                encoding="utf-8",
+            )
+            results = Evaluator().evaluate_many(log_path, rule_sets)
+            singles = [Evaluator(rules).evaluate(log_path) for rules in rule_sets]
+        # Expected values were produced by the Evaluator before evaluate_many
+        # existed, so the shared pass is checked against a fixed reference.
+        expected = [
+            {
+                "cooperation_rate": 0.5,
+                "average_contribution": 1.0,
+                "average_recovery_time": 1.0,
+                "contributions": {"A": 2.0, "B": 0.0},
+                "gini_coefficient": 0.5,
+                "top_contributor_share": 1.0,
+                "message_action_mismatch_count": 1,
+                "series": [(1, 1, 0, 0.5), (2, 0, 1, 0.0), (3, 1, 0, 1.0)],
+                "windows": {"pre_shock": (1, 0), "shock": (0, 1), "post_shock": (1, 0)},
+            },
+            {
+                "cooperation_rate": 0.25,
+                "average_contribution": 1.0,
+                "average_recovery_time": None,
+                "contributions": {"A": 1.0, "B": 0.0},
+                "gini_coefficient": 0.5,
+                "top_contributor_share": 1.0,
+                "message_action_mismatch_count": 1,
+                "series": [(1, 1, 1, 0.5), (2, 0, 0, 0.0), (3, 0, 1, 0.0)],
+                "windows": {"pre_shock": (1, 1), "shock": (0, 0), "post_shock": (0, 1)},
+            },
+        ]
+        self.assertEqual(len(results), 2)
+        for reference, result, single in zip(expected, results, singles):
+            for outcome in (result, single):
+                payload = outcome.to_json()
+                for key in (
+                    "cooperation_rate",
+                    "average_contribution",
+                    "average_recovery_time",
+                    "contributions",
+                    "gini_coefficient",
+                    "top_contributor_share",
+                    "message_action_mismatch_count",
+                ):
+                    self.assertEqual(payload[key], reference[key], key)
+                self.assertEqual(
+                    [
+                        (row["turn"], row["cooperative_events"], row["betrayal_events"], row["cooperation_rate"])
+                        for row in payload["turn_series"]
+                    ],
+                    reference["series"],
+                )
+                for window, counts in reference["windows"].items():
+                    block = payload["shock_windows"][window]
+                    self.assertEqual((block["cooperative_events"], block["betrayal_events"]), counts)
+                self.assertEqual(payload["shock_windows"]["pre_shock"]["mean_trust"], 0.4)
+
+
+class MetricFamilyTest(unittest.TestCase):
+    ENTRIES = [
+        {"turn": 1, "phase": "formation", "agent": "A", "decision": "Join",
+         "message": "help", "resources": {"stone": 3.0}, "trust_score": 0.5},
+        {"turn": 2, "phase": "shock", "agent": "A", "decision": "Defect",
+         "message": "help", "resources": {"stone": 2.0}, "trust_score": 0.3},
+        {"turn": 3, "phase": "recovery", "agent": "A", "decision": "Join",
+         "message": "together", "resources": {"stone": 1.0}, "trust_score": 0.4},
+    ]
+
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.log_path = Path(self._tmp.name) / "events.jsonl"
+        self.log_path.write_text(
+            "\n".join(json.dumps(entry) for entry in self.ENTRIES),
+            encoding="utf-8",
+        )
+
+    def test_selected_families_match_full_evaluation(self) -> None:
+        full = Evaluator().evaluate(self.log_path)
+        partial = Evaluator(families=["cooperation", "shock_windows"]).evaluate(self.log_path)
+        self.assertEqual(partial.cooperation_rate, full.cooperation_rate)
+        self.assertEqual(partial.shock_windows, full.shock_windows)
+        self.assertEqual(partial.persona_summary, {})
+        self.assertEqual(
+            partial.metadata["families"],
+            ["cooperation", "turn_series", "turn_index", "shock_windows"],
+        )
+        self.assertNotIn("families", full.metadata)
+
+    def test_unknown_family_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            resolve_families(["nonexistent"])
+
+    def test_registered_family_lands_in_extras(self) -> None:
+        @register_metric_family("betrayal_total", requires=("turn_series",))
+        def _betrayal_total(aggregate, rules, computed):  # type: ignore[no-untyped-def]
+            return {"betrayal_total": sum(item["betrayal_events"] for item in computed["turn_series"])}
+
+        self.addCleanup(METRIC_FAMILIES.pop, "betrayal_total")
+        result = Evaluator(families=["betrayal_total"]).evaluate(self.log_path)
+        self.assertEqual(result.extras, {"betrayal_total": 1})
+        self.assertEqual(result.to_json()["extras"], {"betrayal_total": 1})
+
+
+class TurnIndexTest(unittest.TestCase):
+    def test_window_sums_match_direct_sums(self) -> None:
+        stats = {
+            1: {"total": 2, "coop": 1, "betrayal": 0, "trust_sum": 1.0, "trust_count": 2},
+            3: {"total": 2, "coop": 0, "betrayal": 2, "trust_sum": 0.5, "trust_count": 1},
+            4: {"total": 1, "coop": 1, "betrayal": 0, "trust_sum": 0.0, "trust_count": 0},
+        }
+        index = TurnIndex(stats)
+        window = index.window(2, 10)
+        assert window is not None
+        self.assertEqual(window["turns"], [3, 4])
+        self.assertEqual(window["events"], 3)
+        self.assertEqual(window["cooperative_events"], 1)
+        self.assertEqual(window["betrayal_events"], 2)
+        self.assertEqual(window["mean_trust"], 0.5)
+        self.assertIsNone(index.window(2, 2))
+        self.assertIsNone(index.window(5, 9))
+
+    def test_trust_sums_do_not_drift(self) -> None:
+        values = [0.69, 2.84, 2.7, 0.09]
+        stats = {
+            turn: {"total": 3, "coop": 1, "betrayal": 1, "trust_sum": value, "trust_count": 3}
+            for turn, value in enumerate(values, start=1)
+        }
+        index = TurnIndex(stats)
+        self.assertEqual(index.sums(3, 4)["trust_sum"], 2.7 + 0.09)
+        self.assertEqual(index.sums(3, 4)["total"], 6)
+        self.assertEqual(index.sums(1, 4)["trust_sum"], sum(values))
+
+    def test_per_shock_windows_keep_shocks_apart(self) -> None:
+        phases = ["calm"] * 3 + ["shock_a"] + ["calm"] * 3 + ["shock_b"] * 2 + ["calm"] * 2
+        entries = [
+            {"turn": turn, "phase": phase, "agent": "A",
+             "decision": "Defect" if phase.startswith("shock") else "Join", "message": ""}
+            for turn, phase in enumerate(phases, start=1)
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            log_path.write_text(
+                "\n".join(json.dumps(entry) for entry in entries),
+                encoding="utf-8",
+            )
+            result = Evaluator().evaluate(log_path)
+        windows = result.shock_windows
+        self.assertEqual(windows["phase_turns"], list(range(4, 10)))
+        per_shock = windows["per_shock"]
+        self.assertEqual([item["phase"] for item in per_shock], ["shock_a", "shock_b"])
+        self.assertEqual(per_shock[0]["shock"]["turns"], [4])
+        self.assertEqual(per_shock[0]["post_shock"]["cooperation_rate"], 1.0)
+        self.assertEqual(per_shock[1]["pre_shock"]["turns"], [5, 6, 7])
+        self.assertEqual(per_shock[1]["shock"]["cooperation_rate"], 0.0)
+        self.assertEqual(result.rolling_series[3]["cooperation_rate"], 0.6667)
+
+
 class MetricsCLITest(unittest.TestCase):
     def setUp(self) -> None:
         self.log_path = Path("results/vow-baseline/events.sample.jsonl").resolve()
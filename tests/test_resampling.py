@@ -0,0 +1,80 @@
+"""Tests for batched bootstrap and permutation statistics."""
+from __future__ import annotations
+
+import unittest
+
+try:
+    import numpy  # type: ignore  # noqa: F401
+
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover - optional dependency
+    HAS_NUMPY = False
+
+
+class RunningIntervalTest(unittest.TestCase):
+    def test_welford_matches_direct_estimates(self) -> None:
+        from src.resampling import RunningInterval, t_critical
+
+        interval = RunningInterval()
+        self.assertEqual(interval.half_width, float("inf"))
+        for value in (0.4, 0.5, None, 0.6, 0.7):
+            interval.add(value)
+        self.assertEqual(interval.n, 4)
+        self.assertAlmostEqual(interval.mean, 0.55)
+        self.assertAlmostEqual(interval.variance, 0.05 / 3)
+        self.assertAlmostEqual(t_critical(0.95, 3), 3.1824, places=4)
+        self.assertAlmostEqual(
+            interval.half_width, t_critical(0.95, 3) * (0.05 / 3 / 4) ** 0.5
+        )
+
+    def test_t_critical_matches_tables_at_low_dof(self) -> None:
+        from src.resampling import t_critical
+
+        for confidence, dof, expected in (
+            (0.95, 1, 12.7062),
+            (0.95, 2, 4.3027),
+            (0.95, 4, 2.7764),
+            (0.99, 2, 9.9248),
+            (0.90, 5, 2.0150),
+            (0.95, 30, 2.0423),
+            (0.95, 60, 2.0003),
+        ):
+            self.assertAlmostEqual(t_critical(confidence, dof), expected, places=3)
+
+
+@unittest.skipUnless(HAS_NUMPY, "NumPy not installed")
+class ResamplingTest(unittest.TestCase):
+    def test_bootstrap_ci_brackets_mean_and_drops_missing(self) -> None:
+        from src.resampling import bootstrap_ci
+
+        samples = {
+            ("baseline", "cooperation_rate"): [0.4, 0.5, None, 0.6, 0.55],
+            ("soft", "cooperation_rate"): [0.7],
+            ("soft", "post_shock_trust"): [None],
+        }
+        result = bootstrap_ci(samples, resamples=2000, seed=1)
+        self.assertNotIn(("soft", "post_shock_trust"), result)
+        interval = result[("baseline", "cooperation_rate")]
+        self.assertEqual(interval.n, 4)
+        self.assertAlmostEqual(interval.mean, 0.5125)
+        self.assertLessEqual(interval.low, interval.mean)
+        self.assertGreaterEqual(interval.high, interval.mean)
+        self.assertGreaterEqual(interval.low, 0.4)
+        single = result[("soft", "cooperation_rate")]
+        self.assertEqual((single.low, single.high), (0.7, 0.7))
+
+    def test_permutation_test_separates_shifted_groups(self) -> None:
+        from src.resampling import compare_to_reference, group_samples
+
+        rows = [{"variant": "baseline", "x": value} for value in (1.0, 2.0, 3.0, 4.0, 5.0)]
+        rows += [{"variant": "double", "x": value} for value in (11.0, 12.0, 13.0, 14.0, 15.0)]
+        rows += [{"variant": "soft", "x": value} for value in (5.0, 4.0, 3.0, 2.0, 1.0)]
+        result = compare_to_reference(group_samples(rows, ["x"]), "baseline", resamples=4000, seed=3)
+        self.assertEqual(set(result), {("double", "x"), ("soft", "x")})
+        self.assertAlmostEqual(result[("double", "x")].difference, 10.0)
+        self.assertLess(result[("double", "x")].p_value, 0.02)
+        self.assertEqual(result[("soft", "x")].p_value, 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
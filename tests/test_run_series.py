@@ -0,0 +1,147 @@
+"""Tests for the adaptive sweep scheduling in scripts.run_series."""
+from __future__ import annotations
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+from scripts.run_series import (
+    ADAPTIVE_METRICS,
+    SeriesContext,
+    VariantPlan,
+    _execute_run,
+    _next_adaptive,
+    run_adaptive,
+)
+from src.resampling import RunningInterval
+
+
+def _plan(variant_id: str, values: list) -> VariantPlan:
+    plan = VariantPlan(variant_id=variant_id, label=variant_id, phases=[])
+    interval = RunningInterval()
+    for value in values:
+        interval.add(value)
+    plan.runs = len(values)
+    plan.intervals = {"cooperation_rate": interval}
+    return plan
+
+
+class NextAdaptiveTest(unittest.TestCase):
+    def test_warming_variants_go_first_fewest_runs_first(self) -> None:
+        plans = [_plan("a", [0.5, 0.5, 0.5]), _plan("b", [0.5]), _plan("c", [0.4, 0.6])]
+        chosen = _next_adaptive(plans, min_runs=5, max_runs=10, target=0.05)
+        self.assertEqual(chosen.variant_id, "b")
+
+    def test_widest_interval_scheduled_after_warm_up(self) -> None:
+        narrow = _plan("narrow", [0.50, 0.51, 0.49, 0.50, 0.52])
+        wide = _plan("wide", [0.2, 0.8, 0.3, 0.7, 0.5])
+        chosen = _next_adaptive([narrow, wide], min_runs=5, max_runs=10, target=0.05)
+        self.assertEqual(chosen.variant_id, "wide")
+        self.assertEqual(narrow.stop_reason, "converged")
+        self.assertIsNone(wide.stop_reason)
+
+    def test_min_runs_blocks_early_convergence(self) -> None:
+        plan = _plan("a", [0.5, 0.5, 0.5])
+        self.assertIs(_next_adaptive([plan], min_runs=5, max_runs=10, target=0.05), plan)
+        self.assertIsNone(plan.stop_reason)
+
+    def test_stops_at_max_runs(self) -> None:
+        plan = _plan("a", [0.1, 0.9, 0.2, 0.8])
+        self.assertIsNone(_next_adaptive([plan], min_runs=2, max_runs=4, target=0.05))
+        self.assertEqual(plan.stop_reason, "max_runs")
+
+
+class RunAdaptiveTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        results = Path(self._tmp.name) / "results"
+        results.mkdir()
+        self.ctx = SeriesContext(
+            config_data={},
+            repo_root=Path(self._tmp.name),
+            log_path=results / "events.jsonl",
+            metrics_path=results / "metrics.json",
+            python_bin=Path("python"),
+        )
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _fake_execute(self, series: dict):
+        calls = []
+
+        def execute(ctx, plan, run_index, seed):
+            calls.append((plan.variant_id, run_index, seed))
+            return SimpleNamespace(cooperation_rate=series[plan.variant_id][run_index])
+
+        return execute, calls
+
+    def test_interleaves_until_converged_or_capped(self) -> None:
+        series = {"steady": [0.5] * 10, "noisy": [0.1, 0.9] * 5}
+        execute, calls = self._fake_execute(series)
+        plans = [VariantPlan("steady", "steady", []), VariantPlan("noisy", "noisy", [])]
+        with patch("scripts.run_series._execute_run", side_effect=execute):
+            report = run_adaptive(
+                self.ctx, plans, base_seed=100, metrics=["cooperation_rate"],
+                target=0.05, min_runs=5, max_runs=8,
+            )
+        variants = report["variants"]
+        self.assertEqual((variants["steady"]["runs"], variants["steady"]["stop_reason"]), (5, "converged"))
+        self.assertEqual((variants["noisy"]["runs"], variants["noisy"]["stop_reason"]), (8, "max_runs"))
+        self.assertEqual(report["total_runs"], 13)
+        self.assertEqual(calls[:2], [("steady", 0, 100), ("noisy", 0, 100)])
+        saved = json.loads((self.ctx.results_dir / "adaptive_sweep.json").read_text(encoding="utf-8"))
+        self.assertEqual(saved["total_runs"], 13)
+
+    def test_budget_caps_total_runs(self) -> None:
+        execute, calls = self._fake_execute({"a": [0.1, 0.9] * 5, "b": [0.2, 0.8] * 5})
+        plans = [VariantPlan("a", "a", []), VariantPlan("b", "b", [])]
+        with patch("scripts.run_series._execute_run", side_effect=execute):
+            report = run_adaptive(
+                self.ctx, plans, base_seed=0, metrics=["cooperation_rate"],
+                target=0.05, min_runs=5, max_runs=10, budget=3,
+            )
+        self.assertEqual(len(calls), 3)
+        self.assertEqual({item["stop_reason"] for item in report["variants"].values()}, {"budget"})
+
+    def test_each_run_archives_only_its_own_spill(self) -> None:
+        raw_path = self.ctx.results_dir / "events.raw.jsonl"
+
+        def fake_subprocess(cmd, *, cwd):
+            if "src.run" in cmd:
+                seed = len(list((self.ctx.results_dir / "archives").glob("run-*")))
+                self.ctx.log_path.write_text(
+                    json.dumps({"turn": 1, "agent": "A", "decision": "Join"}) + "\n", encoding="utf-8"
+                )
+                # An appending writer, as a custom spill path or an older run would leave it.
+                with raw_path.open("a", encoding="utf-8") as handle:
+                    handle.write(json.dumps({"turn": 1, "agent": "A", "run": seed}) + "\n")
+            else:
+                self.ctx.metrics_path.write_text(json.dumps({"cooperation_rate": 1.0}), encoding="utf-8")
+
+        clock = MagicMock()
+        clock.datetime.now.return_value.strftime.side_effect = ["20260101T000000", "20260101T000001"]
+        plan = VariantPlan("a", "a", [])
+        with patch("scripts.run_series._run_subprocess", side_effect=fake_subprocess), patch(
+            "scripts.archive_latest.datetime", clock
+        ):
+            rows = [_execute_run(self.ctx, plan, index, seed=index) for index in range(2)]
+
+        for index, row in enumerate(rows):
+            spilled = (row.log_path.parent / "events.raw.jsonl").read_text(encoding="utf-8").splitlines()
+            self.assertEqual([json.loads(line)["run"] for line in spilled], [index])
+
+
+class AdaptiveMetricsTest(unittest.TestCase):
+    def test_only_numeric_summary_fields(self) -> None:
+        self.assertIn("cooperation_rate", ADAPTIVE_METRICS)
+        self.assertIn("average_recovery_time", ADAPTIVE_METRICS)
+        for name in ("timestamp", "variant", "run_index", "seed", "log_path"):
+            self.assertNotIn(name, ADAPTIVE_METRICS)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()
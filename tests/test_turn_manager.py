@@ -1,12 +1,17 @@
 import asyncio
 import json
 import tempfile
+import time
 import unittest
 from pathlib import Path
 
 from src.agents.agent_manager import AgentConfig, AgentManager
 from src.agents.llm_wrapper import AgentTurn, LLMWrapper, PromptPayload
-from src.simulator.turn_manager import PhaseConfig, TurnConfig, TurnManager
+from src.simulator.history import estimate_tokens
+from src.simulator.retention import RawResponsePolicy, RawResponseRetainer
+from src.simulator.scheduler import AffinityScheduler, CallRecord, SchedulerConfig, fcntl
+from src.simulator.stability import StopRule
+from src.simulator.turn_manager import DeadlineFallback, PhaseConfig, TurnConfig, TurnManager
 
 
 class DummyWrapper(LLMWrapper):
@@ -59,6 +64,113 @@ class TurnManagerTests(unittest.TestCase):
             self.assertIn("trust_score", entry)
             self.assertGreater(entry["trust_score"], 0.5)
 
+    def test_decision_samples_are_logged(self) -> None:
+        class SampledWrapper(DummyWrapper):
+            async def chat(self, agent_id: str, payload: PromptPayload) -> AgentTurn:  # type: ignore[override]
+                turn = await super().chat(agent_id, payload)
+                turn.samples = ["Join", "Observe", "Join"]
+                return turn
+
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            turn_config = TurnConfig(seed=7, max_turns=1, log_path=log_path, phases=[])
+            asyncio.run(TurnManager(agent_manager, {"A": SampledWrapper()}, turn_config).run())
+            entry = json.loads(log_path.read_text(encoding="utf-8").splitlines()[0])
+        self.assertEqual(entry["decision"], "Join")
+        self.assertEqual(entry["decision_samples"], ["Join", "Observe", "Join"])
+
+    def test_prompts_are_compiled_once_per_agent_and_phase(self) -> None:
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        phase = PhaseConfig(name="shock", start=2, end=3, constraints={"budget": 3})
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=7, max_turns=4, log_path=Path(tmpdir) / "events.jsonl", phases=[phase]
+            )
+            manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+            asyncio.run(manager.run())
+            payload = manager._build_payload("A", phase)
+        report = manager.prompts.report()
+        self.assertEqual((report["compiled"], report["hits"]), (2, 3))
+        self.assertEqual(set(report["tokens"]["A"]), {"free", "shock"})
+        self.assertEqual(
+            payload.system,
+            "You are Alex (planner). Current phase: shock. Respond with THOUGHT, DECISION, MESSAGE fields.",
+        )
+        self.assertEqual(payload.constraints_text, 'Constraints:\n{\n  "budget": 3\n}')
+
+    def test_history_window_bounds_payload_history(self) -> None:
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=7, max_turns=5, log_path=Path(tmpdir) / "events.jsonl", phases=[], history_window=2
+            )
+            manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+            asyncio.run(manager.run())
+        buffer = manager.buffers["A"]
+        self.assertEqual(len(manager.history["A"]), 2)
+        self.assertEqual(buffer.history, manager.history["A"])
+        self.assertIs(buffer.messages[0], manager.prompts.compile("A", None).system_message)
+        self.assertEqual(manager.history_records, {})
+        # The token report counts the windowed history that was actually sent.
+        self.assertEqual(
+            manager.history_tokens.report()["json"]["final_history_tokens"],
+            sum(estimate_tokens(message["content"]) for message in manager.history["A"]),
+        )
+
+    def test_history_window_keeps_digest_summary(self) -> None:
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=7,
+                max_turns=5,
+                log_path=Path(tmpdir) / "events.jsonl",
+                phases=[],
+                history_window=2,
+                history_encoding={"encoder": "digest", "recent": 3},
+            )
+            manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+            asyncio.run(manager.run())
+        history = manager.history["A"]
+        self.assertEqual(len(history), 2)
+        self.assertEqual(history[0]["content"], "Earlier decisions (turn:decision): 4:Join")
+        self.assertEqual(manager.buffers["A"].history, history)
+        self.assertEqual(manager.history_records["A"].maxlen, 2)
+        self.assertEqual(len(manager.history_records["A"]), 2)
+
+    def test_history_encoding_controls_prompt_history(self) -> None:
+        seen: list[list[dict]] = []
+
+        class RecordingWrapper(DummyWrapper):
+            async def chat(self, agent_id: str, payload: PromptPayload) -> AgentTurn:  # type: ignore[override]
+                seen.append(list(payload.history))
+                return await super().chat(agent_id, payload)
+
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=7,
+                max_turns=5,
+                log_path=Path(tmpdir) / "events.jsonl",
+                phases=[],
+                history_encoding={"encoder": "digest", "recent": 2},
+            )
+            manager = TurnManager(agent_manager, {"A": RecordingWrapper()}, turn_config)
+            asyncio.run(manager.run())
+        self.assertEqual(seen[1], [{"role": "assistant", "content": "T1 Join: I will contribute"}])
+        self.assertEqual(len(seen[4]), 3)
+        self.assertEqual(len(manager.history_records["A"]), 5)
+
     def test_resource_drop_targets_exclusions(self) -> None:
         agent_cfgs = [
             AgentConfig(
@@ -146,6 +258,392 @@ class TurnManagerTests(unittest.TestCase):
 
         self.assertEqual(calls, [1])
 
+    def test_stop_rule_ends_run_after_stable_recovery(self) -> None:
+        agent_manager = AgentManager(
+            [
+                AgentConfig(
+                    agent_id="A",
+                    name="Alex",
+                    role="planner",
+                    port=9001,
+                    traits={},
+                    resources={"stone": 50.0},
+                )
+            ]
+        )
+        phases = [
+            PhaseConfig(name="formation", start=1, end=2),
+            PhaseConfig(name="shock", start=3, end=4),
+            PhaseConfig(name="recovery", start=5, end=30),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=5,
+                max_turns=30,
+                log_path=Path(tmpdir) / "events.jsonl",
+                phases=phases,
+                stop_rule=StopRule(stable_turns=3, trust_tolerance=1.0),
+            )
+            manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+            results = asyncio.run(manager.run())
+
+        self.assertEqual(len(results), 7)
+        self.assertEqual(manager.stop_reason, "recovered and stable for 3 turns after turn 4")
+        assert manager.detector is not None
+        self.assertEqual(manager.detector.summary()["stopped_at"], 7)
+
+    def test_stop_rule_counts_configured_cooperative_decisions(self) -> None:
+        baselines = {}
+        for label, decisions in (("join", frozenset({"join"})), ("none", frozenset({"observe"}))):
+            agent_manager = AgentManager(
+                [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+            )
+            with tempfile.TemporaryDirectory() as tmpdir:
+                turn_config = TurnConfig(
+                    seed=5,
+                    max_turns=4,
+                    log_path=Path(tmpdir) / "events.jsonl",
+                    phases=[
+                        PhaseConfig(name="formation", start=1, end=2),
+                        PhaseConfig(name="shock", start=3, end=4),
+                    ],
+                    stop_rule=StopRule(),
+                    cooperative_decisions=decisions,
+                )
+                manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+                asyncio.run(manager.run())
+            assert manager.detector is not None
+            baselines[label] = manager.detector.baseline
+        self.assertEqual(baselines, {"join": 1.0, "none": 0.0})
+
+    def test_stop_on_last_turn_sets_manager_stop_reason(self) -> None:
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        phases = [
+            PhaseConfig(name="formation", start=1, end=2),
+            PhaseConfig(name="shock", start=3, end=4),
+            PhaseConfig(name="recovery", start=5, end=7),
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=5,
+                max_turns=7,
+                log_path=Path(tmpdir) / "events.jsonl",
+                phases=phases,
+                stop_rule=StopRule(stable_turns=3, trust_tolerance=1.0),
+            )
+            manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+            results = asyncio.run(manager.run())
+
+        assert manager.detector is not None
+        self.assertEqual(len(results), 7)
+        self.assertEqual(manager.detector.stopped_at, 7)
+        self.assertEqual(manager.stop_reason, manager.detector.stop_reason)
+
+    def test_run_without_stop_rule_uses_all_turns(self) -> None:
+        self.assertIsNone(StopRule.from_mapping({"enabled": False, "stable_turns": 2}))
+        agent_manager = AgentManager(
+            [
+                AgentConfig(
+                    agent_id="A",
+                    name="Alex",
+                    role="planner",
+                    port=9001,
+                    traits={},
+                    resources={"stone": 10.0},
+                )
+            ]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=5,
+                max_turns=6,
+                log_path=Path(tmpdir) / "events.jsonl",
+                phases=[PhaseConfig(name="formation", start=1, end=6)],
+            )
+            manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+            results = asyncio.run(manager.run())
+
+        self.assertEqual(len(results), 6)
+        self.assertIsNone(manager.stop_reason)
+
+
+class IterTurnsTests(unittest.TestCase):
+    def _run(self, tmpdir: str, policy: RawResponsePolicy) -> tuple[list, list]:
+        agent_manager = AgentManager(
+            [AgentConfig(agent_id="A", name="Alex", role="planner", port=9001, traits={}, resources={})]
+        )
+        turn_config = TurnConfig(
+            seed=7,
+            max_turns=4,
+            log_path=Path(tmpdir) / "events.jsonl",
+            phases=[],
+            raw_responses=policy,
+        )
+        manager = TurnManager(agent_manager, {"A": DummyWrapper()}, turn_config)
+        seen: list = []
+
+        async def consume() -> list:
+            results = []
+            async for result in manager.iter_turns():
+                seen.append(result.agent_turns[0].raw_response)
+                results.append(result)
+            return results
+
+        return asyncio.run(consume()), seen
+
+    def test_keep_is_default_and_run_matches_iterator(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results, seen = self._run(tmpdir, RawResponsePolicy())
+        self.assertEqual([result.turn for result in results], [1, 2, 3, 4])
+        self.assertTrue(all(result.agent_turns[0].raw_response == {"test": True} for result in results))
+
+    def test_last_policy_keeps_recent_raw_responses_only(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            policy = RawResponsePolicy.from_mapping({"mode": "last", "keep": 1})
+            results, seen = self._run(tmpdir, policy)
+        self.assertEqual(seen, [{"test": True}] * 4)
+        self.assertEqual(
+            [result.agent_turns[0].raw_response for result in results], [{}, {}, {}, {"test": True}]
+        )
+
+    def test_spill_policy_writes_raw_responses_to_disk(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            results, _ = self._run(tmpdir, RawResponsePolicy.from_mapping("spill"))
+            spill = Path(tmpdir) / "events.raw.jsonl"
+            data = spill.read_bytes()
+            pointer = results[2].agent_turns[0].raw_response["spilled"]
+            record = json.loads(data[pointer:].split(b"\n", 1)[0])
+        self.assertEqual(record, {"turn": 3, "agent": "A", "raw_response": {"test": True}})
+
+    def test_unknown_policy_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            RawResponsePolicy.from_mapping("archive")
+        with self.assertRaises(ValueError):
+            RawResponsePolicy.from_mapping({"mode": "last"})
+
+    def test_spill_path_strips_compressed_log_suffix(self) -> None:
+        retainer = RawResponseRetainer(RawResponsePolicy(mode="spill"), Path("results/events.jsonl.gz"))
+        self.assertEqual(retainer.spill_path, Path("results/events.raw.jsonl"))
+
+
+class SlowWrapper(DummyWrapper):
+    async def chat(self, agent_id: str, payload: PromptPayload) -> AgentTurn:  # type: ignore[override]
+        await asyncio.sleep(5)
+        return await super().chat(agent_id, payload)
+
+
+class DeadlineTests(unittest.TestCase):
+    def test_stragglers_get_fallback_and_penalty(self) -> None:
+        agent_manager = AgentManager(
+            [
+                AgentConfig(
+                    agent_id=agent_id,
+                    name=agent_id,
+                    role="villager",
+                    port=9000,
+                    traits={},
+                    resources={"stone": 3.0},
+                )
+                for agent_id in ("A", "B")
+            ]
+        )
+        phase = PhaseConfig(
+            name="stress_escape",
+            start=1,
+            end=1,
+            deadline=0.2,
+            fallback=DeadlineFallback(
+                decision="TIMEOUT", trust_delta=-0.2, resources_delta={"stone": -0.5}
+            ),
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            turn_config = TurnConfig(
+                seed=1,
+                max_turns=1,
+                log_path=log_path,
+                phases=[phase],
+                turn_deadline=30.0,
+            )
+            manager = TurnManager(
+                agent_manager, {"A": DummyWrapper(), "B": SlowWrapper()}, turn_config
+            )
+            started = time.perf_counter()
+            results = asyncio.run(manager.run())
+            elapsed = time.perf_counter() - started
+            entries = [
+                json.loads(line) for line in log_path.read_text(encoding="utf-8").splitlines()
+            ]
+
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(results[0].late_agents, ["B"])
+        self.assertEqual([entry["decision"] for entry in entries], ["Join", "TIMEOUT"])
+        self.assertNotIn("late", entries[0])
+        self.assertTrue(entries[1]["late"])
+        state_b = agent_manager.get_agent("B")
+        self.assertAlmostEqual(state_b.trust_score, 0.3)
+        self.assertAlmostEqual(state_b.resources["stone"], 2.5)
+
+
+    def _paused_run(self, delays: dict, deadline: float) -> tuple:
+        agent_manager = AgentManager(
+            [
+                AgentConfig(agent_id=agent_id, name=agent_id, role="villager", port=9000, traits={}, resources={})
+                for agent_id in delays
+            ]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            turn_config = TurnConfig(
+                seed=1,
+                max_turns=1,
+                log_path=Path(tmpdir) / "events.jsonl",
+                phases=[PhaseConfig(name="stress", start=1, end=1, deadline=deadline)],
+            )
+            wrappers = {agent_id: PausedWrapper(delay) for agent_id, delay in delays.items()}
+            manager = TurnManager(agent_manager, wrappers, turn_config)
+            started = time.perf_counter()
+            results = asyncio.run(manager.run())
+        return results[0], time.perf_counter() - started
+
+    def test_queued_agents_start_concurrently_within_turn_deadline(self) -> None:
+        # In agent order this turn takes 0.75s; stragglers start at half the
+        # deadline, so everyone answers within the 0.4s turn budget.
+        result, elapsed = self._paused_run({agent_id: 0.15 for agent_id in "ABCDE"}, deadline=0.4)
+        self.assertEqual(result.late_agents, [])
+        self.assertEqual([turn.decision for turn in result.agent_turns], ["Join"] * 5)
+        self.assertLess(elapsed, 0.6)
+
+    def test_turn_deadline_bounds_wall_time(self) -> None:
+        result, elapsed = self._paused_run({"A": 0.15, "B": 5.0, "C": 5.0}, deadline=0.3)
+        self.assertEqual(result.late_agents, ["B", "C"])
+        self.assertLess(elapsed, 1.0)
+
+
+class PausedWrapper(DummyWrapper):
+    def __init__(self, delay: float):
+        super().__init__()
+        self.delay = delay
+
+    async def chat(self, agent_id: str, payload: PromptPayload) -> AgentTurn:  # type: ignore[override]
+        await asyncio.sleep(self.delay)
+        return await super().chat(agent_id, payload)
+
+
+class ModelWrapper(DummyWrapper):
+    def __init__(self, model: str, calls: list[str]):
+        super().__init__()
+        self.model = model
+        self.calls = calls
+
+    async def chat(self, agent_id: str, payload: PromptPayload) -> AgentTurn:  # type: ignore[override]
+        self.calls.append(agent_id)
+        return await super().chat(agent_id, payload)
+
+
+class AffinitySchedulerTests(unittest.TestCase):
+    def _run(self, mode: str) -> tuple[list[str], list[str], TurnManager]:
+        models = {"A": "m1", "B": "m2", "C": "m1", "D": "m2"}
+        agent_manager = AgentManager(
+            [
+                AgentConfig(
+                    agent_id=agent_id,
+                    name=agent_id,
+                    role="villager",
+                    port=9000,
+                    traits={},
+                    resources={"stone": 5.0},
+                )
+                for agent_id in models
+            ]
+        )
+        calls: list[str] = []
+        wrappers = {agent_id: ModelWrapper(model, calls) for agent_id, model in models.items()}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = Path(tmpdir) / "events.jsonl"
+            turn_config = TurnConfig(
+                seed=1,
+                max_turns=2,
+                log_path=log_path,
+                phases=[PhaseConfig(name="formation", start=1, end=2)],
+                scheduler=SchedulerConfig.from_mapping({"mode": mode}),
+            )
+            manager = TurnManager(agent_manager, wrappers, turn_config)
+            asyncio.run(manager.run())
+            logged = [
+                json.loads(line)["agent"]
+                for line in log_path.read_text(encoding="utf-8").splitlines()
+            ]
+        return calls, logged, manager
+
+    def test_affinity_groups_calls_but_logs_in_agent_order(self) -> None:
+        calls, logged, manager = self._run("affinity")
+        # The second turn starts with m2, which is still loaded.
+        self.assertEqual(calls, ["A", "C", "B", "D", "B", "D", "A", "C"])
+        self.assertEqual(logged, ["A", "B", "C", "D"] * 2)
+        self.assertEqual(manager.scheduler.report()["swaps"], 2)
+
+    def test_sequential_mode_keeps_agent_order(self) -> None:
+        calls, logged, manager = self._run("sequential")
+        self.assertEqual(calls, ["A", "B", "C", "D"] * 2)
+        self.assertEqual(logged, calls)
+        self.assertEqual(manager.scheduler.report()["swaps"], 7)
+
+    def test_report_flags_swap_spikes(self) -> None:
+        scheduler = AffinityScheduler(SchedulerConfig(spike_factor=3.0))
+        for turn, (model, latency, after_swap) in enumerate(
+            [("m1", 1.0, False), ("m1", 1.2, False), ("m2", 9.0, True), ("m2", 1.0, False), ("m2", 1.1, False)],
+            start=1,
+        ):
+            scheduler.record(CallRecord(turn, "A", "http://host", model, latency, after_swap))
+        report = scheduler.report()
+        self.assertEqual(report["swaps"], 1)
+        self.assertEqual([spike["turn"] for spike in report["spikes"]], [3])
+        self.assertTrue(report["spikes"][0]["after_swap"])
+
+    def test_records_are_bounded_but_totals_cover_the_run(self) -> None:
+        scheduler = AffinityScheduler(SchedulerConfig(max_records=3))
+        for turn in range(1, 11):
+            scheduler.record(CallRecord(turn, "A", "http://host", "m1", 1.0, turn == 1))
+        self.assertEqual([record.turn for record in scheduler.records], [8, 9, 10])
+        report = scheduler.report()
+        self.assertEqual((report["calls"], report["swaps"]), (10, 1))
+        self.assertEqual(report["total_latency"], 10.0)
+        with self.assertRaises(ValueError):
+            SchedulerConfig.from_mapping({"max_records": 0})
+
+    @unittest.skipIf(fcntl is None, "fcntl not available")
+    def test_cancelled_lock_wait_leaves_lock_free(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            scheduler = AffinityScheduler(SchedulerConfig(mode="affinity", lock_dir=Path(tmpdir)))
+            lock_path = scheduler._lock_path("http://host", ".lock")
+            lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+            async def scenario() -> None:
+                with lock_path.open("a") as holder:
+                    fcntl.flock(holder.fileno(), fcntl.LOCK_EX)
+
+                    async def wait_for_lock() -> None:
+                        async with scheduler._endpoint_lock("http://host"):
+                            pass
+
+                    task = asyncio.create_task(wait_for_lock())
+                    await asyncio.sleep(0.1)
+                    task.cancel()
+                    with self.assertRaises(asyncio.CancelledError):
+                        await task
+                    fcntl.flock(holder.fileno(), fcntl.LOCK_UN)
+                await asyncio.sleep(0.1)
+                with lock_path.open("a") as probe:
+                    fcntl.flock(probe.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+            asyncio.run(scenario())
+
+    def test_unknown_mode_raises(self) -> None:
+        with self.assertRaises(ValueError):
+            SchedulerConfig.from_mapping({"mode": "random"})
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,99 @@
+"""Tests for the SQLite results warehouse."""
+from __future__ import annotations
+
+import json
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+from scripts import make_table_core_stats, plot_minimal
+from scripts.warehouse import _load_metrics, ingest
+from src.metrics import Evaluator
+from src.utils.event_log import EventLogWriter
+
+
+def _entries(cooperative_agent: str) -> list:
+    entries = []
+    for turn in (1, 2, 3):
+        for agent in ("A", "B"):
+            entries.append(
+                {
+                    "turn": turn,
+                    "phase": "formation" if turn < 3 else "shock",
+                    "agent": agent,
+                    "decision": "Join" if agent == cooperative_agent else "Defect",
+                    "message": "Let's help",
+                    "resources": {"stone": 1.0},
+                    "trust_score": 0.5 + 0.05 * turn,
+                    "betrayal_count": 0,
+                }
+            )
+    return entries
+
+
+class WarehouseTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self._tmp.name) / "results"
+        self.db = Path(self._tmp.name) / "warehouse.sqlite"
+        self.runs = {
+            "exp-a": self._write_run("exp-a", "run_001", "A"),
+            "exp-b": self._write_run("exp-b", "run_001", "B"),
+        }
+
+    def tearDown(self) -> None:
+        self._tmp.cleanup()
+
+    def _write_run(self, experiment: str, run: str, cooperative_agent: str) -> Path:
+        run_dir = self.root / experiment / "archives" / run
+        with EventLogWriter(run_dir / "events.jsonl") as writer:
+            for entry in _entries(cooperative_agent):
+                writer.write(entry)
+        return run_dir
+
+    def _counts(self) -> dict:
+        conn = sqlite3.connect(str(self.db))
+        try:
+            return {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("runs", "events", "turn_series", "run_metrics")
+            }
+        finally:
+            conn.close()
+
+    def test_reingest_is_a_no_op(self) -> None:
+        self.assertEqual(ingest(self.db, [self.root]), {"ingested": 2, "unchanged": 0})
+        first = self._counts()
+        self.assertEqual(first, {"runs": 2, "events": 12, "turn_series": 6, "run_metrics": 2})
+
+        self.assertEqual(ingest(self.db, [self.root]), {"ingested": 0, "unchanged": 2})
+        self.assertEqual(self._counts(), first)
+
+    def test_experiment_filter_in_readers(self) -> None:
+        ingest(self.db, [self.root])
+        rows = make_table_core_stats.read_rows_db(str(self.db), "exp-a")
+        self.assertEqual(len(rows), 1)
+        self.assertAlmostEqual(rows[0]["cooperation_rate"], 0.5)
+        self.assertEqual(len(make_table_core_stats.read_rows_db(str(self.db))), 2)
+        self.assertEqual(len(plot_minimal.read_summary_db(str(self.db), "exp-b")), 1)
+        self.assertEqual(plot_minimal.read_summary_db(str(self.db), "missing"), [])
+
+    def test_partial_metrics_are_re_evaluated(self) -> None:
+        run_dir = self.runs["exp-a"]
+        partial = Evaluator(families=["cooperation"]).evaluate(run_dir / "events.jsonl").to_json()
+        self.assertIn("families", partial["metadata"])
+        (run_dir / "metrics.json").write_text(json.dumps(partial), encoding="utf-8")
+
+        metrics = _load_metrics(run_dir)
+        self.assertNotIn("families", metrics.get("metadata", {}))
+        self.assertEqual(len(metrics["turn_series"]), 3)
+        self.assertIn("shock_windows", metrics)
+
+        full = dict(metrics, total_turns=-1)
+        (run_dir / "metrics.json").write_text(json.dumps(full), encoding="utf-8")
+        self.assertEqual(_load_metrics(run_dir)["total_turns"], -1)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    unittest.main()